@@ -0,0 +1,173 @@
+'''
+    Cold-start import time of the camstack entry points:
+    camstack/cam_mains/*.py and the viewers/*.py scripts.
+
+    Usage:
+        python -m camstack.bench.importtime_bench [-n N] [--only SUBSTR]
+                                                  [--top K]
+                                                  [--json PATH]
+                                                  [--baseline PATH]
+
+    Each entry point file is parsed, and all its import statements (but
+    the TYPE_CHECKING ones) are run in a fresh interpreter with
+    python -X importtime - without running the entry point itself: no
+    camera, no window. Best of N runs, and the K heaviest top-level imports.
+    Imports that fail (dependency missing here) are reported, not fatal.
+
+    --json saves the results, --baseline diffs against saved results:
+    that's how we track startup regressions.
+'''
+import typing as typ
+
+import os
+import sys
+import ast
+import json
+import glob
+import argparse
+import subprocess
+
+from camstack.bench.standin_taker import REPO_ROOT
+
+# Runs the imports - stdout is ours, stderr is -X importtime's.
+# What the runner imports itself is before START_MARKER.
+START_MARKER = 'importtime_bench start'
+RUNNER = '''
+import sys, time, json
+statements = json.loads(sys.argv[1])
+failed = []
+print(sys.argv[2], file=sys.stderr, flush=True)
+t_start = time.perf_counter()
+for statement in statements:
+    try:
+        exec(statement, {})
+    except Exception as exc:
+        failed.append(f'{statement} [{type(exc).__name__}: {exc}]')
+print(json.dumps({'seconds': time.perf_counter() - t_start,
+                  'failed': failed}))
+'''
+
+
+def entry_points() -> typ.Dict[str, str]:
+    '''
+        name -> path
+    '''
+    entries = {}
+    for path in sorted(glob.glob(REPO_ROOT + '/camstack/cam_mains/*.py')):
+        name = os.path.basename(path)[:-3]
+        if name != '__init__':
+            entries['cam_mains.' + name] = path
+    for path in sorted(glob.glob(REPO_ROOT + '/viewers/*.py')):
+        entries['viewers.' + os.path.basename(path)[:-3]] = path
+    return entries
+
+
+def _is_type_checking(node: ast.AST) -> bool:
+    if not isinstance(node, ast.If):
+        return False
+    test = node.test
+    return ((isinstance(test, ast.Name) and test.id == 'TYPE_CHECKING') or
+            (isinstance(test, ast.Attribute) and test.attr == 'TYPE_CHECKING'))
+
+
+def import_statements(path: str) -> typ.List[str]:
+    with open(path, 'r') as file:
+        tree = ast.parse(file.read(), filename=path)
+
+    statements: typ.List[str] = []
+
+    def visit(node: ast.AST) -> None:
+        if _is_type_checking(node):
+            return
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if not (isinstance(node, ast.ImportFrom) and node.level > 0):
+                statement = ast.unparse(node)
+                if statement not in statements:
+                    statements.append(statement)
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    visit(tree)
+    return statements
+
+
+def parse_importtime(stderr: str) -> typ.Dict[str, float]:
+    '''
+        Top-level module -> cumulative import time [s]
+    '''
+    cumulative = {}
+    lines = stderr.splitlines()
+    if START_MARKER in lines:
+        lines = lines[lines.index(START_MARKER) + 1:]
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # Header
+        name = fields[2]
+        if len(name) - len(name.lstrip()) == 1:  # Top-level
+            cumulative[name.strip()] = int(fields[1]) * 1e-6
+    return cumulative
+
+
+def measure(path: str) -> typ.Dict[str, typ.Any]:
+    statements = import_statements(path)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+            [REPO_ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+
+    proc = subprocess.run([
+            sys.executable, '-X', 'importtime', '-c', RUNNER,
+            json.dumps(statements), START_MARKER
+    ], capture_output=True, text=True, env=env, cwd=os.path.dirname(path))
+    if proc.returncode != 0:
+        raise RuntimeError(f'{path}: runner failed\n{proc.stderr[-2000:]}')
+
+    result = json.loads(proc.stdout.splitlines()[-1])
+    result['modules'] = parse_importtime(proc.stderr)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=3)
+    parser.add_argument('--only', type=str, default='')
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--json', type=str, default=None)
+    parser.add_argument('--baseline', type=str, default=None)
+    args = parser.parse_args()
+
+    baseline: typ.Dict[str, typ.Any] = {}
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    results: typ.Dict[str, typ.Any] = {}
+    for name, path in entry_points().items():
+        if args.only not in name:
+            continue
+        runs = [measure(path) for _ in range(args.n)]
+        best = min(runs, key=lambda r: r['seconds'])
+        results[name] = best
+
+        delta = ''
+        if name in baseline:
+            diff = best['seconds'] - baseline[name]['seconds']
+            delta = f' ({diff * 1e3:+8.1f} ms vs. baseline)'
+        print(f'{name:>24s}: {best["seconds"] * 1e3:8.1f} ms{delta}')
+
+        heaviest = sorted(best['modules'].items(), key=lambda kv: -kv[1])
+        for module, seconds in heaviest[:args.top]:
+            print(f'{"":>26s}{seconds * 1e3:8.1f} ms  {module}')
+        for failure in best['failed']:
+            print(f'{"":>26s}failed: {failure}')
+
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
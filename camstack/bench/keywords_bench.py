@@ -0,0 +1,142 @@
+'''
+    Full keyword fill of a stream: per-key update_keyword vs. batched commit
+
+    Usage:
+        python -m camstack.bench.keywords_bench [-n N] [--cam CLASS]
+
+    CLASS is a camstack.cams class path, default camstack.cams.cred1.Apapane
+    (largest KEYWORDS, 2 WCS sets).
+    Only BaseCamera._fill_keywords is exercised - no hardware, no taker.
+    Creates and destroys a throwaway SHM in $MILK_SHM_DIR.
+'''
+import typing as typ
+
+import time
+import argparse
+import importlib
+import statistics
+import threading
+
+import numpy as np
+
+from camstack.cams.base import BaseCamera, MAGIC_BOOL_STR
+from camstack.core.camstate import CameraState
+from camstack.core.wcs import wcs_dummy_dict
+from camstack.core import utilities as util
+
+from pyMilk.interfacing.isio_shmlib import SHM
+
+
+def legacy_fill_keywords(cam: BaseCamera) -> None:
+    '''
+        What BaseCamera._fill_keywords did before the compiled schema:
+        one update_keyword - thus one keyword area rewrite - per key,
+        re-interpreting the format string every time.
+    '''
+    assert cam.camera_shm is not None
+
+    def legacy_set(key: str, value: typ.Any) -> None:
+        fmt = cam.KEYWORDS[key][2]
+        val = value
+        if value is not None:
+            if fmt == 'BOOLEAN':
+                val = MAGIC_BOOL_STR.TUPLE[value]
+            elif fmt[-1] == 'd':
+                val = int(fmt % value)
+            elif fmt[-1] == 'f':
+                val = float(fmt % value)
+            elif fmt[-1] == 's':
+                val = fmt % value
+        cam.camera_shm.update_keyword(key, val)
+
+    preex_keywords = cam.camera_shm.get_keywords(True)
+    preex_keywords.update(cam.KEYWORDS)
+    for i in range(cam.N_WCS):
+        wcs_dict = wcs_dummy_dict(i)
+        preex_keywords.update(wcs_dict)
+        cam.KEYWORDS.update(wcs_dict)
+    cam.camera_shm.set_keywords(preex_keywords)
+    for kw in cam.KEYWORDS:
+        legacy_set(kw, preex_keywords[kw][0])
+
+    cm = cam.current_mode
+    legacy_set('DETECTOR', 'Base Camera')
+    legacy_set('BIN-FCT1', cm.binx)
+    legacy_set('BIN-FCT2', cm.biny)
+    legacy_set('PRD-MIN1', cm.x0)
+    legacy_set('PRD-MIN2', cm.y0)
+    legacy_set('PRD-RNG1', cm.x1 - cm.x0 + 1)
+    legacy_set('PRD-RNG2', cm.y1 - cm.y0 + 1)
+    legacy_set('CROPPED', False)
+
+
+def make_bare_camera(cls: typ.Type[BaseCamera], shm: SHM) -> BaseCamera:
+    # Skip the constructor: no tmux, no taker, no serial.
+    cam = cls.__new__(cls)
+    cam.NAME = cam.STREAMNAME = 'kwbench'
+    cam._kw_batch_local = threading.local()
+    cam.state = CameraState()
+    cam.camera_shm = shm
+    cam.current_mode_id = 'CUSTOM'
+    cam.current_mode = util.CameraMode(x0=0, x1=63, y0=0, y1=63)
+    return cam
+
+
+def time_calls(func: typ.Callable[[], None], n: int) -> typ.List[float]:
+    times = []
+    for _ in range(n):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def report(name: str, times: typ.List[float]) -> float:
+    pct = statistics.quantiles(times, n=100)
+    print(f'{name:>10s}: {len(times):5d} fills - p50 {pct[49] * 1e3:8.3f} ms - '
+          f'p90 {pct[89] * 1e3:8.3f} ms - p99 {pct[98] * 1e3:8.3f} ms')
+    return pct[49]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=200)
+    parser.add_argument('--cam', type=str,
+                        default='camstack.cams.cred1.Apapane')
+    args = parser.parse_args()
+
+    module_name, class_name = args.cam.rsplit('.', 1)
+    cls = getattr(importlib.import_module(module_name), class_name)
+
+    n_keys = len(cls.KEYWORDS) + 30 * cls.N_WCS + 20
+    shm = SHM('kwbench', np.zeros((64, 64), dtype=np.uint16), nbkw=n_keys)
+    cam = make_bare_camera(cls, shm)
+
+    try:
+        # Same end result in the SHM
+        legacy_fill_keywords(cam)
+        ref = shm.get_keywords(True)
+        BaseCamera._fill_keywords(cam)
+        assert shm.get_keywords(True) == ref
+
+        # As grab_shm_fill_keywords: the subclass chain within one batch.
+        # What the subclass sets after the defaults must make it to the SHM.
+        with cam.keyword_batch():
+            BaseCamera._fill_keywords(cam)
+            cam._set_formatted_keyword('DETECTOR', 'kwbench')
+        assert (shm.get_keywords()['DETECTOR'] == cam._format_keyword(
+                'DETECTOR', 'kwbench'))
+
+        print(f'{cls.__name__}: {len(cam.KEYWORDS)} keywords')
+        t_legacy = report('legacy',
+                          time_calls(lambda: legacy_fill_keywords(cam), args.n))
+        t_batch = report(
+                'batched',
+                time_calls(lambda: BaseCamera._fill_keywords(cam), args.n))
+        print(f'Speedup: x{t_legacy / t_batch:.1f}')
+    finally:
+        shm.destroy()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+'''
+    End-to-end camera lifecycle: cold init, set_camera_mode between every
+    ordered pair of modes, kill_taker_and_dependents.
+
+    Usage:
+        python -m camstack.bench.lifecycle_bench [--cams CAM[,CAM...]]
+                                                 [-n N] [--rounds R]
+                                                 [--serial-latency L]
+                                                 [--traces]
+
+    CAM among simulated, cred1, ocam, dcam (default: all of them).
+    N cold inits (and kills) per camera, R passes over the mode pairs.
+    L is the emulated serial latency for the EDT cameras [s].
+
+    Real camera classes, with the process side swapped for local stand-ins
+    (see camstack.bench.standin_backend): tmux panes are subprocesses, takers
+    are src/simcam_framegen, EDT serial is camstack.bench.serial_emulators.
+    The real code's waits (kill_running, _ensure_backend_restarted) are kept -
+    they're part of the latency we care about.
+    Needs pyMilk, and $MILK_SHM_DIR. dcam needs hwmain for dcamprop.
+'''
+import typing as typ
+
+import os
+import time
+import argparse
+import itertools
+import statistics
+
+from camstack.bench.serial_emulators import (SerialEmulator, CRED1Emulator,
+                                             OCAM2KEmulator)
+from camstack.bench.standin_backend import standin_backend
+from camstack.bench.standin_taker import REPO_ROOT
+from camstack.cams.base import BaseCamera
+from camstack.core import utilities as util
+
+CameraFactoryType = typ.Callable[[typ.List[util.DependentProcess]], BaseCamera]
+CameraSpecType = typ.Callable[[argparse.Namespace], CameraFactoryType]
+
+
+def edt_bench_class(cls: typ.Type[typ.Any],
+                    emulator_factory: typ.Callable[[], SerialEmulator],
+                    modes: typ.Dict[typ.Any,
+                                    util.CameraMode]) -> typ.Type[typ.Any]:
+    '''
+        Subclass an EDTCamera class to talk to a serial emulator,
+        with the repo's config files if not installed in $HOME.
+    '''
+
+    class Bench(cls):  # type: ignore
+        MODES = modes
+
+        def _open_serial_iface(self) -> SerialEmulator:
+            # Same "camera" through re-inits: the state survives.
+            if getattr(self, '_emulator', None) is None:
+                self._emulator = emulator_factory()
+            return self._emulator
+
+        def init_framegrab_backend(self) -> None:
+            if not os.path.isfile(self.pdv_basefile):
+                self.pdv_basefile = (REPO_ROOT + '/config/' +
+                                     os.path.basename(self.pdv_basefile))
+            cls.init_framegrab_backend(self)
+
+    Bench.__name__ = 'Bench' + cls.__name__
+    return Bench
+
+
+def make_simulated(args: argparse.Namespace) -> CameraFactoryType:
+    from camstack.cams.simulatedcam import SimulatedCam
+
+    class BenchSimulatedCam(SimulatedCam):
+        # yapf: disable
+        MODES = {
+                'full': util.CameraMode(x0=0, x1=255, y0=0, y1=255),
+                'crop': util.CameraMode(x0=64, x1=191, y0=64, y1=191),
+                'full_50Hz': util.CameraMode(x0=0, x1=255, y0=0, y1=255,
+                                             fps=50.0),
+        }
+        # yapf: enable
+
+    return lambda deps: BenchSimulatedCam('lcb_sim', 'lcb_sim', 'full',
+                                          dependent_processes=deps)
+
+
+def make_cred1(args: argparse.Namespace) -> CameraFactoryType:
+    from camstack.cams.cred1 import Apapane
+
+    # full and 0 only differ by fps: live setter path.
+    modes = {k: Apapane.MODES[k] for k in (Apapane.FULL, 0, 1, 2)}
+    cls = edt_bench_class(Apapane,
+                          lambda: CRED1Emulator(latency=args.serial_latency),
+                          modes)
+    return lambda deps: cls('lcb_cred1', 'lcb_cred1', Apapane.FULL,
+                            dependent_processes=deps)
+
+
+def make_ocam(args: argparse.Namespace) -> CameraFactoryType:
+    from camstack.cams.ocam import OCAM2K
+
+    cls = edt_bench_class(OCAM2K,
+                          lambda: OCAM2KEmulator(latency=args.serial_latency),
+                          OCAM2K.MODES)
+    return lambda deps: cls('lcb_ocam', 'lcb_ocam_raw', 'lcb_ocam',
+                            dependent_processes=deps)
+
+
+def make_dcam(args: argparse.Namespace) -> CameraFactoryType:
+    from camstack.cams.dcamcam import DCAMCamera
+
+    class BenchDCAMCamera(DCAMCamera):
+        # No tint setter in the base class: tint changes restart the taker.
+        # yapf: disable
+        MODES = {
+                'full': util.CameraMode(x0=0, x1=511, y0=0, y1=511,
+                                        tint=0.001),
+                'crop': util.CameraMode(x0=128, x1=383, y0=128, y1=383,
+                                        tint=0.001),
+                'full_long': util.CameraMode(x0=0, x1=511, y0=0, y1=511,
+                                             tint=0.01),
+        }
+        # yapf: enable
+
+    return lambda deps: BenchDCAMCamera('lcb_dcam', 'lcb_dcam', 'full', 0,
+                                        dependent_processes=deps)
+
+
+CAMERAS: typ.Dict[str, CameraSpecType] = {
+        'simulated': make_simulated,
+        'cred1': make_cred1,
+        'ocam': make_ocam,
+        'dcam': make_dcam,
+}
+
+
+def percentiles(times: typ.List[float]) -> typ.Tuple[float, float, float]:
+    if len(times) == 1:
+        return times[0], times[0], times[0]
+    pct = statistics.quantiles(times, n=100, method='inclusive')
+    return pct[49], pct[89], pct[98]
+
+
+def report(name: str, times: typ.List[float], extra: str = '') -> None:
+    p50, p90, p99 = percentiles(times)
+    print(f'{name:>28s}: {len(times):4d} runs - p50 {p50:7.3f} s - '
+          f'p90 {p90:7.3f} s - p99 {p99:7.3f} s {extra}')
+
+
+def bench_camera(make_camera: CameraFactoryType,
+                 args: argparse.Namespace) -> None:
+    inits: typ.List[float] = []
+    kills: typ.List[float] = []
+    changes: typ.Dict[typ.Tuple[typ.Any, typ.Any], typ.List[float]] = {}
+    plans: typ.Dict[typ.Tuple[typ.Any, typ.Any], str] = {}
+
+    cam: typ.Optional[BaseCamera] = None
+    for k in range(args.n):
+        dependent = util.DependentProcess(tmux_name='lcb_dep',
+                                          cli_cmd='sleep %u', cli_args=(3600, ),
+                                          kill_upon_create=False)
+
+        t_start = time.time()
+        cam = make_camera([dependent])
+        inits.append(time.time() - t_start)
+
+        if k == 0:
+            modes = list(cam.MODES)
+            for _ in range(args.rounds):
+                for mode_from, mode_to in itertools.permutations(modes, 2):
+                    if cam.current_mode_id != mode_from:
+                        cam.set_camera_mode(mode_from)
+                    plans[(mode_from,
+                           mode_to)] = cam._plan_mode_change(mode_to)[0].name
+                    t_start = time.time()
+                    cam.set_camera_mode(mode_to)
+                    changes.setdefault((mode_from, mode_to),
+                                       []).append(time.time() - t_start)
+
+        t_start = time.time()
+        cam.kill_taker_and_dependents()
+        kills.append(time.time() - t_start)
+
+    report('cold init', inits)
+    for (mode_from, mode_to), times in changes.items():
+        report(f'{mode_from} -> {mode_to}', times,
+               f'[{plans[(mode_from, mode_to)]}]')
+    report('kill_taker_and_dependents', kills)
+
+    if args.traces and cam is not None:
+        for index in range(len(cam.tracer.traces)):
+            print(cam.tracer.report(index))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cams', type=str, default=','.join(CAMERAS))
+    parser.add_argument('-n', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--serial-latency', type=float, default=0.005)
+    parser.add_argument('--traces', action='store_true')
+    args = parser.parse_args()
+
+    with standin_backend():
+        for name in args.cams.split(','):
+            try:
+                make_camera = CAMERAS[name](args)
+            except ImportError as exc:
+                print(f'{name}: skipped - {exc}')
+                continue
+            print(name)
+            bench_camera(make_camera, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+'''
+    ParamsSHMCamera get/set round trips: legacy 3-post sync vs. seq/ack,
+    and bursts of concurrent writes with and without coalescing.
+
+    Usage:
+        python -m camstack.bench.params_shm_bench [-n N] [--frame-period T]
+                                                  [--burst B]
+
+    T is the frame period of the fake backend [s] (default 0.1). The legacy
+    protocol costs ~3 frame periods per call, seq/ack doesn't depend on it.
+    B threads each set one parameter at once, as Pyro clients would.
+    The fake backend (camstack.bench.standin_taker.ParamsResponder) runs in
+    a thread. Creates and destroys throwaway SHMs in $MILK_SHM_DIR.
+'''
+import typing as typ
+
+import time
+import argparse
+import threading
+import statistics
+
+import numpy as np
+
+from camstack.cams.params_shm_backend import ParamsSHMCamera
+from camstack.bench.standin_taker import ParamsResponder
+from camstack.core.camstate import CameraState
+from camstack.core.coalescer import WriteCoalescer
+from camstack.core.rwlock import InstrumentedRWLock
+
+from pyMilk.interfacing.shm import SHM
+
+EXPOSURETIME = 0x001F0110  # Any key will do, this is DCAM's.
+
+
+def make_bare_camera(control_shm: SHM, ack: bool,
+                     window: float = 0.0) -> ParamsSHMCamera:
+    # Skip the constructor: no tmux, no taker.
+    cam = ParamsSHMCamera.__new__(ParamsSHMCamera)
+    cam.control_shm = control_shm
+    cam.control_lock = InstrumentedRWLock('prmbench control')
+    cam.control_shm_lock = InstrumentedRWLock('prmbench params SHM')
+    cam._params_seq = 0
+    cam._params_ack_supported = ack
+    cam._kw_batch_local = threading.local()
+    cam.state = CameraState()
+    cam.prm_write_coalescer = WriteCoalescer(
+            cam._prm_execute_writes, window, cam.control_shm_lock,
+            run_inline=lambda: cam.control_lock._is_owned())
+    return cam
+
+
+def time_calls(func: typ.Callable[[], typ.Any], n: int) -> typ.List[float]:
+    times = []
+    for _ in range(n):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def report(name: str, times: typ.List[float]) -> float:
+    pct = statistics.quantiles(times, n=100)
+    print(f'{name:>10s}: {len(times):5d} calls - p50 {pct[49] * 1e3:8.3f} ms - '
+          f'p90 {pct[89] * 1e3:8.3f} ms - p99 {pct[98] * 1e3:8.3f} ms')
+    return pct[49]
+
+
+def bench(name: str, frame_period: typ.Optional[float], n: int) -> float:
+    shm_name = f'prmbench_{name}_params_fb'
+    control_shm = SHM(shm_name, np.zeros((1, ), dtype=np.int32))
+    try:
+        responder = ParamsResponder(shm_name, frame_period=frame_period)
+        threading.Thread(target=responder.serve_forever, daemon=True).start()
+
+        cam = make_bare_camera(control_shm, ack=frame_period is None)
+        assert cam._prm_setvalue(0.01, None, EXPOSURETIME) == 0.01
+
+        def set_get() -> None:
+            cam._prm_setvalue(0.01, None, EXPOSURETIME)
+            cam._prm_getvalue(None, EXPOSURETIME)
+
+        return report(name, time_calls(set_get, n))
+    finally:
+        control_shm.destroy()
+
+
+def bench_burst(name: str, window: float, n: int, n_threads: int) -> float:
+    shm_name = f'prmbench_{name}_params_fb'
+    control_shm = SHM(shm_name, np.zeros((1, ), dtype=np.int32))
+    try:
+        responder = ParamsResponder(shm_name)
+        threading.Thread(target=responder.serve_forever, daemon=True).start()
+
+        cam = make_bare_camera(control_shm, ack=True, window=window)
+        keys = [EXPOSURETIME + k for k in range(n_threads)]
+        barrier = threading.Barrier(n_threads + 1)
+
+        def writer(key: int) -> None:
+            for _ in range(n):
+                barrier.wait()
+                assert cam._prm_setvalue(float(key), None, key) == key
+                barrier.wait()
+
+        threads = [
+                threading.Thread(target=writer, args=(key, ), daemon=True)
+                for key in keys
+        ]
+        for thread in threads:
+            thread.start()
+
+        def burst() -> None:
+            barrier.wait()  # Go...
+            barrier.wait()  # ... all done.
+
+        times = time_calls(burst, n)
+        for thread in threads:
+            thread.join()
+        coalescer = cam.prm_write_coalescer
+        print(f'{name:>10s}: {coalescer.n_writes} writes in '
+              f'{coalescer.n_transactions} transactions')
+        return report(name, times)
+    finally:
+        control_shm.destroy()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=50)
+    parser.add_argument('--frame-period', type=float, default=0.1)
+    parser.add_argument('--burst', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f'set + get, frame period {args.frame_period * 1e3:.1f} ms')
+    t_legacy = bench('legacy', args.frame_period, args.n)
+    t_ack = bench('seqack', None, args.n)
+    print(f'Speedup: x{t_legacy / t_ack:.1f}')
+
+    print(f'Bursts of {args.burst} concurrent sets')
+    t_serial = bench_burst('serial', 0.0, args.n, args.burst)
+    t_merged = bench_burst('coalesced',
+                           ParamsSHMCamera.PARAMS_SHM_COALESCE_WINDOW, args.n,
+                           args.burst)
+    print(f'Speedup: x{t_serial / t_merged:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+'''
+    redis_push_values against a fake, counting Redis:
+    full re-push every cycle vs. delta-only push.
+
+    Usage:
+        python -m camstack.bench.redis_push_bench [-n N] [--cam CLASS]
+
+    CLASS is a camstack.cams class path, default camstack.cams.cred1.Apapane.
+    Each cycle, a couple of keywords change (as DET-TMP, EXPTIME would);
+    the rest are static. Needs no Redis server, and no SHM.
+'''
+import typing as typ
+
+import json
+import random
+import argparse
+import importlib
+
+from camstack.cams.base import BaseCamera
+
+
+class FakePipeline:
+
+    def __init__(self, rdb: 'FakeRedis') -> None:
+        self.rdb = rdb
+        self.commands: typ.List[typ.Tuple[str, ...]] = []
+
+    def __enter__(self) -> 'FakePipeline':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.commands = []
+
+    def hset(self, key: str, field: str, value: typ.Any) -> None:
+        self.commands.append(('HSET', key, field, str(value)))
+
+    def publish(self, channel: str, message: str) -> None:
+        self.commands.append(('PUBLISH', channel, message))
+
+    def execute(self) -> None:
+        self.rdb.n_roundtrips += 1
+        for cmd in self.commands:
+            self.rdb.n_commands += 1
+            self.rdb.n_bytes += sum(len(c) for c in cmd)
+            if cmd[0] == 'HSET':
+                self.rdb.store.setdefault(cmd[1], {})[cmd[2]] = cmd[3]
+            else:
+                self.rdb.published.append(json.loads(cmd[2]))
+        self.commands = []
+
+
+class FakeRedis:
+
+    def __init__(self) -> None:
+        self.store: typ.Dict[str, typ.Dict[str, str]] = {}
+        self.published: typ.List[typ.Dict[str, typ.Any]] = []
+        self.n_roundtrips = 0
+        self.n_commands = 0
+        self.n_bytes = 0
+
+    def pipeline(self) -> FakePipeline:
+        return FakePipeline(self)
+
+
+class FakeSHM:
+
+    def __init__(self, keywords: typ.Dict[str, typ.Any]) -> None:
+        self.keywords = keywords
+
+    def get_keywords(self, comments: bool = False) -> typ.Dict[str, typ.Any]:
+        return dict(self.keywords)
+
+
+def run(cls: typ.Type[BaseCamera], n: int, delta: bool,
+        publish: bool) -> typ.Tuple[FakeRedis, typ.Dict[str, typ.Any]]:
+    random.seed(0)
+    cam = cls.__new__(cls)  # No constructor: no hardware.
+    cam.HAS_REDIS, cam.RDB = True, FakeRedis()
+    cam.REDIS_PUSH_ENABLED = True
+    cam.REDIS_PREFIX = cls.REDIS_PREFIX or 'x_T'
+    cam.REDIS_PUBLISH_CHANGES = publish
+    # Full push every cycle: this is what redis_push_values used to do.
+    cam.REDIS_FULL_PUSH_PERIOD = 3600.0 if delta else -1.0
+    cam._redis_last_pushed = {}
+    cam._redis_last_full_push = 0.0
+
+    shm = FakeSHM({kw: cls.KEYWORDS[kw][0] for kw in cls.KEYWORDS})
+    cam.camera_shm = shm
+    changing = [kw for kw in ('DET-TMP', 'EXPTIME') if kw in cls.KEYWORDS]
+
+    for _ in range(n):
+        for kw in changing:
+            shm.keywords[kw] = round(random.random(), 3)
+        cam.redis_push_values()
+
+    return cam.RDB, shm.keywords
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=1000)
+    parser.add_argument('--cam', type=str,
+                        default='camstack.cams.cred1.Apapane')
+    args = parser.parse_args()
+
+    module_name, class_name = args.cam.rsplit('.', 1)
+    cls = getattr(importlib.import_module(module_name), class_name)
+
+    full, final = run(cls, args.n, delta=False, publish=False)
+    delta, _ = run(cls, args.n, delta=True, publish=True)
+
+    # Consistency: the DB ends up holding the same thing.
+    assert full.store == delta.store
+    prefix = cls.REDIS_PREFIX or 'x_T'
+    expected = {
+            prefix + cls.KEYWORDS[kw][3]: str(val)
+            for kw, val in final.items() if cls.KEYWORDS[kw][3] is not None
+    }  # Last keyword wins if several share a redis key.
+    assert {rkey: delta.store[rkey]['value'] for rkey in expected} == expected
+    # And every change made it to the pub/sub channel.
+    assert len(delta.published) == args.n
+
+    for name, rdb in (('full push', full), ('delta push', delta)):
+        print(f'{name:>12s}: {rdb.n_roundtrips:6d} round trips - '
+              f'{rdb.n_commands / args.n:6.1f} commands/cycle - '
+              f'{rdb.n_bytes / args.n:8.1f} bytes/cycle')
+    print(f'Payload reduction: x{full.n_bytes / delta.n_bytes:.1f}')
+
+
+if __name__ == '__main__':
+    main()
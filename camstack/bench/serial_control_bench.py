@@ -0,0 +1,150 @@
+'''
+    Serial control paths of the EDT cameras, against the protocol emulators
+
+    Usage:
+        python -m camstack.bench.serial_control_bench [-n N] [--latency L]
+                                                      [--crop-latency C]
+
+    L is the emulated per-command serial latency [s] (default 5 ms),
+    C the one of "set cropping" commands (default 50 ms).
+    Runs on a plain Linux box - no framegrabber, no camera, no taker.
+'''
+import typing as typ
+
+import time
+import argparse
+import statistics
+
+from camstack.bench.serial_emulators import (SerialEmulator, CRED1Emulator,
+                                             CRED2Emulator, OCAM2KEmulator,
+                                             NUVUEmulator, make_emulated_camera)
+
+
+def time_calls(func: typ.Callable[[], typ.Any], n: int) -> typ.List[float]:
+    times = []
+    for _ in range(n):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def report(name: str, times: typ.List[float], emu: SerialEmulator,
+           n_calls_before: int) -> None:
+    pct = statistics.quantiles(times, n=100)
+    wire = (emu.n_calls - n_calls_before) / len(times)
+    print(f'{name:>24s}: {len(times):5d} calls - p50 {pct[49] * 1e3:8.3f} ms - '
+          f'p90 {pct[89] * 1e3:8.3f} ms - p99 {pct[98] * 1e3:8.3f} ms - '
+          f'{wire:5.2f} cmd/call')
+
+
+def run_ops(title: str, emu: SerialEmulator,
+            ops: typ.Dict[str, typ.Callable[[], typ.Any]], n: int) -> None:
+    print(title)
+    for name, op in ops.items():
+        n_calls_before = emu.n_calls
+        report(name, time_calls(op, n), emu, n_calls_before)
+
+
+def bench_cred1(args: argparse.Namespace) -> None:
+    from camstack.cams.cred1 import Apapane
+
+    emu = CRED1Emulator(latency=args.latency,
+                        latencies={'set cropping': args.crop_latency})
+    cam = make_emulated_camera(Apapane, emu, mode_id='CUSTOM')
+
+    def crop_with_retry() -> None:
+        emu.crop_ignore = 1  # First "set cropping" ignored: one retry.
+        cam._set_check_cropping(32, 159, 4, 131)
+
+    run_ops(
+            'CRED1 (Apapane)', emu, {
+                    'get_fps': cam.get_fps,
+                    'get_tint': cam.get_tint,
+                    'get_gain': cam.get_gain,
+                    'set_fps': lambda: cam.set_fps(1000.0),
+                    '_set_check_cropping': crop_with_retry,
+                    'poll_camera_for_keywords': cam.poll_camera_for_keywords,
+            }, args.n)
+
+
+def bench_cred2(args: argparse.Namespace) -> None:
+    from camstack.cams.cred2 import Palila
+
+    emu = CRED2Emulator(latency=args.latency,
+                        latencies={'set cropping': args.crop_latency})
+    cam = make_emulated_camera(Palila, emu, mode_id='CUSTOM')
+
+    run_ops(
+            'CRED2 (Palila)', emu, {
+                    'get_fps':
+                            cam.get_fps,
+                    'get_tint':
+                            cam.get_tint,
+                    'get_temperature':
+                            cam.get_temperature,
+                    'set_fps':
+                            lambda: cam.set_fps(500.0),
+                    '_set_check_cropping':
+                            lambda: cam._set_check_cropping(64, 191, 0, 127),
+                    'poll_camera_for_keywords':
+                            cam.poll_camera_for_keywords,
+            }, args.n)
+
+
+def bench_ocam(args: argparse.Namespace) -> None:
+    from camstack.cams.ocam import OCAM2K
+
+    emu = OCAM2KEmulator(latency=args.latency)
+    cam = make_emulated_camera(OCAM2K, emu)
+
+    run_ops(
+            'OCAM2K', emu, {
+                    'get_fps':
+                            cam.get_fps,
+                    'get_gain':
+                            cam.get_gain,
+                    'send_command_parsed':
+                            lambda: cam.send_command_parsed('temp'),
+                    'set_fps':
+                            lambda: cam.set_fps(2000.0),
+                    'poll_camera_for_keywords':
+                            cam.poll_camera_for_keywords,
+            }, args.n)
+
+
+def bench_nuvu(args: argparse.Namespace) -> None:
+    try:
+        # Sets up its file logging in ~/kalao-camstack at import.
+        from camstack.cams.nuvu import NUVU
+    except Exception as exc:
+        print(f'NUVU: skipped - cannot import camstack.cams.nuvu [{exc}]')
+        return
+
+    emu = NUVUEmulator(latency=args.latency)
+    cam = make_emulated_camera(NUVU, emu, mode_id=1)
+    cam._update_nuvu_config(retries=1)  # cfgdict, as in prepare_camera_for_size
+
+    run_ops(
+            'NUVU', emu, {
+                    'GetExposureTime': cam.GetExposureTime,
+                    'GetReadoutTime': cam.GetReadoutTime,
+                    'GetCCDTemperature': cam.GetCCDTemperature,
+                    'GetEMRawGain': cam.GetEMRawGain,
+                    'SetExposureTime': lambda: cam.SetExposureTime(1.0),
+            }, args.n)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--crop-latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    for bench in (bench_cred1, bench_cred2, bench_ocam, bench_nuvu):
+        bench(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+'''
+    In-process emulators of the camera serial protocols, for benchmarking the
+    control paths without hardware.
+
+    Each emulator has the send_command(cmd, base_timeout) signature of
+    hwmain's EdtInterfaceSerial and answers in the camera's own text format,
+    so that the parsing code of the camera classes runs unchanged.
+    They keep the state the setters change (fps, gain, cropping...)
+    and sleep a configurable latency per command:
+
+        emu = CRED1Emulator(latency=0.005, latencies={'set cropping': 0.2})
+        cam = make_emulated_camera(Apapane, emu)
+        cam.get_fps()
+
+    Cameras are built without their constructor: no framegrabber, no tmux,
+    no taker - see make_emulated_camera.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import re
+import time
+import threading
+
+if typ.TYPE_CHECKING:
+    from camstack.cams.edtcam import EDTCamera
+
+HandlerType = typ.Callable[[typ.Match[str]], str]
+
+
+class SerialEmulator:
+    '''
+        Base class: command dispatch, latency, call accounting.
+
+        Subclasses register (regex, handler) pairs in _handlers(); the first
+        full match wins. Handlers return the answer payload, which _frame()
+        wraps in the camera's prompt/terminator conventions.
+    '''
+
+    def __init__(self, latency: float = 0.0,
+                 latencies: typ.Optional[typ.Dict[str, float]] = None) -> None:
+        '''
+            latency: default per-command latency [s]
+            latencies: command prefix -> latency [s], longest prefix wins.
+        '''
+        self.latency = latency
+        self.latencies = {} if latencies is None else dict(latencies)
+
+        self.lock = threading.Lock()  # A serial line answers one at a time.
+        self.n_calls = 0
+        self.history: typ.List[str] = []
+
+        self._dispatch = [(re.compile(pattern), handler)
+                          for pattern, handler in self._handlers()]
+
+    def _handlers(self) -> typ.List[typ.Tuple[str, HandlerType]]:
+        raise NotImplementedError("Must be subclassed from the base class")
+
+    def _frame(self, payload: str) -> str:
+        return payload
+
+    def _unknown(self, cmd: str) -> str:
+        return ''
+
+    def latency_for(self, cmd: str) -> float:
+        best = ''
+        for prefix in self.latencies:
+            if cmd.startswith(prefix) and len(prefix) > len(best):
+                best = prefix
+        return self.latencies[best] if best else self.latency
+
+    def send_command(self, cmd: str, base_timeout: float = 100.) -> str:
+        cmd = cmd.strip()
+        with self.lock:
+            self.n_calls += 1
+            self.history.append(cmd)
+            delay = self.latency_for(cmd)
+            if delay > 0:
+                time.sleep(delay)
+            for regex, handler in self._dispatch:
+                match = regex.fullmatch(cmd)
+                if match is not None:
+                    return self._frame(handler(match))
+            return self._frame(self._unknown(cmd))
+
+
+class _FLIEmulator(SerialEmulator):
+    '''
+        Common ground of the First Light Imaging CRED1/CRED2 "fli-cli".
+
+        crop_ignore: number of "set cropping rows/columns" to ignore before
+        honoring them, to exercise _set_check_cropping retries.
+    '''
+    PROMPT = '\r\nfli-cli>'  # The 10 characters send_command chops off
+
+    def __init__(self, latency: float = 0.0,
+                 latencies: typ.Optional[typ.Dict[str, float]] = None, *,
+                 width: int = 320, height: int = 256, fps: float = 100.0,
+                 crop_ignore: int = 0) -> None:
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.ndr = 1
+        self.synchro = 'off'
+        self.cropping = 'off'
+        self.x0, self.x1, self.y0, self.y1 = 0, width - 1, 0, height - 1
+        self.crop_ignore = crop_ignore
+        self.status = 'operational'
+
+        SerialEmulator.__init__(self, latency, latencies)
+
+    def _frame(self, payload: str) -> str:
+        return payload + self.PROMPT
+
+    def _unknown(self, cmd: str) -> str:
+        return 'OK' if cmd.startswith('set ') else ''
+
+    def max_fps(self) -> float:
+        # Readout time scales with the pixel count and the NDR.
+        n_pix = (self.x1 - self.x0 + 1) * (self.y1 - self.y0 + 1)
+        return 3.0e8 / (n_pix + 1e4) / self.ndr
+
+    def _set_fps(self, m: typ.Match[str]) -> str:
+        self.fps = min(float(m[1]), self.max_fps())
+        return 'OK'
+
+    def _set_crop_axis(self, axis: str, lo: int, hi: int) -> str:
+        if self.crop_ignore > 0:
+            self.crop_ignore -= 1
+            return 'OK'
+        if axis == 'columns':
+            self.x0, self.x1 = lo, hi
+        else:
+            self.y0, self.y1 = lo, hi
+        self.fps = min(self.fps, self.max_fps())
+        return 'OK'
+
+    def _set_ndr(self, m: typ.Match[str]) -> str:
+        self.ndr = int(m[1])
+        self.fps = min(self.fps, self.max_fps())
+        return 'OK'
+
+    def _set_attr(self, attr: str) -> HandlerType:
+
+        def handler(m: typ.Match[str]) -> str:
+            setattr(self, attr, m[1])
+            return 'OK'
+
+        return handler
+
+    def _common_handlers(self) -> typ.List[typ.Tuple[str, HandlerType]]:
+        return [
+                (r'fps raw', lambda m: f'{self.fps:.3f}'),
+                (r'set fps ([-+.\deE]+)', self._set_fps),
+                (r'maxfps raw', lambda m: f'{self.max_fps():.3f}'),
+                (r'nbreadworeset raw', lambda m: str(self.ndr)),
+                (r'set nbreadworeset (\d+)', self._set_ndr),
+                (r'extsynchro raw', lambda m: self.synchro),
+                (r'set extsynchro (on|off)', self._set_attr('synchro')),
+                (r'set cropping (on|off)', self._set_attr('cropping')),
+                (r'status raw', lambda m: self.status),
+        ]
+
+
+class CRED1Emulator(_FLIEmulator):
+    '''
+        CRED1: cropping in 1-based 32-column blocks and 1-based rows.
+    '''
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.gain = 1
+        self.mode = 'globalresetcds'
+        self.cryo_temp = 80.0  # [K]
+        self.pressure = 1e-6  # [mbar]
+        self.water_temp = 20.0  # [C]
+
+        _FLIEmulator.__init__(self, *args, **kwargs)
+
+    def _set_crop(self, m: typ.Match[str]) -> str:
+        lo, hi = int(m[2]), int(m[3])
+        if m[1] == 'columns':
+            return self._set_crop_axis('columns', 32 * (lo - 1),
+                                       32 * (hi - 1) + 31)
+        return self._set_crop_axis('rows', lo - 1, hi - 1)
+
+    def _set_gain(self, m: typ.Match[str]) -> str:
+        self.gain = int(m[1])
+        return 'OK'
+
+    def _handlers(self) -> typ.List[typ.Tuple[str, HandlerType]]:
+        return self._common_handlers() + [
+                (r'cropping raw', lambda m:
+                 f'{self.cropping}:{self.x0 // 32 + 1}-{self.x1 // 32 + 1}:'
+                 f'{self.y0 + 1}-{self.y1 + 1}'),
+                (r'set cropping (columns|rows) (\d+)-(\d+)', self._set_crop),
+                (r'gain raw', lambda m: str(self.gain)),
+                (r'set gain (\d+)', self._set_gain),
+                (r'maxpossiblegain raw', lambda m: '100'),
+                (r'mode raw', lambda m: self.mode),
+                (r'set mode (\S+)', self._set_attr('mode')),
+                (r'temp cryostat diode raw', lambda m: f'{self.cryo_temp:.2f}'),
+                (r'pressure raw', lambda m: f'{self.pressure:.3e}'),
+                (r'temp water raw', lambda m: f'{self.water_temp:.2f}'),
+        ]
+
+
+class CRED2Emulator(_FLIEmulator):
+    '''
+        CRED2: cropping in 0-based pixels, tint distinct from fps.
+    '''
+
+    def __init__(self, *args, **kwargs) -> None:
+        kwargs.setdefault('width', 640)
+        kwargs.setdefault('height', 512)
+        self.tint = 0.001  # [s]
+        self.sensibility = 'high'
+        self.temps = [20.0, 30.0, 25.0, -40.0, 35.0]  # [C]
+        self.setpoint = -40.0  # [C]
+
+        _FLIEmulator.__init__(self, *args, **kwargs)
+
+    def max_tint(self) -> float:
+        return 1.0 / self.fps - 20e-6
+
+    def _set_crop(self, m: typ.Match[str]) -> str:
+        return self._set_crop_axis(m[1], int(m[2]), int(m[3]))
+
+    def _set_fps(self, m: typ.Match[str]) -> str:
+        _FLIEmulator._set_fps(self, m)
+        self.tint = min(self.tint, self.max_tint())
+        return 'OK'
+
+    def _set_tint(self, m: typ.Match[str]) -> str:
+        self.tint = min(float(m[1]), self.max_tint())
+        return 'OK'
+
+    def _set_setpoint(self, m: typ.Match[str]) -> str:
+        self.setpoint = float(m[1])
+        return 'OK'
+
+    def _handlers(self) -> typ.List[typ.Tuple[str, HandlerType]]:
+        return self._common_handlers() + [
+                (r'cropping raw', lambda m: f'{self.cropping}:{self.x0}-'
+                 f'{self.x1}:{self.y0}-{self.y1}'),
+                (r'set cropping (columns|rows) (\d+)-(\d+)', self._set_crop),
+                (r'tint raw', lambda m: f'{self.tint:.9f}'),
+                (r'set tint ([-+.\deE]+)', self._set_tint),
+                (r'maxtint raw', lambda m: f'{self.max_tint():.9f}'),
+                (r'sensibility raw', lambda m: self.sensibility),
+                (r'set sensibility (low|medium|high)',
+                 self._set_attr('sensibility')),
+                (r'temp raw', lambda m: ':'.join(f'{t:.2f}'
+                                                 for t in self.temps)),
+                (r'set temp snake ([-+.\d]+)', self._set_setpoint),
+                (r'temp snake setpoint raw', lambda m: f'{self.setpoint:.1f}'),
+        ]
+
+
+class OCAM2KEmulator(SerialEmulator):
+    '''
+        OCAM2K with "interface 0": answers are <code>[val][val]...
+        The same command without argument gets, with argument sets.
+    '''
+    MAX_FPS = {False: 2060, True: 3620}  # unbinned / binned
+
+    def __init__(self, latency: float = 0.0,
+                 latencies: typ.Optional[typ.Dict[str, float]] = None) -> None:
+        self.gain = 1
+        self.fps = 2000
+        self.binning = False
+        self.synchro = False
+        self.cooling = True
+        self.temp = -45.0
+        self.setpoint = -45.0
+
+        SerialEmulator.__init__(self, latency, latencies)
+
+    def _frame(self, payload: str) -> str:
+        return '<0>' + payload
+
+    def _unknown(self, cmd: str) -> str:
+        return '[0]'
+
+    def _set_gain(self, m: typ.Match[str]) -> str:
+        self.gain = max(1, min(int(m[1]), 600))
+        return f'[{self.gain}]'
+
+    def _set_fps(self, m: typ.Match[str]) -> str:
+        fps = int(m[1])
+        max_fps = self.MAX_FPS[self.binning]
+        if fps == 0:
+            fps = max_fps
+        if fps > max_fps:
+            return f'[-1][{self.fps}]'  # Retcode + current value
+        self.fps = fps
+        return f'[{self.fps}]'
+
+    def _set_binning(self, m: typ.Match[str]) -> str:
+        self.binning = m[1] == 'on'
+        self.fps = min(self.fps, self.MAX_FPS[self.binning])
+        return '[0]'
+
+    def _set_synchro(self, m: typ.Match[str]) -> str:
+        self.synchro = m[1] == 'on'
+        return '[0]'
+
+    def _set_temp(self, m: typ.Match[str]) -> str:
+        if m[1] in ('on', 'off'):
+            self.cooling = m[1] == 'on'
+        elif m[1] != 'reset':
+            self.setpoint = float(m[1])
+        return '[0]'
+
+    def _get_temp(self, m: typ.Match[str]) -> str:
+        # temp, 6 housekeeping values, setpoint*10, cooling, whatever.
+        vals = [
+                self.temp, 23, 13, 24, 0.1, 9, 12,
+                int(self.setpoint * 10),
+                int(self.cooling), 10594
+        ]
+        return ''.join(f'[{v}]' for v in vals)
+
+    def _handlers(self) -> typ.List[typ.Tuple[str, HandlerType]]:
+        return [
+                (r'gain', lambda m: f'[{self.gain}]'),
+                (r'gain (\d+)', self._set_gain),
+                (r'fps', lambda m: f'[{self.fps}]'),
+                (r'fps (\d+)', self._set_fps),
+                (r'binning (on|off)', self._set_binning),
+                (r'synchro (on|off)', self._set_synchro),
+                (r'temp', self._get_temp),
+                (r'temp (on|off|reset|-?\d+)', self._set_temp),
+        ]
+
+
+class NUVUEmulator(SerialEmulator):
+    '''
+        NUVU: "key:value" or bare value lines, then OK, then the prompt.
+
+        The commands for temperatures and gains are looked up by the camera
+        class in the config dictionary that "ld <n>" returns; we provide
+        our own (NUVU_CFG) and answer them.
+    '''
+    NUVU_CFG = {
+            'GetTempCtrlCmd': 'tmpctrl',
+            'GetTempCCDCmd': 'tmpccd',
+            'GetSetTempCCDCmd': 'tmpsetccd',
+            'SetTempCCDCmd': 'tmpsetccd %.1f',
+            'TempCCDRange': '-100,20',
+            'EMGetRawGainCmd': 'emg',
+            'EMSetRawGainCmd': 'emg %d',
+            'EMRawGainRange': '0,4095',
+            'AnalogicGetGainCmd': 'ag',
+            'AnalogicSetGainCmd': 'ag %d',
+            'AnalogicGainRange': '1,2',
+            'AnalogicGetOffsetCmd': 'ao',
+            'AnalogicSetOffsetCmd': 'ao %d',
+            'AnalogicOffsetRange': '-4000,4000',
+            'EmGainCalibrationTemperatureRange': '-65,-55',
+    }
+    RO_MODES = ['EM_20MHz_10MHz', 'CONV_1MHz', 'CONV_3MHz']
+
+    def __init__(self, latency: float = 0.0,
+                 latencies: typ.Optional[typ.Dict[str, float]] = None) -> None:
+        self.exposure = 1.0  # [ms]
+        self.waiting = 0.0  # [ms]
+        self.emgain = 1.0
+        self.emrawgain = 0
+        self.anagain = 1
+        self.offset = 0
+        self.binning = 1
+        self.ccd_temp = -60.0
+        self.ccd_setpoint = -60.0
+        self.registers = [0] * 15
+
+        SerialEmulator.__init__(self, latency, latencies)
+
+    def _frame(self, payload: str) -> str:
+        return (payload + '\n' if payload else '') + 'OK\n>'
+
+    def _readout_time(self) -> float:
+        return 1.2 / self.binning  # [ms]
+
+    def _ld(self, m: typ.Match[str]) -> str:
+        return '\n'.join(f'{k}:{v}' for k, v in self.NUVU_CFG.items())
+
+    def _setter(self, attr: str, cast: typ.Callable[[str], typ.Any],
+                fmt: str) -> HandlerType:
+
+        def handler(m: typ.Match[str]) -> str:
+            setattr(self, attr, cast(m[1]))
+            return fmt.format(getattr(self, attr))
+
+        return handler
+
+    def _ssv(self, m: typ.Match[str]) -> str:
+        self.registers[int(m[1])] = int(m[2])
+        return ''
+
+    def _handlers(self) -> typ.List[typ.Tuple[str, HandlerType]]:
+        emgain = 'emgain:{:.2f},1.00,5000.00'
+        return [
+                (r'ld',
+                 lambda m: '\n'.join(f'{i}:{ro}'
+                                     for i, ro in enumerate(self.RO_MODES))),
+                (r'ld \d+', self._ld),
+                (r'ls',
+                 lambda m: '\n'.join(f'{i}:{ro} mode'
+                                     for i, ro in enumerate(self.RO_MODES))),
+                (r'se', lambda m: f'{self.exposure}'),
+                (r'se ([-+.\deE]+)', self._setter('exposure', float, '{}')),
+                (r'sw', lambda m: f'{self.waiting}'),
+                (r'sw ([-+.\deE]+)', self._setter('waiting', float, '{}')),
+                (r'rsrt', lambda m: f'{self._readout_time()}'),
+                (r'seg', lambda m: emgain.format(self.emgain)),
+                (r'seg ([-+.\deE]+)', self._setter('emgain', float, emgain)),
+                (r'ss', lambda m: f'T:{self.ccd_temp},30.0,35.0,40.0,25.0'),
+                (r'cdsbinmode (\d+)',
+                 self._setter('binning', int, 'CDS binning mode:{}')),
+                (r'dsv 15',
+                 lambda m: '\n'.join(f'{i}:{v}'
+                                     for i, v in enumerate(self.registers))),
+                (r'ssv (\d+) (\d+)', self._ssv),
+                (r'tmpctrl', lambda m: '0:30.0'),
+                (r'tmpccd', lambda m: f'1:{self.ccd_temp}'),
+                (r'tmpsetccd', lambda m: f'1:{self.ccd_setpoint}'),
+                (r'tmpsetccd ([-+.\d]+)',
+                 self._setter('ccd_setpoint', float, '1:{}')),
+                (r'emg', lambda m: f'4:{self.emrawgain} raw gain'),
+                (r'emg (\d+)', self._setter('emrawgain', int, '4:{} raw gain')),
+                (r'ag', lambda m: f'Gain 1:{self.anagain}'),
+                (r'ag (\d+)', self._setter('anagain', int, 'Gain 1:{}')),
+                (r'ao', lambda m: f'CDS offset:{self.offset}'),
+                (r'ao (-?\d+)', self._setter('offset', int, 'CDS offset:{}')),
+        ]
+
+
+class KeywordSink:
+    '''
+        Stands for the camera SHM keyword area, for control path benchmarks
+        that don't need frames.
+    '''
+
+    def __init__(self) -> None:
+        self.kws: typ.Dict[str, typ.Tuple[typ.Any, str]] = {}
+
+    def update_keyword(self, key: str, value: typ.Any) -> None:
+        self.kws[key] = (value, self.kws.get(key, (None, ''))[1])
+
+    def get_keywords(self, comments: bool = False) -> typ.Dict[str, typ.Any]:
+        if comments:
+            return dict(self.kws)
+        return {k: v[0] for k, v in self.kws.items()}
+
+    def set_keywords(self, kws: typ.Dict[str, typ.Any]) -> None:
+        self.kws = {
+                k: v if isinstance(v, tuple) else (v, '')
+                for k, v in kws.items()
+        }
+
+
+def make_emulated_camera(cls: typ.Type[EDTCamera], emulator: SerialEmulator,
+                         mode_id: typ.Any = None) -> EDTCamera:
+    '''
+        Build an EDTCamera subclass instance talking to emulator,
+        skipping the constructor - no framegrabber, no tmux, no taker.
+        Enough for the serial control paths: getters/setters, polling,
+        prepare_camera_for_size / prepare_camera_finalize.
+    '''
+    from camstack.core.camstate import CameraState
+    from camstack.core.rwlock import InstrumentedRWLock
+    from camstack.core.serial_cache import SerialQueryCache
+    from camstack.core.utilities import CameraMode
+
+    cam = cls.__new__(cls)
+    cam.NAME = cam.STREAMNAME = f'emu_{cls.__name__.lower()}'
+    cam.control_lock = InstrumentedRWLock(f'{cam.NAME} control')
+    cam._kw_batch_local = threading.local()
+    cam.state = CameraState()
+    cam.camera_shm = KeywordSink()
+    cam.HAS_REDIS = False
+    cam.RDB = None
+    cam.dependent_processes = []
+
+    if mode_id is None:
+        mode_id = next(iter(cls.MODES)) if cls.MODES else 'CUSTOM'
+    if mode_id == 'CUSTOM':
+        cam.MODES = dict(cls.MODES)
+        cam.MODES['CUSTOM'] = CameraMode(x0=0, x1=127, y0=0, y1=127)
+    cam.current_mode_id = mode_id
+    cam.current_mode = cam.MODES[mode_id]
+    cam.width, cam.height = cam.current_mode.fgsize
+
+    cam.edt_iface = emulator
+    cam.serial_cache = SerialQueryCache(cls.SERIAL_CACHE_POLICY)
+
+    # Per-class state normally set up in the constructors
+    cam.synchro = False
+    cam.NDR = None
+    cam.is_cooling = True
+
+    return cam
@@ -0,0 +1,86 @@
+'''
+    Per-call latency: one process per remote call vs. the pooled RemoteShell
+
+    Usage:
+        python -m camstack.bench.ssh_pool_bench [-n N] [--host HOST]
+
+    Without --host, a local "sh" stands in for "ssh host", so the fresh-process
+    figures are a lower bound (no handshake, no auth).
+    With --host, both legs go through real ssh to HOST.
+'''
+from typing import Callable, List
+
+import time
+import argparse
+import statistics
+import subprocess
+
+from camstack.core.ssh_pool import RemoteShell
+
+COMMANDS = [
+        'pgrep -P 1',
+        'test -f ${MILK_SHM_DIR:-/milk/shm}/nonexistent.im.shm',
+        'cat /proc/net/tcp /proc/net/tcp6 2>/dev/null',
+]
+
+
+def time_calls(func: Callable[[str], object], n: int) -> List[float]:
+    times = []
+    for _ in range(n):
+        for command in COMMANDS:
+            t = time.perf_counter()
+            func(command)
+            times.append(time.perf_counter() - t)
+    return times
+
+
+def report(name: str, times: List[float]) -> None:
+    pct = statistics.quantiles(times, n=100)
+    p50, p90, p99 = pct[49] * 1e3, pct[89] * 1e3, pct[98] * 1e3
+    print(f'{name:>16s}: {len(times):5d} calls - p50 {p50:8.3f} ms - '
+          f'p90 {p90:8.3f} ms - p99 {p99:8.3f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100)
+    parser.add_argument('--host', type=str, default=None)
+    args = parser.parse_args()
+
+    if args.host is None:
+        fresh_argv: List[str] = ['sh', '-c']
+        shell = RemoteShell('localhost-standin', transport_argv=['sh'])
+    else:
+        fresh_argv = ['ssh', args.host]
+        shell = RemoteShell(args.host)
+
+    def fresh(command: str) -> None:
+        subprocess.run(fresh_argv + [command], stdout=subprocess.PIPE)
+
+    def pooled(command: str) -> None:
+        shell.run(command)
+
+    # Sanity: same outputs and return codes.
+    for command in ['echo "a  b" \'c\' $((1 + 1))', 'test -f /nonexistent']:
+        ref = subprocess.run(fresh_argv + [command], stdout=subprocess.PIPE)
+        res = shell.run(command)
+        assert (ref.returncode, ref.stdout) == (res.returncode, res.stdout)
+
+    report('fresh process', time_calls(fresh, args.n))
+    report('pooled shell', time_calls(pooled, args.n))
+
+    # Auto-reconnect: kill the transport under our feet.
+    assert shell.proc is not None
+    shell.proc.kill()
+    shell.proc.wait()
+    t = time.perf_counter()
+    shell.run('true', check=True)
+    print(f'Reconnect after transport death: '
+          f'{(time.perf_counter() - t) * 1e3:.3f} ms '
+          f'({shell.n_connects} connections total)')
+
+    shell.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+'''
+    Local stand-ins for the process side of the camera lifecycle:
+    tmux panes, pgrep and the framegrabber binaries.
+
+    Within standin_backend(), the camstack.core.tmux pane handles are
+    StandInPane objects. Command lines sent to them are run as plain
+    subprocesses - the framegrabber binaries being swapped for
+    camstack.bench.standin_taker - and C-c / C-z / "kill %" are delivered as
+    signals. Everything else (BaseCamera, DependentProcess, the real
+    kill_running and its signals, SHM waits) runs unchanged.
+
+        with standin_backend() as backend:
+            cam = SimulatedCam('simbench', 'simbench', mode_id=(256, 256))
+            ...
+        # All stand-in processes are killed on exit.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import sys
+import shlex
+import signal
+import contextlib
+import subprocess
+import logging as logg
+
+from camstack.bench.standin_taker import (STATE_DIR, FRAMEGEN_PATH, STANDINS as
+                                          TAKER_STANDINS)
+
+
+class StandInPane:
+    '''
+        Quacks like a camstack.core.tmux pane handle, runs one foreground
+        process at a time.
+    '''
+
+    def __init__(self, session_name: str, backend: StandInBackend) -> None:
+        self.session_name = session_name
+        self.backend = backend
+        self.proc: typ.Optional[subprocess.Popen[bytes]] = None
+        self.log_path = f'{STATE_DIR}/{session_name}.log'
+
+    def running_pid(self) -> typ.Optional[int]:
+        if self.proc is None or self.proc.poll() is not None:
+            return None
+        return self.proc.pid
+
+    def _signal(self, sig: int) -> None:
+        if self.running_pid() is not None:
+            assert self.proc is not None
+            try:
+                os.killpg(self.proc.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def send_keys(self, keys: str, enter: bool = True,
+                  suppress_history: bool = False) -> None:
+        keys = keys.strip()
+        if keys == 'C-c':
+            self._signal(signal.SIGINT)
+        elif keys == 'C-z':
+            self._signal(signal.SIGTSTP)
+        elif keys == 'kill %':
+            self._signal(signal.SIGKILL)
+            if self.proc is not None:
+                self.proc.wait()
+        elif self.running_pid() is not None:
+            # A tmux would feed that to the foreground process' stdin.
+            logg.warning(f'StandInPane {self.session_name}: busy, '
+                         f'ignoring "{keys}"')
+        elif enter:
+            self.proc = self.backend.popen(keys, self.log_path)
+
+    def cmd(self, command: str, *args: str) -> typ.Any:
+        raise NotImplementedError(f'StandInPane.cmd {command}: not emulated')
+
+
+class StandInSubprocess:
+    '''
+        Stands for the subprocess module in modules that run framegrabber
+        binaries directly (EDT initcam): swaps them for their stand-ins.
+    '''
+
+    def __init__(self, backend: StandInBackend) -> None:
+        self.backend = backend
+
+    def __getattr__(self, name: str) -> typ.Any:
+        return getattr(subprocess, name)
+
+    def run(self, args: typ.Any, *pargs, **kwargs) -> typ.Any:
+        if isinstance(args, (list, tuple)):
+            args = self.backend.translate([str(a) for a in args])
+        return subprocess.run(args, *pargs, **kwargs)
+
+
+class StandInBackend:
+
+    def __init__(self) -> None:
+        self.panes: typ.Dict[str, StandInPane] = {}
+        os.makedirs(STATE_DIR, exist_ok=True)
+
+    def translate(self, argv: typ.List[str]) -> typ.List[str]:
+        '''
+            Map a framegrabber binary command line to its stand-in.
+            Other command lines go through untouched.
+        '''
+        binary = os.path.basename(argv[0])
+        if binary == os.path.basename(FRAMEGEN_PATH):
+            return [sys.executable, FRAMEGEN_PATH] + argv[1:]
+        if binary in TAKER_STANDINS:
+            return [sys.executable, '-m', 'camstack.bench.standin_taker'] + argv
+        return argv
+
+    def popen(self, command_line: str,
+              log_path: str) -> subprocess.Popen[bytes]:
+        argv = shlex.split(command_line)
+        translated = self.translate(argv)
+        if translated is argv:
+            # Shell syntax (env assignments, pipes...) as tmux would.
+            translated = ['/bin/sh', '-c', 'exec ' + command_line]
+        with open(log_path, 'ab') as log_file:
+            return subprocess.Popen(translated, stdin=subprocess.DEVNULL,
+                                    stdout=log_file, stderr=subprocess.STDOUT,
+                                    start_new_session=True)
+
+    def find_or_create(self, session_name: str) -> StandInPane:
+        if session_name not in self.panes:
+            self.panes[session_name] = StandInPane(session_name, self)
+        return self.panes[session_name]
+
+    def find_pane_running_pid(self, pane: StandInPane) -> typ.Optional[int]:
+        return pane.running_pid()
+
+    def kill_all(self) -> None:
+        for pane in self.panes.values():
+            pane.send_keys('kill %')
+
+
+@contextlib.contextmanager
+def standin_backend() -> typ.Iterator[StandInBackend]:
+    '''
+        Patch the process side of camstack to the stand-ins.
+        Also disables Redis - no server needed.
+    '''
+    from camstack.core import tmux as tmux_util
+    from camstack.cams import base, edtcam, params_shm_backend
+
+    backend = StandInBackend()
+
+    def no_redis() -> typ.Tuple[typ.Any, bool]:
+        return None, False
+
+    # yapf: disable
+    patches: typ.List[typ.Tuple[typ.Any, str, typ.Any]] = [
+            (tmux_util, 'find_or_create', backend.find_or_create),
+            (tmux_util, 'find_pane_running_pid', backend.find_pane_running_pid),
+            (params_shm_backend, 'find_pane_running_pid',
+             backend.find_pane_running_pid),
+            (base, 'redis_check_enabled', no_redis),
+            (edtcam, 'subprocess', StandInSubprocess(backend)),
+    ]
+    # yapf: enable
+    saved = [(obj, attr, getattr(obj, attr)) for obj, attr, _ in patches]
+    for obj, attr, value in patches:
+        setattr(obj, attr, value)
+
+    os.environ.setdefault('SCEXAO_HW', STATE_DIR)  # Taker binary paths
+    try:
+        yield backend
+    finally:
+        backend.kill_all()
+        for obj, attr, value in saved:
+            setattr(obj, attr, value)
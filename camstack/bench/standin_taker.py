@@ -0,0 +1,196 @@
+'''
+    Stand-ins for the framegrabber binaries, for the lifecycle benchmarks.
+
+    Frames come from src/simcam_framegen (the SimulatedCam taker), run with
+    the size the real binary would have gotten from the framegrabber:
+
+        initcam -u U -c C -f CFG        Records CFG as the state of unit U
+                                        channel C - as the EDT board would.
+        hwacq-edttake -s NAME -u U -c C [-8] [-U] [-R] [...]
+                                        Frames of the size last initcam'd.
+        hwacq-dcamtake -s NAME -u N [-R] [...]
+                                        Frames of the size in the params SHM,
+                                        and answers the params SHM protocol
+                                        of ParamsSHMCamera, with seq/ack.
+
+    Usage:
+        python -m camstack.bench.standin_taker <binary name> [args...]
+'''
+import typing as typ
+
+import os
+import sys
+import time
+import runpy
+import getpass
+import threading
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FRAMEGEN_PATH = REPO_ROOT + '/src/simcam_framegen'
+STATE_DIR = f'/tmp/camstack_standin_{getpass.getuser()}'
+
+# Same as ParamsSHMCamera
+PARAMS_SHM_GET_MAGIC = 0x8000_0000
+PARAMS_SHM_SEQ_KEY = '_SEQ'
+PARAMS_SHM_ACK_KEY = '_SEQACK'
+
+
+def _flag(argv: typ.List[str], flag: str,
+          default: typ.Optional[str] = None) -> typ.Optional[str]:
+    if flag in argv:
+        return argv[argv.index(flag) + 1]
+    return default
+
+
+def _edt_cfg_path(unit: int, channel: int) -> str:
+    return f'{STATE_DIR}/edt_{unit}_{channel}.cfg'
+
+
+def run_framegen(stream_name: str, size_x: int, size_y: int, dtype: str,
+                 reuse_shm: bool) -> None:
+    sys.argv = [
+            FRAMEGEN_PATH, stream_name,
+            str(size_x),
+            str(size_y), '-t', dtype
+    ]
+    if reuse_shm:
+        sys.argv += ['-R']
+    runpy.run_path(FRAMEGEN_PATH, run_name='__main__')
+
+
+def initcam(argv: typ.List[str]) -> None:
+    unit, channel = int(_flag(argv, '-u', '0')), int(_flag(argv, '-c', '0'))
+    cfg_file = _flag(argv, '-f')
+    assert cfg_file is not None
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(cfg_file, 'r') as src, open(_edt_cfg_path(unit, channel),
+                                          'w') as dst:
+        dst.write(src.read())
+
+
+def edttake(argv: typ.List[str]) -> None:
+    unit, channel = int(_flag(argv, '-u', '0')), int(_flag(argv, '-c', '0'))
+    stream_name = _flag(argv, '-s')
+    assert stream_name is not None
+
+    # Last width: / height: directives win, as in initcam.
+    width, height = 0, 0
+    with open(_edt_cfg_path(unit, channel), 'r') as file:
+        for line in file:
+            linespl = line.split()
+            if len(linespl) >= 2 and linespl[0] == 'width:':
+                width = int(linespl[1])
+            if len(linespl) >= 2 and linespl[0] == 'height:':
+                height = int(linespl[1])
+
+    if '-8' in argv:  # (byte pair) -> (ushort) casting
+        width //= 2
+    dtype = 'u16' if '-U' in argv else 'i16'
+
+    run_framegen(stream_name, width, height, dtype, '-R' in argv)
+
+
+class ParamsResponder:
+    '''
+        The taker side of the ParamsSHMCamera params SHM protocol:
+        the camera writes hex API keys as keywords and posts n_keys,
+        we overwrite the values with the "camera" values and post.
+        Keys with PARAMS_SHM_GET_MAGIC are gets, others are sets.
+
+        The camera value of a key is whatever was last set.
+
+        frame_period None: seq/ack protocol - we echo the request sequence
+        number and post once, as soon as done.
+        Otherwise, legacy: like the C takers, requests are answered on the
+        next frame, and every frame posts (the camera waits for 3 posts).
+    '''
+
+    def __init__(self, shm_name: str,
+                 frame_period: typ.Optional[float] = None) -> None:
+        from pyMilk.interfacing.shm import SHM
+
+        self.shm = SHM(shm_name)
+        self.frame_period = frame_period
+        self.values: typ.Dict[int, float] = {}
+
+    def process(self) -> None:
+        reply: typ.Dict[str, typ.Any] = {}
+        seq = 0
+        for str_key, value in self.shm.get_keywords().items():
+            if str_key == PARAMS_SHM_SEQ_KEY:
+                seq = int(value)
+                continue
+            try:
+                key = int(str_key, 16)
+            except ValueError:
+                continue
+            if key & PARAMS_SHM_GET_MAGIC:
+                reply[str_key] = self.values.get(key & ~PARAMS_SHM_GET_MAGIC,
+                                                 0.0)
+            else:
+                self.values[key] = float(value)
+                reply[str_key] = float(value)
+        if self.frame_period is None:
+            # Also advertises the protocol in the restart feedback (seq 0).
+            reply[PARAMS_SHM_ACK_KEY] = seq
+        self.shm.reset_keywords(reply)
+
+    def acknowledge(self, n_posts: int = 1) -> None:
+        # We write 0 - the camera writes n_keys: we can tell our own posts.
+        for _ in range(n_posts):
+            self.shm.set_data(np.zeros((1, ), dtype=np.int32))
+
+    def serve_forever(self) -> None:
+        if self.frame_period is not None:
+            while True:
+                time.sleep(self.frame_period)
+                if int(self.shm.get_data()[0]) != 0:
+                    self.process()
+                self.acknowledge()
+
+        while True:
+            if self.shm.IMAGE.semtimedwait(self.shm.semID, 0.1) != 0:
+                continue
+            if int(self.shm.get_data()[0]) == 0:
+                continue
+            self.process()
+            self.acknowledge()
+
+
+def dcamtake(argv: typ.List[str]) -> None:
+    from hwmain.dcam import dcamprop
+
+    stream_name = _flag(argv, '-s')
+    assert stream_name is not None
+
+    # The camera has dumped the startup params before starting us.
+    responder = ParamsResponder(stream_name + '_params_fb')
+    responder.process()
+    width = int(responder.values[dcamprop.EProp.SUBARRAYHSIZE])
+    height = int(responder.values[dcamprop.EProp.SUBARRAYVSIZE])
+
+    threading.Thread(target=responder.serve_forever, daemon=True).start()
+
+    # Restart feedback, that _ensure_backend_restarted waits for.
+    # dcamusbtake gives it once the camera is up, a bit later.
+    time.sleep(0.1)
+    responder.acknowledge(1)
+
+    run_framegen(stream_name, width, height, 'u16', '-R' in argv)
+
+
+STANDINS: typ.Dict[str, typ.Callable[[typ.List[str]], None]] = {
+        'initcam': initcam,
+        'hwacq-edttake': edttake,
+        'hwacq-dcamtake': dcamtake,
+}
+
+if __name__ == '__main__':
+    try:
+        STANDINS[os.path.basename(sys.argv[1])](sys.argv[2:])
+    except KeyboardInterrupt:  # C-c from the stand-in tmux pane
+        pass
@@ -0,0 +1,79 @@
+'''
+    Outage of a supervised process: SIGKILL -> restarted and re-armed.
+
+    Usage:
+        python -m camstack.bench.supervisor_bench [-n N] [--procs P]
+
+    P "sleep" subprocesses stand in for the taker and dependents, and are
+    killed N times each, one at a time. The restart callback respawns them
+    on the spot: what we measure is the supervisor's own reaction time,
+    with pidfd + epoll and with the polling fallback.
+'''
+import typing as typ
+
+import time
+import argparse
+import subprocess
+
+from camstack.core.supervisor import ProcessSupervisor, RestartPolicy
+
+
+def bench_supervisor(n: int, n_procs: int, use_pidfd: bool) -> None:
+    procs: typ.Dict[str, subprocess.Popen[bytes]] = {}
+
+    def spawn(name: str) -> None:
+        procs[name] = subprocess.Popen(['sleep', '3600'])
+
+    def get_pid(name: str) -> typ.Optional[int]:
+        return procs[name].pid if procs[name].poll() is None else None
+
+    sup = ProcessSupervisor('bench')
+    sup._use_pidfd = use_pidfd
+    # No backoff, no giving up: we want the reaction time.
+    policy = RestartPolicy(backoff_initial=0.0, max_restarts=n + 1)
+    names = [f'proc{k}' for k in range(n_procs)]
+    for name in names:
+        spawn(name)
+        sup.watch(name, lambda name=name: get_pid(name),
+                  lambda name=name: spawn(name), policy)
+    sup.start()
+    for name in names:
+        sup.arm(name)
+
+    outages: typ.List[float] = []
+    for k in range(n):
+        for name in names:
+            n_restarts = sup.processes[name].n_restarts
+            t_start = time.monotonic()
+            procs[name].kill()
+            while (sup.processes[name].n_restarts == n_restarts or
+                   not sup.is_up(name)):
+                time.sleep(0.0005)
+            outages.append(time.monotonic() - t_start)
+
+    report = sup.report()
+    sup.stop()
+    for proc in procs.values():
+        proc.kill()
+        proc.wait()
+
+    outages.sort()
+    mode = ('polling', 'pidfd')[use_pidfd]
+    print(f'{mode:>8s}: {len(outages)} kills - '
+          f'p50 {outages[len(outages) // 2] * 1e3:7.2f} ms - '
+          f'max {outages[-1] * 1e3:7.2f} ms')
+    print(report)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=20)
+    parser.add_argument('--procs', type=int, default=3)
+    args = parser.parse_args()
+
+    bench_supervisor(args.n, args.procs, use_pidfd=True)
+    bench_supervisor(args.n, args.procs, use_pidfd=False)
+
+
+if __name__ == '__main__':
+    main()
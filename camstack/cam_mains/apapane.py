@@ -26,13 +26,14 @@ if __name__ == "__main__":
             cli_args=('apapane', MAGIC_HW_STR.HEIGHT, MAGIC_HW_STR.WIDTH),
             remote_host=scxconf.IP_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_APAPANE,
     )
-    tcp_recv.start_order = 1
+    tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name='apapane_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=('apapane', scxconf.IPP2P_SC6FROM5,
                       scxconf.TCPPORT_APAPANE),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
@@ -41,7 +42,7 @@ if __name__ == "__main__":
             cset='a_tcp',
             rtprio=46,
     )
-    tcp_send.start_order = 2
+    tcp_send.start_order = 1
     tcp_send.kill_order = 0
 
     # TODO register those 2 to the "Apapane" object and make csets for them ?
@@ -55,13 +56,14 @@ if __name__ == "__main__":
             cli_args=('apapane_raw', MAGIC_HW_STR.HEIGHT, MAGIC_HW_STR.WIDTH),
             remote_host=scxconf.IP_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_APAPANE_RAW,
     )
-    tcp_recv.start_order = 3
-    tcp_recv.kill_order = 4
+    tcp_recv_raw.start_order = 0
+    tcp_recv_raw.kill_order = 1
 
     tcp_send_raw = DependentProcess(
             tmux_name='apapane_raw_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=('apapane_raw', scxconf.IP_SC6,
                       scxconf.TCPPORT_APAPANE_RAW),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
@@ -70,8 +72,8 @@ if __name__ == "__main__":
             cset='a_tcp',
             rtprio=45,
     )
-    tcp_send.start_order = 4
-    tcp_send.kill_order = 3
+    tcp_send_raw.start_order = 1
+    tcp_send_raw.kill_order = 0
 
     utr_red = DependentProcess(
             tmux_name='apapane_utr',
@@ -81,9 +83,10 @@ if __name__ == "__main__":
             kill_upon_create=True,
             cset='a_utr',
             rtprio=45,
+            ready_shm='apapane',
     )
     utr_red.start_order = 0
-    utr_red.kill_order = 2
+    utr_red.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (receiver)
     zmq_recv = RemoteDependentProcess(
@@ -93,8 +96,8 @@ if __name__ == "__main__":
             remote_host=f'scexao-op@{scxconf.IP_SC2}',
             kill_upon_create=False,
     )
-    zmq_recv.start_order = 5
-    zmq_recv.kill_order = 6
+    zmq_recv.start_order = 0
+    zmq_recv.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (sender)
     zmq_send = DependentProcess(
@@ -103,8 +106,8 @@ if __name__ == "__main__":
             cli_args=(scxconf.IPLAN_SC5, scxconf.ZMQPORT_APAPANE, 'apapane'),
             kill_upon_create=True,
     )
-    zmq_send.start_order = 6
-    zmq_send.kill_order = 5
+    zmq_send.start_order = 1
+    zmq_send.kill_order = 0
 
     cam = Apapane('apapane', 'apapane_raw', unit=1, channel=0, mode_id=mode,
                   taker_cset_prio=('a_edt', 48), dependent_processes=[
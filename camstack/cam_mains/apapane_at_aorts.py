@@ -25,13 +25,14 @@ if __name__ == "__main__":
             cli_args=(),
             remote_host=scxconf.IP_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_APAPANE,
     )
-    tcp_recv.start_order = 1
+    tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name='apapane_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=('apapane', scxconf.IPLAN_SC6,
                       scxconf.TCPPORT_APAPANE),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
@@ -40,7 +41,7 @@ if __name__ == "__main__":
             cset='i_tcp',
             rtprio=46,
     )
-    tcp_send.start_order = 2
+    tcp_send.start_order = 1
     tcp_send.kill_order = 0
 
     '''
@@ -65,8 +66,8 @@ if __name__ == "__main__":
             remote_host=f'scexao-op@{scxconf.IP_SC2}',
             kill_upon_create=False,
     )
-    zmq_recv.start_order = 5
-    zmq_recv.kill_order = 6
+    zmq_recv.start_order = 0
+    zmq_recv.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (sender)
     zmq_send = DependentProcess(
@@ -75,8 +76,8 @@ if __name__ == "__main__":
             cli_args=(scxconf.IPLAN_AORTS, scxconf.ZMQPORT_APAPANE, 'apapane'),
             kill_upon_create=True,
     )
-    zmq_send.start_order = 6
-    zmq_send.kill_order = 5
+    zmq_send.start_order = 1
+    zmq_send.kill_order = 0
 
     cam = ApapaneAtAORTS('apapane', 'apapane', unit=0, channel=0, mode_id=mode,
                   taker_cset_prio=('i_edt', 48), dependent_processes=[
@@ -24,13 +24,14 @@ if __name__ == "__main__":
             cli_args=('glint', MAGIC_HW_STR.HEIGHT, MAGIC_HW_STR.WIDTH),
             remote_host=scxconf.IP_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_GLINT,
     )
     tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name='glint_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=('glint', scxconf.IPP2P_SC6FROM5, scxconf.TCPPORT_GLINT),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
             # Which is better for flushing TCP sockets
@@ -63,8 +64,8 @@ if __name__ == "__main__":
             remote_host=f'scexao-op@{scxconf.IP_SC2}',
             kill_upon_create=False,
     )
-    zmq_recv.start_order = 3
-    zmq_recv.kill_order = 4
+    zmq_recv.start_order = 0
+    zmq_recv.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (sender)
     zmq_send = DependentProcess(
@@ -73,8 +74,8 @@ if __name__ == "__main__":
             cli_args=(scxconf.IPLAN_SC5, scxconf.ZMQPORT_GLINT, 'glint'),
             kill_upon_create=True,
     )
-    zmq_send.start_order = 4
-    zmq_send.kill_order = 3
+    zmq_send.start_order = 1
+    zmq_send.kill_order = 0
 
     cam = GLINT(
             'glint',
@@ -25,13 +25,14 @@ if __name__ == "__main__":
             cli_args=('palila', MAGIC_HW_STR.HEIGHT, MAGIC_HW_STR.WIDTH),
             remote_host='scexao@' + scxconf.IPLAN_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_PALILA,
     )
-    tcp_recv.start_order = 1
+    tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name='palila_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=('palila', scxconf.IPP2P_SC6FROM5, scxconf.TCPPORT_PALILA),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
             # Which is better for flushing TCP sockets
@@ -39,7 +40,7 @@ if __name__ == "__main__":
             cset='p_tcp',
             rtprio=45,
     )
-    tcp_send.start_order = 2
+    tcp_send.start_order = 1
     tcp_send.kill_order = 0
 
     utr_red = DependentProcess(
@@ -52,9 +53,10 @@ if __name__ == "__main__":
             kill_upon_create=True,
             cset='p_utr',
             rtprio=45,
+            ready_shm='palila',
     )
     utr_red.start_order = 0
-    utr_red.kill_order = 2
+    utr_red.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (receiver)
     zmq_recv = RemoteDependentProcess(
@@ -64,8 +66,8 @@ if __name__ == "__main__":
             remote_host=f'scexao-op@{scxconf.IP_SC2}',
             kill_upon_create=False,
     )
-    zmq_recv.start_order = 4
-    zmq_recv.kill_order = 5
+    zmq_recv.start_order = 0
+    zmq_recv.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (sender)
     zmq_send = DependentProcess(
@@ -74,8 +76,8 @@ if __name__ == "__main__":
             cli_args=(scxconf.IPLAN_SC5, scxconf.ZMQPORT_PALILA, 'palila'),
             kill_upon_create=True,
     )
-    zmq_send.start_order = 5
-    zmq_send.kill_order = 4
+    zmq_send.start_order = 1
+    zmq_send.kill_order = 0
 
     cam = Palila(
             'palila', 'palila_raw', unit=3, channel=0, mode_id=mode,
@@ -26,9 +26,10 @@ if __name__ == "__main__":
             kill_upon_create=False,
             cset='o_work',
             rtprio=45,
+            ready_shm=name_stream,
     )
     ocam_decode.start_order = 0
-    ocam_decode.kill_order = 2
+    ocam_decode.kill_order = 1
 
     tcp_recv = RemoteDependentProcess(
             tmux_name=f'streamTCPreceive_{scxconf.TCPPORT_OCAM}',
@@ -39,13 +40,14 @@ if __name__ == "__main__":
             cli_args=(name_stream, MAGIC_HW_STR.HEIGHT, MAGIC_HW_STR.WIDTH),
             remote_host=scxconf.IP_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_OCAM,
     )
-    tcp_recv.start_order = 1
+    tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name='ocam_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=(name_stream, scxconf.IPP2P_SC6FROM5,
                       scxconf.TCPPORT_OCAM),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
@@ -54,7 +56,7 @@ if __name__ == "__main__":
             cset='o_work',
             rtprio=44,
     )
-    tcp_send.start_order = 2
+    tcp_send.start_order = 1
     tcp_send.kill_order = 0
 
     cam = OCAM2K('ocam', 'ocam2krc', name_stream, unit=0, channel=0,
@@ -22,13 +22,14 @@ if __name__ == "__main__":
             cli_args=(),
             remote_host=scxconf.IP_SC6,
             kill_upon_create=False,
+            ready_port=scxconf.TCPPORT_RAJNI,
     )
     tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name='simuquest_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=('simuquest', scxconf.IPP2P_SC6FROM5,
                       scxconf.TCPPORT_RAJNI),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
@@ -10,7 +10,6 @@ import logging
 # PYROSERVER
 import scxconf
 import scxconf.pyrokeys as pk
-from swmain.network.pyroserver_registerable import PyroServer
 from camstack.core.utilities import shellify_methods
 from argparse import ArgumentParser
 
@@ -45,13 +44,14 @@ def main():
                       TCP_PORT),
             remote_host='scexao@' + scxconf.IPLAN_SC6,
             kill_upon_create=False,
+            ready_port=TCP_PORT,
     )
     tcp_recv.start_order = 0
     tcp_recv.kill_order = 1
 
     tcp_send = DependentProcess(
             tmux_name=f'vcam{cam}_tcp',
-            cli_cmd='sleep 3; OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
+            cli_cmd='OMP_NUM_THREADS=1 shmimTCPtransmit %s %s %u',
             cli_args=(stream_name, scxconf.IPP2P_SC6FROM5, TCP_PORT),
             # Sender is kill_upon_create - rather than when starting. that ensures it dies well before the receiver
             # Which is better for flushing TCP sockets
@@ -70,8 +70,8 @@ def main():
             remote_host=f'lestat@{scxconf.IP_VAMPIRES}',
             kill_upon_create=False,
     )
-    zmq_recv.start_order = 2
-    zmq_recv.kill_order = 3
+    zmq_recv.start_order = 0
+    zmq_recv.kill_order = 1
 
     # PIPE over ZMQ into the LAN until we find a better solution (sender)
     zmq_send = DependentProcess(
@@ -80,8 +80,8 @@ def main():
             cli_args=(scxconf.IP_SC5, ZMQ_PORT, stream_name),
             kill_upon_create=True,
     )
-    zmq_send.start_order = 3
-    zmq_send.kill_order = 2
+    zmq_send.start_order = 1
+    zmq_send.kill_order = 0
 
     # special hack- if we're in FULL mode, do NOT stream TCP over LAN
     # because the orcas put out ~16 Gbps (this angers the LAN)
@@ -102,6 +102,8 @@ def main():
     shellify_methods(vcam, globals())
     globals()["cam"] = vcam
 
+    from swmain.network.pyroserver_registerable import PyroServer
+
     pyrokey = {1: pk.VCAM1, 2: pk.VCAM2}[cam]
     # start pyro server - you don't need a static port allocation (0 is magic for autoport)
     # Only the NS needs to be always located.
@@ -3,7 +3,7 @@
 
     This is for a EDT camera that we CANNOT control
     However, a teensy tiny bit better than the base EDTCamera
-    because we use the polling threads to monitor the frame size.
+    because we watch the stream keywords to follow the frame size.
 
     This is performed through the _FGDETS1, _FGDETS2 stream keywords
     that are obtained by polling framegrabber registers for
@@ -13,69 +13,198 @@
     One caveat is that pixel-per-line needs to be multiplied by the number of
     camera taps.
 '''
+import typing as typ
 
-import logging as logg
 import time
+import threading
+import logging as logg
 
 from camstack.cams.edtcam import EDTCamera
-
-from pyMilk.interfacing.shm import SHM
+from camstack.core import tracing
+from camstack.core import utilities as util
 
 
 class AutoDumbEDTCamera(EDTCamera):
     '''
         This class doesn't need to do much.
 
-        poll_camera_for_keywords should inspect _FGDETS* keywords
-        in the SHM.
+        A watcher thread reads the _FGDETS* keywords in the SHM every
+        FGDETS_WATCH_PERIOD. If they've changed - and stayed the same for
+        FGDETS_DEBOUNCE, as a remote crop change may show intermediate values -
+        it restarts the framegrabbing for the new size.
 
-        If they've changed, it should trigger a set_camera_size.
-        HOWEVER
-        Calling set_camera_mode from the thread will eventually try to join the thread.
-        Resulting in a deadlock.
-        So we need to change the camera mode without stopping and restarting the
-        polling thread. That's done by using the bypass_aux_thread flag in
-        _kill_taker_no_dependents and _start_taker_no_dependents.
+        The watcher is not the auxiliary thread, so the restart is free to stop
+        and join the auxiliary thread like any other mode change.
+        We poll rather than waiting on frames: with a mismatching FG config,
+        edttake may well be stuck in timeouts and post nothing.
 
         But there's no access to the serial port as a could-be shared resource.
         So I guess it's Okay?
     '''
 
-    def _start_taker_no_dependents(
-            self, reuse_shm: bool = False
-    ) -> None:  # type: ignore # signature change from superclass.
-        logg.debug('_start_taker_no_dependents @ AutoDumbEDTCamera')
-        # The first call is from the main thread, we need to start the thread this very first time.
-        EDTCamera._start_taker_no_dependents(
-                self, reuse_shm, bypass_aux_thread=self.thread is not None)
-
-    def _kill_taker_no_dependents(
-            self) -> None:  # type: ignore # signature change from superclass.
-        logg.debug('_kill_taker_no_dependents @ AutoDumbEDTCamera')
-        EDTCamera._kill_taker_no_dependents(self, bypass_aux_thread=True)
-
-    def poll_camera_for_keywords(self) -> None:
-        assert self.camera_shm
-
-        kw_dict = self.camera_shm.get_keywords()
-
-        detected_height = kw_dict['_FGDETS1']  # Lines per frame
-        detected_width = kw_dict['_FGDETS2'] * self.pdv_taps  # px/line * n_taps
+    INTERACTIVE_SHELL_METHODS = ['print_geometry_stats'] + \
+        EDTCamera.INTERACTIVE_SHELL_METHODS
+
+    # Difference from the superclass: we don't wait forever til a semaphore is posted
+    # Otherwise, we get stuck if the edttake is stuck into perpetual timeouts
+    SHM_FIRST_FRAME_TIMEOUT = 5.0
+
+    FGDETS_WATCH_PERIOD = 0.02  # [s]
+    FGDETS_DEBOUNCE = 0.1  # [s]
+    FGDETS_RETRY_BACKOFF = 1.0  # [s] - after a failed restart
+
+    def __init__(self, name: str, stream_name: str,
+                 mode_id_or_hw: util.ModeIDorHWType, pdv_unit: int,
+                 pdv_channel: int, pdv_basefile: str, no_start: bool = False,
+                 taker_cset_prio: util.CsetPrioType = ('system', None),
+                 dependent_processes: typ.List[util.DependentProcess] = []
+                 ) -> None:
+
+        self.fgdets_event = threading.Event()
+        self.fgdets_thread: typ.Optional[threading.Thread] = None
+        # Detection of a size change -> restarted at the new size
+        self.geometry_recovery_histogram = util.LatencyHistogram()
+        self.n_geometry_restarts = 0
+        self.n_geometry_failures = 0
+
+        EDTCamera.__init__(self, name, stream_name, mode_id_or_hw, pdv_unit,
+                           pdv_channel, pdv_basefile, no_start=no_start,
+                           taker_cset_prio=taker_cset_prio,
+                           dependent_processes=dependent_processes)
+
+        # Only now: a restart must not race the end of the constructor.
+        if not no_start:
+            self.start_fgdets_watcher()
+
+    def release(self) -> None:
+        self.stop_fgdets_watcher()
+        EDTCamera.release(self)
+
+    def start_fgdets_watcher(self) -> None:
+        logg.info('start_fgdets_watcher @ AutoDumbEDTCamera')
+        self.fgdets_event = threading.Event()
+        self.fgdets_thread = threading.Thread(target=self._fgdets_watch_run,
+                                              name=f'{self.NAME}_fgdets',
+                                              daemon=True)
+        self.fgdets_thread.start()
+
+    def stop_fgdets_watcher(self) -> None:
+        thread = self.fgdets_thread
+        if thread is None:
+            return
+        logg.info('stop_fgdets_watcher @ AutoDumbEDTCamera')
+        self.fgdets_event.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        self.fgdets_thread = None
+
+    def _read_fg_geometry(self) -> typ.Optional[typ.Tuple[int, int]]:
+        '''
+            (height, width) the FG detects. None if unknown, or if the
+            control lock is busy - that's a mode change, check again later.
+        '''
+        if not self.control_lock.reader.acquire(blocking=False):
+            return None
+        try:
+            shm = getattr(self, 'camera_shm', None)
+            if shm is None:
+                return None
+            kw_dict = shm.get_keywords()
+        finally:
+            self.control_lock.reader.release()
+
+        detected_height = kw_dict.get('_FGDETS1', 0)  # Lines per frame
+        # px/line * n_taps
+        detected_width = kw_dict.get('_FGDETS2', 0) * self.pdv_taps
+
+        # Zero-sizes tend to burn milk, so let's avoid them.
+        if detected_height <= 0 or detected_width <= 0:
+            return None
+        return detected_height, detected_width
+
+    def _fgdets_watch_run(self) -> None:
+        candidate: typ.Optional[typ.Tuple[int, int]] = None
+        t_detected, t_candidate = 0.0, 0.0
+
+        while not self.fgdets_event.wait(self.FGDETS_WATCH_PERIOD):
+            try:
+                detected = self._read_fg_geometry()
+            except Exception as e:
+                logg.error(f'AutoDumbEDTCamera: reading _FGDETS failed [{e}]')
+                detected = None
+
+            if detected is None:
+                continue
+            if detected == (self.height, self.width):
+                candidate = None
+                continue
+
+            now = time.monotonic()
+            if candidate is None:
+                t_detected = now
+            if detected != candidate:
+                candidate, t_candidate = detected, now
+            if now - t_candidate < self.FGDETS_DEBOUNCE:
+                continue
 
-        if (((detected_height != self.height) or
-             (detected_width != self.width)) and (detected_height > 0) and
-            (detected_width > 0)):
             # Dang, the frame size has change behind our backs!
-            # Just be chill about it yo.
-
-            # Zero-sizes tend to burn milk, so let's avoid them.
+            try:
+                self._restart_for_geometry(*candidate)
+            except Exception as e:
+                self.n_geometry_failures += 1
+                logg.error(f'AutoDumbEDTCamera: restart for {candidate} '
+                           f'failed [{e}]')
+                self.fgdets_event.wait(self.FGDETS_RETRY_BACKOFF)
+            else:
+                self.n_geometry_restarts += 1
+                self.geometry_recovery_histogram.record(time.monotonic() -
+                                                        t_detected)
+            candidate = None
+
+    @tracing.traced()
+    def _restart_for_geometry(self, height: int, width: int) -> None:
+        '''
+            What set_camera_size would do, minus what doesn't depend on
+            the geometry: no camera to configure, and the SHM is grabbed
+            and keywords filled only once.
+        '''
+        with self.control_lock.write():
+            logg.warning(f"AutoDumbEDTCamera: changing camera mode from "
+                         f"({self.height},{self.width}) to ({height},{width})")
+            t_start = time.time()
+
+            self.MODES['CUSTOM'] = util.CameraMode(x0=0, x1=width - 1, y0=0,
+                                                   y1=height - 1)
+            self.current_mode_id = 'CUSTOM'
+            self.current_mode = self.MODES['CUSTOM']
+            self.width, self.height = self._fg_size_from_mode('CUSTOM')
+
+            with tracing.span('kill_taker_and_dependents'):
+                self.kill_taker_and_dependents()
+            with tracing.span('init_framegrab_backend'):
+                self.init_framegrab_backend()
+            with tracing.span('prepare_camera_for_size'):
+                self.prepare_camera_for_size()
+            # The taker start also grabs the SHM, fills keywords,
+            # and prepare_camera_finalize
+            with tracing.span('start_frame_taker_and_dependents'):
+                self.start_frame_taker_and_dependents()
+
+            logg.info(f'_restart_for_geometry @ AutoDumbEDTCamera: '
+                      f'({height},{width}) in {time.time() - t_start:.2f} s')
 
-            # Nah just nuke it.
-            logg.warning(
-                    f"AutoDumbEDTCamera: changing camera mode from "
-                    f"({self.height},{self.width}) to ({detected_height},{detected_width})"
-            )
-            self.set_camera_size(detected_height, detected_width)
+    def poll_camera_for_keywords(self) -> None:
+        # Size changes are the watcher's job. We just keep it alive.
+        thread = self.fgdets_thread
+        if thread is not None and not thread.is_alive():
+            logg.critical('AutoDumbEDTCamera: _FGDETS watcher died, '
+                          'restarting it.')
+            self.start_fgdets_watcher()
+
+    def print_geometry_stats(self) -> None:
+        print(f'geometry restarts {self.n_geometry_restarts} - '
+              f'failures {self.n_geometry_failures} - detection to recovered: '
+              f'{self.geometry_recovery_histogram.summary()}')
 
     def _fill_keywords(self) -> None:
         EDTCamera._fill_keywords(self)
@@ -85,21 +214,3 @@ class AutoDumbEDTCamera(EDTCamera):
         self._set_formatted_keyword('FRATE', -1.0)
         self._set_formatted_keyword('DETGAIN', -1.0)
         self._set_formatted_keyword('GAIN', -1.0)
-
-    def _get_SHM(self) -> SHM:
-
-        while True:
-            # In case the SHM doesn't exist yet
-            try:
-                shm = SHM(self.STREAMNAME, symcode=0)
-                break
-            except:
-                time.sleep(0.1)
-
-        # Difference from the superclass: we don't wait forever til a semaphore is posted
-        # Otherwise, we get stuck if the edttake is stuck into perpetual timeouts
-        shm.IMAGE.semflush(shm.semID)
-        # Rather than a forever-wait. No biggie cause edt fgrab start is pretty quick.
-        time.sleep(5.0)
-
-        return shm
@@ -4,12 +4,22 @@ from typing import Optional as t_Op
 
 import os
 import time
-import subprocess
+import json
 import threading
+import functools
+import contextlib
 import logging as logg
 
 from camstack.core import utilities as util
 from camstack.core import tmux as tmux_util
+from camstack.core import tracing
+from camstack.core.aux_scheduler import AuxScheduler
+from camstack.core.camstate import CameraState
+from camstack.core.lkg import LKGStore, same_value
+from camstack.core.proctree import RTApplier
+from camstack.core.rwlock import InstrumentedRWLock
+from camstack.core.shmwait import ShmDirWatch, shm_file_path
+from camstack.core.supervisor import ProcessSupervisor, RestartPolicy
 from camstack.core.wcs import wcs_dummy_dict
 
 try:
@@ -23,6 +33,55 @@ except:
 
 from pyMilk.interfacing.isio_shmlib import SHM
 
+SHM_SEM_WAIT_CHUNK = 0.1  # [s] - How often we check for a SHM re-creation.
+
+# Set to 1 to adopt the taker and dependents left running by a previous
+# camera server, rather than restarting them - see _attach_running_taker.
+# e.g. CAMSTACK_ATTACH=1 python -im camstack.cam_mains.apapane
+ATTACH_ENV_VAR = 'CAMSTACK_ATTACH'
+
+
+def _sem_timedwait(shm: SHM, timeout: float) -> bool:
+    '''
+        Blocking wait on the SHM semaphore. True if a post was consumed.
+    '''
+    if hasattr(shm.IMAGE, 'semtimedwait'):
+        return shm.IMAGE.semtimedwait(shm.semID, timeout) == 0
+
+    # Older pyMilk: no timed wait exposed. semtrywait is truthy when not posted.
+    t_end = time.time() + timeout
+    while shm.IMAGE.semtrywait(shm.semID):
+        if time.time() > t_end:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+KWFormatterType: typ.TypeAlias = typ.Callable[[typ.Any], typ.Any]
+
+
+def _compile_kw_formatter(fmt: str) -> KWFormatterType:
+    '''
+        Turn a KEYWORDS printf format into a formatter/caster callable,
+        so that we decide what to do with fmt only once.
+    '''
+    if fmt == 'BOOLEAN':
+
+        def format_bool(value: typ.Any) -> str:
+            assert isinstance(value, bool)  # mypy happy assert
+            return MAGIC_BOOL_STR.TUPLE[value]
+
+        return format_bool
+
+    if fmt[-1] == 'd':
+        return lambda value: int(fmt % value)
+    if fmt[-1] == 'f':
+        return lambda value: float(fmt % value)
+    if fmt[-1] == 's':  # string
+        return lambda value: fmt % value
+    return lambda value: value
+
+
 # TODO: class decorator that implements a camera-action-lock
 ''' TODO
 Blocking/wait calls for basic set/gets (will also make the polling thread safer)
@@ -47,6 +106,27 @@ class BaseCamera:
 
     REDIS_PUSH_ENABLED: bool = False
     REDIS_PREFIX: t_Op[str] = None
+    # Also publish {redis_key: value} of changed keys on REDIS_CHANGES_CHANNEL
+    REDIS_PUBLISH_CHANGES: bool = False
+    REDIS_CHANGES_CHANNEL: str = 'camstack_kw_changes'
+    # Re-push everything every so often, in case the DB lost or overwrote keys.
+    REDIS_FULL_PUSH_PERIOD: float = 60.0  # [s]
+
+    # Default period of the auxiliary thread tasks, see _register_aux_tasks
+    AUX_POLL_PERIOD: float = 10.0  # [s]
+
+    # What to do when the taker / a dependent dies - see core.supervisor
+    TAKER_RESTART_POLICY = RestartPolicy()
+    DEPENDENTS_RESTART_POLICY = RestartPolicy()
+
+    # Last-known-good configuration, see core.lkg and _apply_settings.
+    # Bump LKG_VERSION when setters change meaning: older snapshots are ignored.
+    LKG_VERSION: int = 1
+    # setter name -> getter name: probes validating the snapshot on cold start.
+    LKG_PROBES: typ.Dict[str, str] = {}
+    # setter name -> setters whose value it may change on the camera,
+    # and whose snapshot entries it drops. Mind SERIAL_CACHE_POLICY.
+    LKG_COUPLING: typ.Dict[str, typ.Tuple[str, ...]] = {}
 
     INTERACTIVE_SHELL_METHODS = [
             'close',
@@ -55,6 +135,11 @@ class BaseCamera:
             '_stop',
             'set_camera_mode',
             'set_camera_size',
+            'print_aux_stats',
+            'print_lock_stats',
+            'print_supervisor_stats',
+            'print_lkg_stats',
+            'dump_traces',
     ]
 
     MODES: typ.Dict[util.ModeIDType, util.CameraMode] = {}
@@ -103,6 +188,10 @@ class BaseCamera:
 
     N_WCS: int = 0  # Number of WCS keyword sets to allocate on top of the dictionary above.
 
+    # How long _get_SHM waits for the first frame after (re)start. None: forever.
+    SHM_FIRST_FRAME_TIMEOUT: t_Op[float] = None
+
+    @tracing.traced('init')
     def __init__(self, name: str, stream_name: str,
                  mode_id_or_hw: util.ModeIDorHWType, no_start: bool = False,
                  taker_cset_prio: util.CsetPrioType = ('system', None),
@@ -116,10 +205,27 @@ class BaseCamera:
         self.NAME = name
         self.STREAMNAME = stream_name
 
+        # Shared: getters, live setters, aux polls. Exclusive: mode changes,
+        # taker and dependents restarts.
+        self.control_lock = InstrumentedRWLock(f'{name} control')
+
+        # Ring of recent lifecycle traces - already made by @traced
+        self.tracer.name = name
+
+        # Pending formatted keywords of the thread inside keyword_batch()
+        self._kw_batch_local = threading.local()
+        # Last known parameter values - see get_state_snapshot
+        self.state = CameraState()
+        # Last-known-good configuration, persisted by the @lkg_setter setters
+        self.lkg = LKGStore(name, type(self).__name__, self.LKG_VERSION)
+
         #=======================
         # HIT REDIS DB?
         #=======================
         self.RDB, self.HAS_REDIS = redis_check_enabled()
+        # redis key -> value, as of our last successful push
+        self._redis_last_pushed: typ.Dict[str, typ.Any] = {}
+        self._redis_last_full_push = 0.0
 
         if isinstance(mode_id_or_hw, tuple):  # Allow (width, height) fallback
             width, height = mode_id_or_hw
@@ -135,13 +241,23 @@ class BaseCamera:
         self.dependent_processes = dependent_processes
         self.dependent_processes_manager = util.DependentMultiManager(
                 dependent_processes)
-        self.dependent_processes_manager.initialize_tmux()
+        attach = os.environ.get(ATTACH_ENV_VAR, '0') not in ('', '0')
+        self.dependent_processes_manager.initialize_tmux(stop=not attach)
+
+        # Restarts the taker and dependents when they die - see _supervise
+        self.supervisor = ProcessSupervisor(name)
+        self._supervise()
 
         self.taker_cset_prio = taker_cset_prio
+        self.taker_rt_applier: t_Op[RTApplier] = None
+        if taker_cset_prio[1] is not None:
+            self.taker_rt_applier = RTApplier(*taker_cset_prio)
 
         # Thread:
         self.event: t_Op[threading.Event] = None
         self.thread: t_Op[threading.Thread] = None
+        # Tasks are registered upon first thread start. Stats survive restarts.
+        self.aux_scheduler = AuxScheduler()
 
         #=======================
         # TMUX TAKE SESSION MGMT
@@ -151,19 +267,29 @@ class BaseCamera:
         # If this session dies, we'll have to call this again
         self.take_tmux_name: t_Op[str] = None
         self.taker_tmux_command: t_Op[str] = None
-        self.kill_taker_and_dependents()
+
+        if attach:
+            with tracing.span('_attach_running_taker'):
+                if self._attach_running_taker():
+                    return
+            logg.warning('Could not attach to a running taker - cold start.')
+
+        with tracing.span('kill_taker_and_dependents'):
+            self.kill_taker_and_dependents()
 
         #============================================
         # PREPARE THE FRAMEGRABBER AND OPEN INTERFACE
         #============================================
         # This is backend-dependent
-        self.init_framegrab_backend()
+        with tracing.span('init_framegrab_backend'):
+            self.init_framegrab_backend()
 
         # ====================
         # PREPARE THE CAMERA
         # ====================
         # Now we have a serial link, in case prepare camera needs it.
-        self.prepare_camera_for_size()
+        with tracing.span('prepare_camera_for_size'):
+            self.prepare_camera_for_size()
 
         if no_start:
             # We need to quit now
@@ -176,25 +302,144 @@ class BaseCamera:
         # - we only start the take because we want the keywords to be populated ASAP
         # and starting dependents is the long part.
         # ====================
-        self._start_taker_no_dependents()
+        with tracing.span('_start_taker_no_dependents'):
+            self._start_taker_no_dependents()
 
         # =================
         # ALLOCATE KEYWORDS
         # =================
         self.camera_shm: t_Op[SHM] = None
-        self.grab_shm_fill_keywords()
-        self.redis_push_values()
+        with tracing.span('grab_shm_fill_keywords'):
+            self.grab_shm_fill_keywords()
+        with tracing.span('redis_push_values'):
+            self.redis_push_values()
         # Maybe we can use a class variable as well to define what the expected keywords are ?
 
         # ================
         # START DEPENDENTS
         # ================
-        self.start_frame_taker_and_dependents(skip_taker=True)
+        with tracing.span('start_frame_taker_and_dependents'):
+            self.start_frame_taker_and_dependents(skip_taker=True)
 
         # =================================
         # FINALIZE A FEW DETAILS POST-START
         # =================================
-        self.prepare_camera_finalize()
+        with tracing.span('prepare_camera_finalize'):
+            self.prepare_camera_finalize()
+
+    def _attach_running_taker(self) -> bool:
+        '''
+            Adopt the taker and dependents that a previous camera server left
+            running, without touching the camera nor the stream:
+            - the taker must run in its tmux, and its SHM exist.
+            - the running mode is the one the SHM keywords describe -
+                if not the requested one, we take it anyway.
+            - the backend must support attach_framegrab_backend.
+            - then we fill keywords, re-apply cset/RT prio, start the
+                dependents that aren't running, and the auxiliary thread.
+
+            False if there's nothing consistent to attach to - nothing
+            was killed, the caller proceeds with a cold start.
+        '''
+        self.take_tmux_name = f'{self.NAME}_fgrab'
+        self.take_tmux_pane = tmux_util.find_or_create(self.take_tmux_name)
+        taker_pid = tmux_util.find_pane_running_pid(self.take_tmux_pane)
+        if taker_pid is None:
+            logg.warning(f'_attach_running_taker: no taker in '
+                         f'{self.take_tmux_name}.')
+            return False
+        if not os.path.isfile(shm_file_path(self.STREAMNAME)):
+            logg.warning(f'_attach_running_taker: no SHM {self.STREAMNAME}.')
+            return False
+
+        with ShmDirWatch(self.STREAMNAME) as watch:
+            shm = self._open_SHM_when_created(watch)
+        mode_id = self._mode_from_shm_keywords(shm.get_keywords())
+        if mode_id is None:
+            logg.warning(f'_attach_running_taker: SHM {self.STREAMNAME} '
+                         f'keywords describe no usable mode.')
+            return False
+        if mode_id != self.current_mode_id:
+            logg.warning(f'_attach_running_taker: running mode is {mode_id}, '
+                         f'not {self.current_mode_id}. Keeping it.')
+        self.current_mode_id = mode_id
+        self.current_mode = self.MODES[mode_id]
+        self.width, self.height = self._fg_size_from_mode(mode_id)
+
+        try:
+            with tracing.span('attach_framegrab_backend'):
+                if not self.attach_framegrab_backend():
+                    return False
+        except Exception as e:
+            logg.error(f'_attach_running_taker: attach_framegrab_backend '
+                       f'failed [{e}]')
+            return False
+
+        # Point of no return.
+        if self.taker_rt_applier is not None:
+            self.taker_rt_applier.apply(taker_pid)
+        self.supervisor.arm('taker')
+
+        self.camera_shm = shm
+        with tracing.span('_fill_keywords'), self.keyword_batch():
+            self._fill_keywords()
+        with tracing.span('redis_push_values'):
+            self.redis_push_values()
+
+        for dep_proc in sorted(self.dependent_processes,
+                               key=lambda d: d.start_order):
+            dep_proc.cli_args = self._dependent_cli_args_for_mode(
+                    dep_proc, mode_id)
+            if dep_proc.is_running():
+                dep_proc.make_children_rt()
+            else:
+                logg.warning(f'_attach_running_taker: dependent '
+                             f'{dep_proc.tmux_name} not running, starting it.')
+                with tracing.span('dependent.start', name=dep_proc.tmux_name):
+                    dep_proc.start_and_wait_ready()
+            self.supervisor.arm(dep_proc.tmux_name)
+
+        self.start_auxiliary_thread()
+        logg.info(f'_attach_running_taker: attached to taker {taker_pid} - '
+                  f'mode {mode_id}.')
+        return True
+
+    def _mode_from_shm_keywords(self, kw_dict: typ.Dict[str, typ.Any]
+                                ) -> t_Op[util.ModeIDType]:
+        '''
+            The mode whose ROI the PRD-* and BIN-FCT* keywords describe -
+            the requested one first. A new CUSTOM mode if none does.
+        '''
+        try:
+            x0, y0 = int(kw_dict['PRD-MIN1']), int(kw_dict['PRD-MIN2'])
+            width, height = int(kw_dict['PRD-RNG1']), int(kw_dict['PRD-RNG2'])
+            binx = int(kw_dict.get('BIN-FCT1', 1))
+            biny = int(kw_dict.get('BIN-FCT2', 1))
+        except (KeyError, TypeError, ValueError):
+            return None
+        if width <= 1 or height <= 1:  # The defaults: never filled.
+            return None
+
+        running = util.CameraMode(x0=x0, x1=x0 + width - 1, y0=y0,
+                                  y1=y0 + height - 1, binx=binx, biny=biny)
+        candidates = [self.current_mode_id] + [
+                mode_id
+                for mode_id in self.MODES if mode_id != self.current_mode_id
+        ]
+        for mode_id in candidates:
+            if self.MODES[mode_id].same_roi(running):
+                return mode_id
+
+        self.MODES['CUSTOM'] = running
+        return 'CUSTOM'
+
+    def attach_framegrab_backend(self) -> bool:
+        '''
+            init_framegrab_backend, for a taker that is already running:
+            open the handles, configure nothing.
+            False if the backend doesn't support it.
+        '''
+        return False
 
     def init_framegrab_backend(self) -> None:
         logg.debug('init_framegrab_backend @ BaseCamera')
@@ -215,22 +460,32 @@ class BaseCamera:
                 'Setting size for shmimTCPreceive et al.')
 
         for dep_proc in self.dependent_processes:
-            if (MAGIC_HW_STR.HEIGHT in dep_proc.cli_original_args or
-                        MAGIC_HW_STR.WIDTH in dep_proc.cli_original_args):
-                arglist: typ.List[util.KWType] = list(
-                        dep_proc.cli_original_args)
-
-                cm = self.current_mode
-                h, w = ((cm.x1 - cm.x0 + 1) // cm.binx,
-                        (cm.y1 - cm.y0 + 1) // cm.biny)
-                for kk, arg in enumerate(arglist):
-                    if arg == MAGIC_HW_STR.HEIGHT:
-                        arglist[kk] = h
-                    if arg == MAGIC_HW_STR.WIDTH:
-                        arglist[kk] = w
-                    # ... there might be a transpose error, ofc.
-
-                dep_proc.cli_args = arglist
+            dep_proc.cli_args = self._dependent_cli_args_for_mode(
+                    dep_proc, mode_id)
+
+    def _dependent_cli_args_for_mode(self, dep_proc: util.DependentProcess,
+                                     mode_id: util.ModeIDType
+                                     ) -> typ.List[util.KWType]:
+        '''
+            Resolve the cli_args a dependent will need in mode mode_id.
+            Also used by set_camera_mode to figure out which dependents would change.
+        '''
+        if not (MAGIC_HW_STR.HEIGHT in dep_proc.cli_original_args or
+                MAGIC_HW_STR.WIDTH in dep_proc.cli_original_args):
+            return list(dep_proc.cli_args)
+
+        arglist: typ.List[util.KWType] = list(dep_proc.cli_original_args)
+
+        cm = self.MODES[mode_id]
+        h, w = ((cm.x1 - cm.x0 + 1) // cm.binx, (cm.y1 - cm.y0 + 1) // cm.biny)
+        for kk, arg in enumerate(arglist):
+            if arg == MAGIC_HW_STR.HEIGHT:
+                arglist[kk] = h
+            if arg == MAGIC_HW_STR.WIDTH:
+                arglist[kk] = w
+            # ... there might be a transpose error, ofc.
+
+        return arglist
 
     def prepare_camera_finalize(self,
                                 mode_id: t_Op[util.ModeIDType] = None) -> None:
@@ -242,26 +497,165 @@ class BaseCamera:
                 'Calling prepare_camera_finalize on generic BaseCameraClass. '
                 'Nothing happens here.')
 
-    def set_camera_mode(self, mode_id: util.ModeIDType) -> None:
+    @tracing.traced()
+    def set_camera_mode(self, mode_id: util.ModeIDType,
+                        force_full_restart: bool = False) -> None:
         '''
             Quite same as above - but mostly meant to be called by subclasses that do have defined modes.
-        '''
-        logg.debug('set_camera_mode @ BaseCamera')
-        self.kill_taker_and_dependents()
-
-        self.current_mode_id = mode_id
-        self.current_mode = self.MODES[mode_id]
-        self.width, self.height = self._fg_size_from_mode(mode_id)
 
-        self.init_framegrab_backend()
+            Only restarts what the mode change requires - see _plan_mode_change.
+        '''
+        with self.control_lock.write():
+            logg.debug('set_camera_mode @ BaseCamera')
+            t_start = time.time()
+
+            prev_mode_id = self.current_mode_id
+            plan, reason = self._plan_mode_change(mode_id, force_full_restart)
+
+            self.current_mode_id = mode_id
+            self.current_mode = self.MODES[mode_id]
+            self.width, self.height = self._fg_size_from_mode(mode_id)
+
+            if plan is util.ModeChangePlan.PARAMS:
+                with tracing.span('_set_mode_params'):
+                    self._set_mode_params(self.current_mode)
+                self.lkg.set_mode(mode_id)
+
+            elif plan is util.ModeChangePlan.TAKER:
+                self.lkg.invalidate()
+                with tracing.span('_kill_taker_no_dependents'):
+                    self._kill_taker_no_dependents()
+                with tracing.span('prepare_camera_for_size'):
+                    self.prepare_camera_for_size()
+                # Also fills keywords and calls prepare_camera_finalize
+                with tracing.span('_start_taker_no_dependents'):
+                    self._start_taker_no_dependents(reuse_shm=True)
+
+            else:
+                self.lkg.invalidate()
+                with tracing.span('kill_taker_and_dependents'):
+                    self.kill_taker_and_dependents()
+
+                with tracing.span('init_framegrab_backend'):
+                    self.init_framegrab_backend()
+
+                with tracing.span('prepare_camera_for_size'):
+                    self.prepare_camera_for_size()
+
+                with tracing.span('start_frame_taker_and_dependents'):
+                    self.start_frame_taker_and_dependents()
+
+                with tracing.span('grab_shm_fill_keywords'):
+                    self.grab_shm_fill_keywords()
+
+                with tracing.span('prepare_camera_finalize'):
+                    self.prepare_camera_finalize()
+
+            logg.info(f'set_camera_mode @ BaseCamera: {prev_mode_id} -> '
+                      f'{mode_id}: {plan.name} plan ({reason}) in '
+                      f'{time.time() - t_start:.2f} s')
+
+    def _plan_mode_change(self, mode_id: util.ModeIDType,
+                          force_full_restart: bool = False
+                          ) -> typ.Tuple[util.ModeChangePlan, str]:
+        '''
+            Diff the current mode and the new mode, as well as the dependents
+            command lines they resolve to.
 
-        self.prepare_camera_for_size()
+            Returns the plan and a human-readable reason.
+        '''
+        old_mode, new_mode = self.current_mode, self.MODES[mode_id]
 
-        self.start_frame_taker_and_dependents()
+        if force_full_restart:
+            return util.ModeChangePlan.FULL, 'forced'
+        if not self.is_taker_running():
+            return util.ModeChangePlan.FULL, 'taker not running'
+        for dep_proc in self.dependent_processes:
+            if not dep_proc.is_running():
+                return (util.ModeChangePlan.FULL,
+                        f'dependent {dep_proc.tmux_name} not running')
+        if self._fg_size_from_mode(mode_id) != (self.width, self.height):
+            return util.ModeChangePlan.FULL, 'framegrabber size changes'
+        for dep_proc in self.dependent_processes:
+            if (self._dependent_cli_args_for_mode(dep_proc, mode_id) != list(
+                    dep_proc.cli_args)):
+                return (util.ModeChangePlan.FULL,
+                        f'dependent {dep_proc.tmux_name} changes')
+        if not new_mode.same_roi(old_mode):
+            return util.ModeChangePlan.TAKER, 'camera ROI changes'
+        if self._mode_requires_reconfig(self.current_mode_id, mode_id):
+            return util.ModeChangePlan.TAKER, 'mode-specific configuration'
+        for attr in ('fps', 'tint'):
+            if (getattr(new_mode, attr) is not None and
+                        not hasattr(self, f'set_{attr}')):
+                return util.ModeChangePlan.TAKER, f'{attr} not settable live'
+
+        return util.ModeChangePlan.PARAMS, 'same geometry'
+
+    def _mode_requires_reconfig(self, old_mode_id: util.ModeIDType,
+                                new_mode_id: util.ModeIDType) -> bool:
+        '''
+            Does going from old_mode_id to new_mode_id need
+            prepare_camera_for_size and prepare_camera_finalize, even though
+            both CameraModes have the same geometry?
 
-        self.grab_shm_fill_keywords()
+            By default, yes as soon as the mode ID changes: subclasses derive
+            camera settings and keywords (cropping, binning, CROPPED...) from
+            the ID itself. Override with what actually depends on it.
+        '''
+        return old_mode_id != new_mode_id
+
+    def _set_mode_params(self, mode: util.CameraMode) -> None:
+        # _plan_mode_change guarantees the setters exist if needed.
+        if mode.fps is not None:
+            self.set_fps(mode.fps)  # type: ignore
+        if mode.tint is not None:
+            self.set_tint(mode.tint)  # type: ignore
+
+    def _apply_settings(
+            self, settings: typ.List[typ.Tuple[typ.Callable[[typ.Any], typ.Any],
+                                               typ.Any]]
+    ) -> None:
+        '''
+            Call each (setter, value) - but those the camera already has,
+            as per the last-known-good snapshot. Setters must be @lkg_setter.
 
-        self.prepare_camera_finalize()
+            On the first call after a cold start, the snapshot is trusted
+            if it's for the current mode and the LKG_PROBES getters read back
+            what it recorded. After a mode change, everything is applied.
+        '''
+        if self.lkg.trusted is None:
+            with tracing.span('_validate_lkg'):
+                self.lkg.trusted = self._validate_lkg()
+
+        for setter, value in settings:
+            if self.lkg.is_applied(setter.__name__, value):
+                self.lkg.n_skipped += 1
+                logg.debug(f'_apply_settings: {setter.__name__}({value}) '
+                           'skipped - last known good.')
+                continue
+            self.lkg.n_applied += 1
+            setter(value)
+
+        self.lkg.set_mode(self.current_mode_id)
+        self.lkg.trusted = True
+
+    def _validate_lkg(self) -> bool:
+        if not self.lkg.params or self.lkg.mode != self.current_mode_id:
+            logg.info(f'_validate_lkg: no snapshot for mode '
+                      f'{self.current_mode_id} - applying everything.')
+            return False
+        for setter_name, getter_name in self.LKG_PROBES.items():
+            if setter_name not in self.lkg.params:
+                continue
+            value = getattr(self, getter_name)()
+            if not same_value(value, self.lkg.readback(setter_name)):
+                logg.warning(f'_validate_lkg: {getter_name} -> {value}, '
+                             f'expected {self.lkg.readback(setter_name)} - '
+                             'applying everything.')
+                return False
+        logg.info('_validate_lkg: camera matches the last known good.')
+        return True
 
     def set_mode(self, mode_id: util.ModeIDType) -> None:
         '''
@@ -272,6 +666,23 @@ class BaseCamera:
     def get_camera_mode(self) -> util.ModeIDType:
         return self.current_mode_id
 
+    def get_state_snapshot(self, keys: t_Op[typ.List[str]] = None,
+                           max_age: t_Op[float] = None
+                           ) -> typ.Dict[str, typ.Tuple[typ.Any, float]]:
+        '''
+            Last known {keyword: (value, acquisition time.time())}, as
+            reported by the latest get/set/poll - without asking the camera.
+
+            keys: only those (default: all).
+            max_age [s]: leave out values older than that.
+                The auxiliary thread refreshes polled values every
+                AUX_POLL_PERIOD; callers needing fresher call the getters.
+        '''
+        return {
+                key: (entry.value, entry.timestamp)
+                for key, entry in self.state.snapshot(keys, max_age).items()
+        }
+
     def get_mode(self) -> util.ModeIDType:
         '''
         Alias
@@ -303,19 +714,29 @@ class BaseCamera:
                                          skip_taker: bool = False) -> None:
         logg.info('start_frame_taker_and_dependents @ BaseCamera')
 
-        if not skip_taker:
-            self._start_taker_no_dependents()
+        with self.control_lock.write():
+            if not skip_taker:
+                with tracing.span('_start_taker_no_dependents'):
+                    self._start_taker_no_dependents()
 
-        # Now handle the dependent processes
-        self.dependent_processes_manager.start()
+            # Now handle the dependent processes
+            with tracing.span('dependents.start'):
+                self.dependent_processes_manager.start()
+            for dep_proc in self.dependent_processes:
+                self.supervisor.arm(dep_proc.tmux_name)
 
     def kill_taker_and_dependents(self, skip_taker: bool = False) -> None:
         logg.info('kill_taker_and_dependents @ BaseCamera')
 
-        self.dependent_processes_manager.stop()
+        with self.control_lock.write():
+            for dep_proc in self.dependent_processes:
+                self.supervisor.disarm(dep_proc.tmux_name)
+            with tracing.span('dependents.stop'):
+                self.dependent_processes_manager.stop()
 
-        if not skip_taker:
-            self._kill_taker_no_dependents()
+            if not skip_taker:
+                with tracing.span('_kill_taker_no_dependents'):
+                    self._kill_taker_no_dependents()
 
     def release(self) -> None:
         '''
@@ -344,19 +765,12 @@ class BaseCamera:
         while not success:
             tmux_util.send_keys(self.take_tmux_pane, self.taker_tmux_command)
 
-            if self.taker_cset_prio[1] is not None:  # Set rtprio !
-                subprocess.run(
-                        [
-                                'milk-makecsetandrt',
-                                str(
-                                        tmux_util.find_pane_running_pid(
-                                                self.take_tmux_pane)),  # PID
-                                self.taker_cset_prio[0],  # CPUSET
-                                str(self.taker_cset_prio[1])  # PRIORITY
-                        ],
-                        stdout=subprocess.PIPE)
+            if self.taker_rt_applier is not None:  # Set rtprio !
+                self.taker_rt_applier.apply(
+                        tmux_util.find_pane_running_pid(self.take_tmux_pane))
             try:
-                self._ensure_backend_restarted()
+                with tracing.span('_ensure_backend_restarted', attempt=count):
+                    self._ensure_backend_restarted()
                 success = True
             except:
                 if count == 3:
@@ -365,9 +779,12 @@ class BaseCamera:
                         '_start_taker_no_dependents @ BaseCamera - acknowledge _ensure_backend_restarted and retrying'
                 )
                 count += 1
+        self.supervisor.arm('taker')
 
-        self.grab_shm_fill_keywords()
-        self.prepare_camera_finalize()
+        with tracing.span('grab_shm_fill_keywords'):
+            self.grab_shm_fill_keywords()
+        with tracing.span('prepare_camera_finalize'):
+            self.prepare_camera_finalize()
 
         if not bypass_aux_thread:
             self.start_auxiliary_thread()
@@ -376,7 +793,8 @@ class BaseCamera:
         '''
         Alias
         '''
-        self._start_taker_no_dependents()
+        with self.control_lock.write():
+            self._start_taker_no_dependents()
 
     def _prepare_backend_cmdline(self, reuse_shm: bool = False) -> None:
         raise NotImplementedError("Must be subclassed from the base class")
@@ -386,6 +804,7 @@ class BaseCamera:
 
     def _kill_taker_no_dependents(self, *,
                                   bypass_aux_thread: bool = False) -> None:
+        self.supervisor.disarm('taker')
 
         if not bypass_aux_thread:  # Dangerous not to, only for DumbEDT
             self.stop_auxiliary_thread()
@@ -398,68 +817,162 @@ class BaseCamera:
         '''
         Alias
         '''
-        self._kill_taker_no_dependents()
+        with self.control_lock.write():
+            self._kill_taker_no_dependents()
 
     def grab_shm_fill_keywords(self) -> None:
         # Problem: we need to be sure the taker has restarted
         # before filling keywords !
         # Second problem: if the taker is **slow**, we may regrab a
         # pointer to the SHM before the re-creation
-        self.camera_shm = self._get_SHM()
+        # _get_SHM handles both: we have a first frame of the live SHM.
+        with tracing.span('_get_SHM'):
+            self.camera_shm = self._get_SHM()
 
-        time.sleep(0.3)  # Avoid initial race condition on keywords
-        self._fill_keywords()
+        # The whole subclass chain of _fill_keywords commits at once.
+        with tracing.span('_fill_keywords'), self.keyword_batch():
+            self._fill_keywords()
 
     def _get_SHM(self) -> SHM:
         # Separated to be overloaded if need be (thinking of you, OCAM !)
 
-        while True:
-            # In case the SHM doesn't exist yet
-            if os.path.isfile(os.environ['MILK_SHM_DIR'] + '/' +
-                              self.STREAMNAME + '.im.shm'):
-                try:
-                    shm = SHM(self.STREAMNAME, symcode=0)
-                    break
-                except:
-                    pass
+        with ShmDirWatch(self.STREAMNAME) as watch:
+            shm = self._open_SHM_when_created(watch)
 
-            time.sleep(0.1)
-
-        shm.IMAGE.semflush(shm.semID)
-        while shm.IMAGE.semtrywait(shm.semID):
             # We don't want to break a semaphore
             # So wait til the first frame is published
-            time.sleep(0.1)
+            t_start = time.time()
+            while not _sem_timedwait(shm, SHM_SEM_WAIT_CHUNK):
+                if watch.recreated():
+                    # We had grabbed the previous incarnation.
+                    shm = self._open_SHM_when_created(watch)
+                elapsed = time.time() - t_start
+                if (self.SHM_FIRST_FRAME_TIMEOUT is not None and
+                            elapsed > self.SHM_FIRST_FRAME_TIMEOUT):
+                    logg.warning(f'_get_SHM @ BaseCamera: no frame in '
+                                 f'{self.SHM_FIRST_FRAME_TIMEOUT} s.')
+                    break
+
+        return shm
 
+    def _open_SHM_when_created(self, watch: ShmDirWatch) -> SHM:
+        while True:
+            # In case the SHM doesn't exist yet
+            watch.wait_exists()
+            try:
+                shm = SHM(self.STREAMNAME, symcode=0)
+                break
+            except:
+                # Exists but not initialized yet. Wait for the creator.
+                watch.recreated(SHM_SEM_WAIT_CHUNK)
+
+        # Discard the creation events that led to what we just opened.
+        watch.recreated(0.0)
+        shm.IMAGE.semflush(shm.semID)
         return shm
 
     def set_keyword(self, key: str, value: typ.Union[str, int, float]) -> None:
         return self._set_formatted_keyword(key, value)
 
+    @classmethod
+    def _keyword_formatters(cls) -> typ.Dict[str, KWFormatterType]:
+        '''
+            The KEYWORDS formats - WCS included - compiled once per class.
+        '''
+        table = cls.__dict__.get('_KW_FORMATTERS')
+        if table is None:
+            keywords = dict(cls.KEYWORDS)
+            for i in range(cls.N_WCS):
+                keywords.update(wcs_dummy_dict(i))
+            table = {
+                    key: _compile_kw_formatter(keywords[key][2])
+                    for key in keywords
+            }
+            cls._KW_FORMATTERS = table
+        return table
+
+    def _format_keyword(self, key: str, value: typ.Union[str, int,
+                                                         float]) -> typ.Any:
+        if value is None:
+            return value
+
+        formatters = self._keyword_formatters()
+        formatter = formatters.get(key)
+        if formatter is None:  # Late addition to KEYWORDS
+            formatter = _compile_kw_formatter(self.KEYWORDS[key][2])
+            formatters[key] = formatter
+
+        try:
+            return formatter(value)
+        except:  # Sometime garbage values cannot be formatted properly...
+            logg.error(f"fits_headers: formatting error on {key}, {value}, "
+                       f"{self.KEYWORDS[key][2]}")
+            return value
+
     def _set_formatted_keyword(self, key: str, value: typ.Union[str, int,
-                                                                float]) -> None:
+                                                                float],
+                               record_state: bool = True) -> None:
+        '''
+            record_state: False for values that were not acquired from the
+            camera (e.g. KEYWORDS defaults), which must not reach self.state
+        '''
 
         assert self.camera_shm is not None  # mypy happy assert
 
-        fmt = self.KEYWORDS[key][2]
-        val = value
-        if value is not None:
-            try:
-                if fmt == 'BOOLEAN':
-                    assert isinstance(value, bool)  # mypy happy assert
-                    val = MAGIC_BOOL_STR.TUPLE[value]
-                elif fmt[-1] == 'd':
-                    val = int(fmt % value)
-                elif fmt[-1] == 'f':
-                    val = float(fmt % value)
-                elif fmt[-1] == 's':  # string
-                    val = fmt % value
-            except:  # Sometime garbage values cannot be formatted properly...
-                logg.error(
-                        f"fits_headers: formatting error on {key}, {value}, {fmt}"
-                )
+        if record_state:
+            self.state.update(key, value)
+        val = self._format_keyword(key, value)
 
-        self.camera_shm.update_keyword(key, val)
+        pending = getattr(self._kw_batch_local, 'pending', None)
+        if pending is not None:  # Within keyword_batch(): defer.
+            pending[key] = val
+        else:
+            self.camera_shm.update_keyword(key, val)
+
+    def set_keywords_batch(self, kw_values: typ.Dict[str,
+                                                     typ.Union[str, int,
+                                                               float]]) -> None:
+        '''
+            Format all of kw_values, then write them in a single pass
+            over the SHM keyword area.
+        '''
+        with self.keyword_batch():
+            for key, value in kw_values.items():
+                self._set_formatted_keyword(key, value)
+
+    @contextlib.contextmanager
+    def keyword_batch(self) -> typ.Iterator[None]:
+        '''
+            Defer the _set_formatted_keyword calls made by this thread
+            within the context, and commit them all at once upon exit.
+            Nestable - only the outermost context commits.
+        '''
+        if getattr(self._kw_batch_local, 'pending', None) is not None:
+            yield
+            return
+
+        self._kw_batch_local.pending = {}
+        try:
+            yield
+        finally:
+            pending = self._kw_batch_local.pending
+            self._kw_batch_local.pending = None
+            if len(pending) > 0:
+                self._commit_keywords(pending)
+
+    def _commit_keywords(self, formatted: typ.Dict[str, typ.Any]) -> None:
+        assert self.camera_shm is not None  # mypy happy assert
+
+        # update_keyword would rewrite the keyword area once per key.
+        # We do it once for all.
+        shm_keywords = self.camera_shm.get_keywords(True)
+        for key, val in formatted.items():
+            if key in self.KEYWORDS:
+                comment = self.KEYWORDS[key][1]
+            else:
+                comment = shm_keywords[key][1]
+            shm_keywords[key] = (val, comment)
+        self.camera_shm.set_keywords(shm_keywords)
 
     def _fill_keywords(self) -> None:
 
@@ -467,29 +980,27 @@ class BaseCamera:
 
         # These are pretty much defaults - we don't know anything about this
         # basic abstract camera
-        preex_keywords = self.camera_shm.get_keywords(True)
-        preex_keywords.update(self.KEYWORDS)
         for i in range(self.N_WCS):
-            wcs_dict = wcs_dummy_dict(i)
-            preex_keywords.update(wcs_dict)
-            self.KEYWORDS.update(wcs_dict)
-        self.camera_shm.set_keywords(preex_keywords)  # Initialize comments
-        # Second pass to enforce formatting...
-        # Don't do it on the preex from the framegrabber (MFRATE, _MACQTIME) cause they don't
-        # have a formatter
-        for kw in self.KEYWORDS:
-            self._set_formatted_keyword(kw, preex_keywords[kw][0])
-
-        cm = self.current_mode
-
-        self._set_formatted_keyword('DETECTOR', 'Base Camera')
-        self._set_formatted_keyword('BIN-FCT1', cm.binx)
-        self._set_formatted_keyword('BIN-FCT2', cm.biny)
-        self._set_formatted_keyword('PRD-MIN1', cm.x0)
-        self._set_formatted_keyword('PRD-MIN2', cm.y0)
-        self._set_formatted_keyword('PRD-RNG1', cm.x1 - cm.x0 + 1)
-        self._set_formatted_keyword('PRD-RNG2', cm.y1 - cm.y0 + 1)
-        self._set_formatted_keyword('CROPPED', False)
+            self.KEYWORDS.update(wcs_dummy_dict(i))
+
+        with self.keyword_batch():
+            # Reset to defaults, and initialize comments.
+            # Don't do it on the preex from the framegrabber (MFRATE, _MACQTIME) cause they don't
+            # have a formatter
+            for kw in self.KEYWORDS:
+                self._set_formatted_keyword(kw, self.KEYWORDS[kw][0],
+                                            record_state=False)
+
+            cm = self.current_mode
+
+            self._set_formatted_keyword('DETECTOR', 'Base Camera')
+            self._set_formatted_keyword('BIN-FCT1', cm.binx)
+            self._set_formatted_keyword('BIN-FCT2', cm.biny)
+            self._set_formatted_keyword('PRD-MIN1', cm.x0)
+            self._set_formatted_keyword('PRD-MIN2', cm.y0)
+            self._set_formatted_keyword('PRD-RNG1', cm.x1 - cm.x0 + 1)
+            self._set_formatted_keyword('PRD-RNG2', cm.y1 - cm.y0 + 1)
+            self._set_formatted_keyword('CROPPED', False)
 
     def get_fg_parameters(self) -> None:
         # We don't need to get them, because we set them in init_pdv_configuration
@@ -512,6 +1023,9 @@ class BaseCamera:
         '''
             Push the keys stored locally in the stream to the
             Redis database as disambiguated technical keys
+
+            Only the values that changed since the last push are sent,
+            except every REDIS_FULL_PUSH_PERIOD.
         '''
 
         assert self.camera_shm is not None  # mypy happy assert
@@ -519,14 +1033,41 @@ class BaseCamera:
         if self.REDIS_PUSH_ENABLED and self.HAS_REDIS:
             assert self.REDIS_PREFIX is not None  # mypy
             try:
+                now = time.time()
+                full_push = (now - self._redis_last_full_push >
+                             self.REDIS_FULL_PUSH_PERIOD)
+
                 keywords_shm = self.camera_shm.get_keywords(False)
+                # Several keywords may share a redis key: the last one wins.
+                values: typ.Dict[str, typ.Any] = {}
+                for kw in keywords_shm:
+                    if (kw in self.KEYWORDS and
+                                self.KEYWORDS[kw][3] is not None):
+                        values[self.REDIS_PREFIX +
+                               self.KEYWORDS[kw][3]] = keywords_shm[kw]
+
+                changed = {
+                        rkey: values[rkey]
+                        for rkey in values
+                        if (full_push or rkey not in self._redis_last_pushed or
+                            self._redis_last_pushed[rkey] != values[rkey])
+                }
+
+                if len(changed) == 0:
+                    return
+
                 with self.RDB.pipeline() as pipe:
-                    for kw in keywords_shm:
-                        if (kw in self.KEYWORDS and
-                                    self.KEYWORDS[kw][3] is not None):
-                            pipe.hset(self.REDIS_PREFIX + self.KEYWORDS[kw][3],
-                                      'value', keywords_shm[kw])
+                    for rkey in changed:
+                        pipe.hset(rkey, 'value', changed[rkey])
+                    if self.REDIS_PUBLISH_CHANGES:
+                        pipe.publish(self.REDIS_CHANGES_CHANNEL,
+                                     json.dumps(changed, default=str))
                     pipe.execute()
+
+                # Only now that it went through.
+                self._redis_last_pushed.update(changed)
+                if full_push:
+                    self._redis_last_full_push = now
             except:  #TODO
                 # In case there's a transient unavailability of the DB
                 # Or get_keyword failed or whatnot
@@ -556,32 +1097,113 @@ class BaseCamera:
                         'stop_auxiliary_thread @ Basecamera - still alive???')
             self.thread = None
 
-    def auxiliary_thread_run_function(self) -> None:
-        assert self.event is not None  # mypy happy assert
+    def _register_aux_tasks(self, scheduler: AuxScheduler) -> None:
+        '''
+            What the auxiliary thread does, and how often.
+            Subclasses may extend this to run things at their own pace.
+        '''
+        scheduler.add('taker_liveness', self._check_taker_alive,
+                      self.AUX_POLL_PERIOD, priority=0)
+        scheduler.add('poll_keywords', self.poll_camera_for_keywords,
+                      self.AUX_POLL_PERIOD, priority=10,
+                      budget=self.AUX_POLL_PERIOD / 2)
+        scheduler.add('dependents_rt', self._make_dependents_rt,
+                      self.AUX_POLL_PERIOD, priority=20)
+        # Same period, lower priority: always right after poll_keywords
+        scheduler.add('redis_push', self.redis_push_values,
+                      self.AUX_POLL_PERIOD, priority=30, budget=1.0)
+
+    def _aux_tick_lock(self) -> typ.Any:
+        '''
+            Lock that the auxiliary thread must hold - non-blockingly -
+            to run its tasks. None: no lock.
 
-        event_count = 0
-        while True:
-            ret = self.event.wait(1)
-            if ret:  # Signal to break the loop
-                break
-            event_count += 1
-            if event_count % 10 > 0:
-                continue
+            The control lock, shared: polls run alongside other getters,
+            but never during a mode change. Non-blockingly, because the mode
+            change joins the aux thread while holding the lock exclusively.
+        '''
+        return self.control_lock.reader
+
+    def _supervise(self) -> None:
+        '''
+            Register the taker and the dependents with the supervisor.
+            They're armed upon start, disarmed upon deliberate stop.
 
-            if not self.is_taker_running():
-                logg.critical('take_tmux_pane contains no live PID.')
+            A dead taker is restarted alone, keeping the SHM - its readers
+            stay put. A dead dependent is restarted alone, alongside getters
+            and polls but never during a mode change.
+        '''
+        self.supervisor.watch(
+                'taker',
+                lambda: tmux_util.find_pane_running_pid(self.take_tmux_pane),
+                self._restart_dead_taker, self.TAKER_RESTART_POLICY,
+                lock=self.control_lock.writer)
+        for dep_proc in self.dependent_processes:
+            self.supervisor.watch(
+                    dep_proc.tmux_name, dep_proc.get_pid,
+                    functools.partial(self._restart_dead_dependent,
+                                      dep_proc), self.DEPENDENTS_RESTART_POLICY,
+                    lock=self.control_lock.reader,
+                    local=not isinstance(dep_proc, util.RemoteDependentProcess))
+        self.supervisor.start()
+
+    @tracing.traced()
+    def _restart_dead_taker(self) -> None:
+        # Under the control lock, exclusively. The auxiliary thread goes on.
+        # No kill_running: the pane is back to its prompt - make sure of it,
+        # or the command line goes to the stdin of whatever runs there.
+        # If it's a taker after all, the supervisor re-arms on it.
+        pid = tmux_util.find_pane_running_pid(self.take_tmux_pane)
+        if pid is not None:
+            logg.error(f'_restart_dead_taker: PID {pid} is running in '
+                       f'{self.take_tmux_name} - not sending the command.')
+            return
+        # Was the camera power cycled too? Probe before trusting the LKG.
+        self.lkg.trusted = None
+        self._start_taker_no_dependents(reuse_shm=True, bypass_aux_thread=True)
 
-            # Dependents cset + RTprio checking
-            for proc in self.dependent_processes:
-                proc.make_children_rt()
+    def _restart_dead_dependent(self, dep_proc: util.DependentProcess) -> None:
+        # Under the control lock, shared.
+        dep_proc.stop()
+        dep_proc.start_and_wait_ready()
 
-            # Camera specifics !
-            try:
-                self.poll_camera_for_keywords()
-            except Exception as e:
-                logg.error(f"Polling thread: error [{e}]")
+    def _check_taker_alive(self) -> None:
+        # The supervisor knows within milliseconds. No need to fork a pgrep.
+        if not self.supervisor.is_up('taker'):
+            logg.critical('Taker is not running - supervisor: '
+                          f'{self.supervisor.processes["taker"].state}.')
 
-            try:
-                self.redis_push_values()
-            except Exception as e:
-                logg.error(f"Polling thread: error [{e}]")
+    def _make_dependents_rt(self) -> None:
+        # Dependents cset + RTprio checking
+        for proc in self.dependent_processes:
+            proc.make_children_rt()
+
+    def print_aux_stats(self) -> None:
+        print(self.aux_scheduler.report())
+
+    def print_lkg_stats(self) -> None:
+        print(self.lkg.report())
+
+    def print_lock_stats(self) -> None:
+        print(self.control_lock.report())
+
+    def print_supervisor_stats(self) -> None:
+        print(self.supervisor.report())
+
+    def dump_traces(self) -> str:
+        '''
+            Print the breakdown of the last lifecycle trace,
+            and dump all recent ones as a Chrome trace JSON.
+        '''
+        print(self.tracer.report())
+        path = self.tracer.dump_chrome()
+        print(f'Traces dumped to {path}')
+        return path
+
+    def auxiliary_thread_run_function(self) -> None:
+        assert self.event is not None  # mypy happy assert
+
+        if len(self.aux_scheduler.tasks) == 0:
+            self._register_aux_tasks(self.aux_scheduler)
+
+        self.aux_scheduler.run(self.event, tick_lock=self._aux_tick_lock())
@@ -17,6 +17,9 @@ from camstack.core.utilities import (
         DependentProcess,
 )
 from camstack.core.wcs import wcs_dict_init
+from camstack.core.lkg import lkg_setter
+from camstack.core import redis_cache
+from camstack.core.aux_scheduler import AuxScheduler
 
 try:
     from scxkw.config import MAGIC_BOOL_STR
@@ -80,6 +83,33 @@ class CRED1(EDTCamera):
     EDTTAKE_UNSIGNED = True
     EDTTAKE_EMBEDMICROSECOND = True
 
+    WATER_CHECK_PERIOD = 2.0  # [s] - see _emergency_abort
+
+    # yapf: disable
+    SERIAL_CACHE_POLICY = {
+            "fps raw": (2.0, ("set fps", "set cropping", "set mode",
+                              "set nbreadworeset", "set extsynchro")),
+            "maxfps raw": (2.0, ("set cropping", "set mode",
+                                 "set nbreadworeset")),
+            "nbreadworeset raw": (2.0, ("set nbreadworeset", "set mode")),
+            "gain raw": (2.0, ("set gain", "set mode")),
+            "mode raw": (2.0, ("set mode",)),
+            "extsynchro raw": (2.0, ("set extsynchro",)),
+    }
+    # yapf: enable
+
+    # fps moves with a power cycle or a cropping change: one serial round trip
+    # tells whether the camera is as the last known good says.
+    LKG_PROBES = {"set_fps": "get_fps"}
+    # As the invalidations above: set mode resets NDR, fps and gain, etc.
+    # tint is 1 / fps - and set_tint goes through set_fps, which records.
+    LKG_COUPLING = {
+            "set_readout_mode": ("set_NDR", "set_fps", "set_tint", "set_gain"),
+            "set_NDR": ("set_fps", "set_tint"),
+            "set_synchro": ("set_fps", "set_tint"),
+            "set_fps": ("set_tint", ),
+    }
+
     def __init__(
             self,
             name: str,
@@ -158,6 +188,11 @@ class CRED1(EDTCamera):
 
         EDTCamera.prepare_camera_for_size(self, mode_id=mode_id)
 
+    def _mode_requires_reconfig(self, old_mode_id: ModeIDType,
+                                new_mode_id: ModeIDType) -> bool:
+        # Cropping on/off and the CROPPED keyword only depend on FULL-ness.
+        return (old_mode_id == self.FULL) != (new_mode_id == self.FULL)
+
     def prepare_camera_finalize(self, mode_id: Op[ModeIDType] = None) -> None:
         logg.debug("prepare_camera_finalize @ CRED1")
 
@@ -168,19 +203,19 @@ class CRED1(EDTCamera):
         # Changing the binning trips the external sync (at lest on OCAM ?)
         self.set_synchro(self.synchro)
 
+        settings = []
         # Initialization of the camera: reset the NDR to globalresetcds, NDR2.
-        if self.NDR is None:
-            self.set_readout_mode(ROMODES.cds)
-            self.set_NDR(2)
-
-        elif "global" not in self.get_readout_mode():
-            self.set_readout_mode(ROMODES.cds)
-            self.set_NDR(2)
+        if self.NDR is None or "global" not in self.get_readout_mode():
+            settings += [(self.set_readout_mode, ROMODES.cds),
+                         (self.set_NDR, 2)]
 
         if cm.fps is not None:
-            self.set_fps(cm.fps)
+            settings.append((self.set_fps, cm.fps))
         if cm.tint is not None:
-            self.set_tint(cm.tint)
+            settings.append((self.set_tint, cm.tint))
+
+        # Only what's not already set, as per the last known good.
+        self._apply_settings(settings)
 
     def send_command(self, cmd: str, base_timeout: float = 100.0) -> str:
         # Just a little bit of parsing to handle the CRED1 format
@@ -223,11 +258,18 @@ class CRED1(EDTCamera):
         self.get_temperature(shm_write=shm_write)  # Sets DET-TMP
         time.sleep(0.1)
         self.get_cryo_pressure(shm_write=shm_write)  # Sets DET-PRES
-        time.sleep(0.1)
+
+    def check_water_temperature(self) -> None:
         water_temp = self.get_water_temperature()
         if water_temp > 40.0:
             self._emergency_abort()
 
+    def _register_aux_tasks(self, scheduler: AuxScheduler) -> None:
+        EDTCamera._register_aux_tasks(self, scheduler)
+        # Overheating is much faster than the temperature/pressure drifts.
+        scheduler.add('water_temperature', self.check_water_temperature,
+                      self.WATER_CHECK_PERIOD, priority=0, budget=1.0)
+
     # ===========================================
     # AD HOC METHODS - TO BE BOUND IN THE SHELL ?
     # ===========================================
@@ -274,6 +316,7 @@ class CRED1(EDTCamera):
         # Self.shutdown is a trap, no return expected ever.
         self.send_command("set cooling off")
 
+    @lkg_setter
     def set_synchro(self, synchro: bool) -> bool:
         val = ("off", "on")[synchro]
         _ = self.send_command(f"set extsynchro {val}")
@@ -354,6 +397,7 @@ class CRED1(EDTCamera):
         assert status == "operational"
         logg.warning(f"Camera now cold - status: {status}.")
 
+    @lkg_setter
     def set_readout_mode(self, mode: str) -> str:
         self.send_command(f"set mode {mode}")
         return self.get_readout_mode()
@@ -367,6 +411,7 @@ class CRED1(EDTCamera):
         logg.info(f"get_readout_mode: {res}")
         return res
 
+    @lkg_setter
     def set_gain(self, gain: int) -> int:
         self.send_command(f"set gain {gain}")
         return self.get_gain()
@@ -380,6 +425,7 @@ class CRED1(EDTCamera):
     def get_maxpossiblegain(self) -> int:
         return int(self.send_command("maxpossiblegain raw"))
 
+    @lkg_setter
     def set_NDR(self, NDR: int) -> int:
         if NDR < 1 or not type(NDR) is int:
             raise AssertionError(f"Illegal NDR value: {NDR}")
@@ -428,6 +474,7 @@ class CRED1(EDTCamera):
         logg.info(f"get_NDR: {self.NDR}")
         return self.NDR
 
+    @lkg_setter
     def set_fps(self, fps: float) -> float:
         self.send_command(f"set fps {fps}")
         return self.get_fps()
@@ -442,6 +489,7 @@ class CRED1(EDTCamera):
     def max_fps(self) -> float:
         return float(self.send_command("maxfps raw"))
 
+    @lkg_setter
     def set_tint(self, tint: float) -> float:
         # CRED1 has no tint management
         return 1.0 / self.set_fps(1 / tint)
@@ -467,7 +515,7 @@ class CRED1(EDTCamera):
 
     def get_water_temperature(self) -> float:
         temp = float(self.send_command("temp water raw"))
-        logg.info(f"get_water_temperature: {temp}")
+        logg.debug(f"get_water_temperature: {temp}")
         if temp > 30.0:
             logg.warning(f"get_water_temperature: {temp}")
         if temp > 40.0:
@@ -535,12 +583,9 @@ class Apapane(CRED1):
 
         if self.HAS_REDIS:
             try:
-                with self.RDB.pipeline() as pipe:
-                    pipe.hget("X_IRCFLT", "value")
-                    pipe.hget("X_IRCWOL", "value")
-                    pipe.hget("X_IFLCST", "value")
-                    pipe.hget("X_IRCFLC", "value")
-                    filter01, wollaston, flc_on, flc_in = pipe.execute()
+                filter01, wollaston, flc_on, flc_in = redis_cache.get_values(
+                        self.RDB,
+                        ["X_IRCFLT", "X_IRCWOL", "X_IFLCST", "X_IRCFLC"])
             except:
                 logg.error("REDIS unavailable @ _fill_keywords @ Apapane")
 
@@ -10,6 +10,8 @@ import logging as logg
 from camstack.cams.edtcam import EDTCamera
 
 from camstack.core import utilities as util
+from camstack.core import redis_cache
+from camstack.core.lkg import lkg_setter
 
 
 class CRED2_GAINENUM:
@@ -60,6 +62,34 @@ class CRED2(EDTCamera):
 
     EDTTAKE_UNSIGNED = False
 
+    # yapf: disable
+    SERIAL_CACHE_POLICY = {
+            'fps raw': (2.0, ('set fps', 'set tint', 'set cropping',
+                              'set nbreadworeset', 'set extsynchro')),
+            'maxfps raw': (2.0, ('set tint', 'set cropping',
+                                 'set nbreadworeset')),
+            'tint raw': (2.0, ('set tint', 'set fps', 'set cropping',
+                               'set nbreadworeset', 'set extsynchro')),
+            'maxtint raw': (2.0, ('set fps', 'set cropping',
+                                  'set nbreadworeset')),
+            'nbreadworeset raw': (2.0, ('set nbreadworeset',)),
+            'sensibility raw': (2.0, ('set sensibility',)),
+            'extsynchro raw': (2.0, ('set extsynchro',)),
+    }
+    # yapf: enable
+
+    # fps moves with a power cycle or a cropping change: one serial round trip
+    # tells whether the camera is as the last known good says.
+    LKG_PROBES = {'set_fps': 'get_fps'}
+    # As the fps raw / tint raw invalidations above: fps clamps tint, etc.
+    # Not set_tint -> set_fps: a pair dropping each other could never be
+    # recorded together. fps is what LKG_PROBES checks anyway.
+    LKG_COUPLING = {
+            'set_fps': ('set_tint', ),
+            'set_NDR': ('set_fps', 'set_tint'),
+            'set_synchro': ('set_fps', 'set_tint'),
+    }
+
     def __init__(self, name: str, stream_name: str, mode_id: int = 0,
                  unit: int = 0, channel: int = 0,
                  taker_cset_prio: util.CsetPrioType = ('system', None),
@@ -118,6 +148,11 @@ class CRED2(EDTCamera):
 
         EDTCamera.prepare_camera_for_size(self, mode_id=mode_id)
 
+    def _mode_requires_reconfig(self, old_mode_id: util.ModeIDType,
+                                new_mode_id: util.ModeIDType) -> bool:
+        # Cropping on/off and the CROPPED keyword only depend on FULL-ness.
+        return (old_mode_id == self.FULL) != (new_mode_id == self.FULL)
+
     def prepare_camera_finalize(self,
                                 mode_id: Op[util.ModeIDType] = None) -> None:
         logg.debug('prepare_camera_finalize @ CRED2')
@@ -129,14 +164,18 @@ class CRED2(EDTCamera):
         # Changing the binning trips the external sync (at lest on OCAM ?)
         self.set_synchro(self.synchro)
 
+        settings = []
         # Initialization of the camera: reset the NDR to 1.
         if self.NDR is None:
-            self.set_NDR(1)
+            settings.append((self.set_NDR, 1))
 
         if cm.fps is not None:
-            self.set_fps(cm.fps)
+            settings.append((self.set_fps, cm.fps))
         if cm.tint is not None:
-            self.set_tint(cm.tint)
+            settings.append((self.set_tint, cm.tint))
+
+        # Only what's not already set, as per the last known good.
+        self._apply_settings(settings)
 
     def send_command(self, cmd: str, base_timeout: float = 100.0) -> str:
         # Just a little bit of parsing to handle the CRED2 format
@@ -209,6 +248,7 @@ class CRED2(EDTCamera):
         logg.error(msg)
         raise AssertionError(msg)
 
+    @lkg_setter
     def set_synchro(self, synchro: bool) -> bool:
         val = ('off', 'on')[synchro]
         _ = self.send_command(f'set extsynchro {val}')
@@ -219,6 +259,7 @@ class CRED2(EDTCamera):
         logg.info(f'set_synchro: {self.synchro}')
         return self.synchro
 
+    @lkg_setter
     def set_gain(self, gain: Union[int, str]) -> int:
         if type(gain) is int:
             gain = CRED2_GAINENUM.STR2INT_MAP[gain]
@@ -235,6 +276,7 @@ class CRED2(EDTCamera):
         logg.info(f'get_gain: {res}')
         return res
 
+    @lkg_setter
     def set_NDR(self, NDR: int) -> int:
         self.send_command(f'set nbreadworeset {NDR}')
         return self.get_NDR()
@@ -247,6 +289,7 @@ class CRED2(EDTCamera):
         logg.info(f'get_NDR: {self.NDR}')
         return self.NDR
 
+    @lkg_setter
     def set_fps(self, fps: float) -> float:
         self.send_command(f'set fps {fps}')
         return self.get_fps()
@@ -260,6 +303,7 @@ class CRED2(EDTCamera):
     def max_fps(self) -> float:
         return float(self.send_command('maxfps raw'))
 
+    @lkg_setter
     def set_tint(self, tint: float) -> float:
         self.send_command(f'set tint {tint}')
         return self.get_tint()
@@ -419,8 +463,8 @@ class Palila(CRED2):
 
         if self.HAS_REDIS:
             try:
-                self._set_formatted_keyword('FILTER01',
-                                            self.RDB.hget('X_IRCFLT', 'value'))
+                self._set_formatted_keyword(
+                        'FILTER01', redis_cache.get_value(self.RDB, 'X_IRCFLT'))
             except:
                 pass
 
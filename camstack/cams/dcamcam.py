@@ -128,7 +128,7 @@ class DCAMCamera(ParamsSHMCamera):
         # This is a faster version of the intended:
         # self.set_camera_mode(self.current_mode_id)
 
-        with self.control_shm_lock:
+        with self.control_lock.write(), self.control_shm_lock:
             self._kill_taker_no_dependents()
             self.prepare_camera_for_size(
                     self.current_mode_id,
@@ -296,7 +296,7 @@ class OrcaQuest(DCAMCamera):
             raise ValueError(f"Unrecognized readout mode: {mode}")
 
         # preserve trigger mode
-        with self.control_shm_lock:
+        with self.control_lock.write(), self.control_shm_lock:
             self._kill_taker_no_dependents()
             self.prepare_camera_for_size(params_injection={
                     dcamprop.EProp.READOUTSPEED: readmode,
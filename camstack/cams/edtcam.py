@@ -5,18 +5,65 @@ import typing as typ
 import os
 import subprocess
 import time
+import hashlib
+import functools
 import logging as logg
 
+if typ.TYPE_CHECKING:
+    from hwmain.edt.edtinterface import EdtInterfaceSerial
+
 from camstack.cams.base import BaseCamera
-from hwmain.edt.edtinterface import EdtInterfaceSerial
+from camstack.core.serial_cache import SerialQueryCache, SerialCachePolicyType
+from camstack.core import tracing
 
 from camstack.core.utilities import (ModeIDorHWType, CsetPrioType,
                                      DependentProcess)
 
+# (pdv_unit, pdv_channel) -> hash of the cfg we last initcam'd on that channel.
+# Per process: a fresh camera server always runs initcam once.
+_EDT_APPLIED_CFG: typ.Dict[typ.Tuple[int, int], str] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _read_base_cfg(path: str, mtime_ns: int) -> typ.Tuple[str, int]:
+    '''
+        Content and number of taps of an EDT cfg file.
+        mtime_ns is only there so that we re-read an edited file.
+    '''
+    with open(path, 'r') as file:
+        content = file.read()
+
+    for line in content.splitlines():
+        linespl = line.rstrip().split()
+        if len(linespl) > 0 and linespl[0] == "CL_DATA_PATH_NORM:":
+            return content, int('0x' + linespl[1][0], 16) + 1
+
+    msg = f'EDT cfg file {path} contains no CL_DATA_PATH_NORM directive.'
+    logg.error(msg)
+    raise AssertionError(msg)
+
+
+def _write_generated_cfg(content: str) -> typ.Tuple[str, str]:
+    '''
+        Content-addressed store of the cfg files we generate.
+        Returns (hash, path).
+    '''
+    digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+    # Adding a username here, because we can't overwrite the files of another user !
+    cache_dir = '/tmp/' + os.environ['USER'] + '_edtcfg'
+    path = f'{cache_dir}/{digest}.cfg'
+    if not os.path.isfile(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}'
+        with open(tmp_path, 'w') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+    return digest, path
+
 
 class EDTCamera(BaseCamera):
 
-    INTERACTIVE_SHELL_METHODS = ['send_command'] + \
+    INTERACTIVE_SHELL_METHODS = ['send_command', 'print_serial_stats'] + \
         BaseCamera.INTERACTIVE_SHELL_METHODS
 
     MODES = {}
@@ -29,6 +76,9 @@ class EDTCamera(BaseCamera):
     EDTTAKE_UNSIGNED = True
     EDTTAKE_EMBEDMICROSECOND = False  # We want this for CRED1 / 2 but not elsewhere
 
+    # Serial queries that may be answered from cache - see core.serial_cache
+    SERIAL_CACHE_POLICY: SerialCachePolicyType = {}
+
     def __init__(self, name: str, stream_name: str,
                  mode_id_or_hw: ModeIDorHWType, pdv_unit: int, pdv_channel: int,
                  pdv_basefile: str, no_start: bool = False,
@@ -43,6 +93,7 @@ class EDTCamera(BaseCamera):
 
         # See self.init_framegrab_backend
         self.edt_iface: EdtInterfaceSerial | None = None
+        self.serial_cache = SerialQueryCache(self.SERIAL_CACHE_POLICY)
 
         BaseCamera.__init__(self, name, stream_name, mode_id_or_hw,
                             no_start=no_start, taker_cset_prio=taker_cset_prio,
@@ -55,43 +106,74 @@ class EDTCamera(BaseCamera):
             logg.error(msg)
             raise AssertionError(msg)
 
-        self.width_fg = self.width * (1, 2)[self.EDTTAKE_CAST]
+        digest, cfg_path = self._generated_cfg()
+
+        # Init the EDT FG - unless it's already in that exact configuration.
+        board = (self.pdv_unit, self.pdv_channel)
+        if _EDT_APPLIED_CFG.get(board) == digest:
+            logg.info(f'init_framegrab_backend @ EDTCamera: cfg {digest} '
+                      f'already loaded on unit {self.pdv_unit} channel '
+                      f'{self.pdv_channel}, skipping initcam.')
+        else:
+            _EDT_APPLIED_CFG.pop(board, None)  # Unknown if initcam fails.
+            with tracing.span('initcam'):
+                res = subprocess.run(
+                        (f'/opt/EDTpdv/initcam -u {self.pdv_unit}'
+                         f' -c {self.pdv_channel} -f {cfg_path}').split(' '),
+                        stdout=subprocess.PIPE)
+            if res.returncode == 0:
+                _EDT_APPLIED_CFG[board] = digest
+            else:
+                logg.error(f'initcam failed on unit {self.pdv_unit} channel '
+                           f'{self.pdv_channel} [{res.returncode}].')
+            # It's possible initcam messed with the serial, so we reopen it
+            self.edt_iface = None
 
-        # Prepare a cfg file like the base one + width and height amended
+        # Open a serial handle
+        if self.edt_iface is None:
+            self.edt_iface = self._open_serial_iface()
+            self.serial_cache.invalidate()
+
+    def _generated_cfg(self) -> typ.Tuple[str, str]:
+        '''
+            A cfg file like the base one + width and height amended.
+            Also finds out pdv_taps. Returns (hash, path).
+        '''
+        self.width_fg = self.width * (1, 2)[self.EDTTAKE_CAST]
 
-        tmp_config = '/tmp/' + os.environ['USER'] + '_' + self.NAME + '.cfg'
-        # Adding a username here, because we can't overwrite the file of another user !
-        res = subprocess.run(['cp', self.pdv_basefile, tmp_config],
-                             stdout=subprocess.PIPE)
-        if res.returncode != 0:
+        try:
+            base_cfg, self.pdv_taps = _read_base_cfg(
+                    self.pdv_basefile,
+                    os.stat(self.pdv_basefile).st_mtime_ns)
+        except FileNotFoundError:
             msg = f'EDT cfg file {self.pdv_basefile} not found.'
             logg.error(msg)
             raise FileNotFoundError(msg)
 
-        # Find the number of taps from the file.
-        with open(tmp_config, 'r') as file:
-            for line in file:
-                if line == "":  # File finished
-                    msg = f'EDT cfg file {self.pdv_basefile} contains no CL_DATA_PATH_NORM directive.'
-                    logg.error(msg)
-                    raise AssertionError(msg)
-                linespl = line.rstrip().split()
-                if len(linespl) > 0 and linespl[0] == "CL_DATA_PATH_NORM:":
-                    self.pdv_taps = int('0x' + linespl[1][0], 16) + 1
-
-        with open(tmp_config, 'a') as file:
-            file.write(f'\n\n'
-                       f'width: {self.width_fg}\n'
-                       f'height: {self.height}\n')
-
-        # Init the EDT FG
-        subprocess.run((f'/opt/EDTpdv/initcam -u {self.pdv_unit}'
-                        f' -c {self.pdv_channel} -f {tmp_config}').split(' '),
-                       stdout=subprocess.PIPE)
+        return _write_generated_cfg(base_cfg + f'\n\n'
+                                    f'width: {self.width_fg}\n'
+                                    f'height: {self.height}\n')
 
-        # Open a serial handle
-        # It's possible initcam messed with it so we reopen it
-        self.edt_iface = EdtInterfaceSerial(self.pdv_unit, self.pdv_channel)
+    def attach_framegrab_backend(self) -> bool:
+        logg.debug('attach_framegrab_backend @ EDTCamera')
+        # The running taker was started on the cfg of the running mode.
+        # Remember it, so that a set_camera_mode to it skips initcam.
+        digest, _ = self._generated_cfg()
+        _EDT_APPLIED_CFG[(self.pdv_unit, self.pdv_channel)] = digest
+
+        if self.edt_iface is None:
+            self.edt_iface = self._open_serial_iface()
+            self.serial_cache.invalidate()
+        return True
+
+    def _open_serial_iface(self) -> EdtInterfaceSerial:
+        '''
+            Overridable, e.g. to talk to a protocol emulator
+            (see camstack.bench.serial_emulators)
+        '''
+        # Imported here so that the control classes load without hwmain.
+        from hwmain.edt.edtinterface import EdtInterfaceSerial
+        return EdtInterfaceSerial(self.pdv_unit, self.pdv_channel)
 
     def _prepare_backend_cmdline(self, reuse_shm: bool = False) -> None:
 
@@ -116,11 +198,18 @@ class EDTCamera(BaseCamera):
             Wrap to the serial
             That supposes we HAVE serial... maybe we'll move this to a subclass
         '''
-        assert self.edt_iface is not None  # mypy happy.
-
         logg.debug(f'EDTCamera: send_command: "{cmd}"')
 
-        return self.edt_iface.send_command(cmd, base_timeout=base_timeout)
+        # Not during a mode change: the serial may be reopened.
+        with self.control_lock.read(), tracing.span('serial', cmd=cmd):
+            edt_iface = self.edt_iface
+            assert edt_iface is not None  # mypy happy.
+            return self.serial_cache.send(
+                    cmd, lambda: edt_iface.send_command(
+                            cmd, base_timeout=base_timeout))
+
+    def print_serial_stats(self) -> None:
+        print(self.serial_cache.report())
 
     def raw(self, cmd: str) -> str:
         '''
@@ -64,6 +64,15 @@ class NUVU(EDTCamera):
     EDTTAKE_UNSIGNED = True
     EDTTAKE_EMBEDMICROSECOND = False
 
+    # Same command with an argument sets. "ld <n>" reloads everything.
+    SERIAL_CACHE_POLICY = {
+            'se': (2.0, ('se', 'ld')),
+            'sw': (2.0, ('sw', 'ld')),
+            'rsrt': (2.0, ('se', 'sw', 'ld', 'cdsbinmode')),
+            'seg': (2.0, ('seg', 'ld')),
+            'ss': (0.5, ('ld', )),
+    }
+
     class _ShutterExternal(Enum):
         NO = 0
         YES = 1
@@ -303,8 +312,8 @@ class NUVU(EDTCamera):
         (success, answer) = self.send_command("se")
         if success:
             texp = float(answer)
-            self.camera_shm.update_keyword('EXPTIME', texp)
-            self.camera_shm.update_keyword('FRATE', 1. / texp)
+            self._set_formatted_keyword('EXPTIME', texp)
+            self._set_formatted_keyword('FRATE', 1. / texp)
             return float(answer)
         return 'failed'
 
@@ -489,7 +498,7 @@ class NUVU(EDTCamera):
                 cmd=self.cfgdict['GetTempCCDCmd']))
         if success:
             temp = float(answer['1'])
-            self.camera_shm.update_keyword('DET-TMP', temp + 273.15)
+            self._set_formatted_keyword('DET-TMP', temp + 273.15)
             return (temp)
         return 'failed'
 
@@ -523,7 +532,7 @@ class NUVU(EDTCamera):
                 cmd=self.cfgdict['AnalogicGetGainCmd']))
         if success:
             gain = int(answer['Gain 1'])
-            self.camera_shm.update_keyword('GAIN', gain)
+            self._set_formatted_keyword('GAIN', gain)
             return gain
         return 'failed'
 
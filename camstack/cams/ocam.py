@@ -8,6 +8,7 @@ import logging as logg
 
 from camstack.cams.edtcam import EDTCamera
 from camstack.core import utilities as util
+from camstack.core import redis_cache
 
 from pyMilk.interfacing.isio_shmlib import SHM
 
@@ -41,6 +42,13 @@ class OCAM2K(EDTCamera):
     EDTTAKE_CAST = True
     EDTTAKE_UNSIGNED = True
 
+    # Same command with an argument sets.
+    SERIAL_CACHE_POLICY = {
+            'gain': (2.0, ('gain', 'protection reset')),
+            'fps': (2.0, ('fps', 'binning', 'synchro')),
+            'temp': (0.5, ('temp', )),
+    }
+
     REDIS_PUSH_ENABLED = True
     REDIS_PREFIX = 'x_P'
 
@@ -104,15 +112,22 @@ class OCAM2K(EDTCamera):
             self.send_command_parsed('binning on')
 
         # AD HOC PREPARE DEPENDENTS
-        # Change the argument to ocam_decode
         for dep_proc in self.dependent_processes:
-            if 'decode' in dep_proc.cli_cmd:
-                dep_proc.cli_args = [mode_id]
-            if 'shmimTCPreceive' in dep_proc.cli_cmd:  # This is very likely obsolete to MAGIC_HEIGHT_KW... in BaseCamera.
-                cm = self.current_mode
-                h, w = (cm.x1 - cm.x0 + 1) // cm.binx, (cm.y1 - cm.y0 +
-                                                        1) // cm.biny
-                dep_proc.cli_args = [dep_proc.cli_args[0], h, w]
+            dep_proc.cli_args = self._dependent_cli_args_for_mode(
+                    dep_proc, mode_id)
+
+    def _dependent_cli_args_for_mode(self, dep_proc: util.DependentProcess,
+                                     mode_id: util.ModeIDType
+                                     ) -> List[util.KWType]:
+        # Change the argument to ocam_decode
+        if 'decode' in dep_proc.cli_cmd:
+            return [mode_id]
+        if 'shmimTCPreceive' in dep_proc.cli_cmd:  # This is very likely obsolete to MAGIC_HEIGHT_KW... in BaseCamera.
+            cm = self.MODES[mode_id]
+            h, w = (cm.x1 - cm.x0 + 1) // cm.binx, (cm.y1 - cm.y0 +
+                                                    1) // cm.biny
+            return [dep_proc.cli_args[0], h, w]
+        return list(dep_proc.cli_args)
 
     def prepare_camera_finalize(self,
                                 mode_id: Op[util.ModeIDType] = None) -> None:
@@ -166,10 +181,8 @@ class OCAM2K(EDTCamera):
     def poll_camera_for_keywords(self) -> None:
         if self.HAS_REDIS:
             try:
-                with self.RDB.pipeline() as pipe:
-                    pipe.hget('X_PYWFLT', 'value')
-                    pipe.hget('X_PYWPKO', 'value')
-                    vals = pipe.execute()
+                vals = redis_cache.get_values(self.RDB,
+                                              ['X_PYWFLT', 'X_PYWPKO'])
                 self._set_formatted_keyword('FILTER01', vals[0])
                 self._set_formatted_keyword('PICKOFF1', vals[1])
             except:
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from types import TracebackType
 import typing as typ
 
 import os
 import logging as logg
 
-from camstack.cams.base import BaseCamera
+from camstack.cams.base import BaseCamera, _sem_timedwait
 from camstack.core import utilities as util
+from camstack.core.coalescer import WriteCoalescer
+from camstack.core.rwlock import InstrumentedRWLock
 from camstack.core.tmux import find_pane_running_pid
 
 from pyMilk.interfacing.shm import SHM
@@ -15,35 +16,7 @@ from pyMilk.interfacing.shm import SHM
 import numpy as np
 
 import time
-import threading
-
-
-class WrappingVerboseRLock:
-
-    def __init__(self) -> None:
-        self.rlock = threading.RLock()
-
-    def acquire(self, *args, **kwargs):
-        print(f'{threading.current_thread()} acquiring RLock...', end='')
-        r = self.rlock.acquire(*args, **kwargs)
-        print(('DENIED.', 'acquired.')[r])
-        return r
-
-    def release(self, *args, **kwargs):
-        print(f'{threading.current_thread()} releasing RLock...', end='')
-        self.rlock.release(*args, **kwargs)
-        print('released.')
-
-    def __enter__(self):
-        print(f'{threading.current_thread()} entering RLock...', end='')
-        self.rlock.__enter__()
-        print('entered.')
-
-    def __exit__(self, t: type[BaseException] | None, v: BaseException | None,
-                 tb: TracebackType | None) -> None:
-        print(f'{threading.current_thread()} exiting RLock...', end='')
-        self.rlock.__exit__(t, v, tb)
-        print('exited.')
+from concurrent.futures import Future
 
 
 class ParamsSHMCamera(BaseCamera):
@@ -62,12 +35,33 @@ class ParamsSHMCamera(BaseCamera):
     # encodes a "Invalid property" returned from the framegrab process
     PARAMS_SHM_INVALID_MAGIC = -8.0085
 
+    # Sequence-numbered requests - see _prm_setgetmultivalue
+    PARAMS_SHM_SEQ_KEY = '_SEQ'
+    PARAMS_SHM_ACK_KEY = '_SEQACK'
+    PARAMS_SHM_ACK_TIMEOUT = 5.0  # [s]
+
+    # Writes within that window are merged into one transaction - see _prm_submit
+    # 0.0 disables the coalescing.
+    PARAMS_SHM_COALESCE_WINDOW = 0.002  # [s]
+
     def __init__(self, *args, **kwargs) -> None:
 
         # Do basic stuff
         self.control_shm: typ.Optional[SHM] = None
-        # Need an RLock because during the set_camera_mode we eventually get to a _prm_setget_multivalue for fill_keywords.
-        self.control_shm_lock = WrappingVerboseRLock()  #threading.RLock()
+        # Last request sequence number. Never reset, even across restarts.
+        self._params_seq = 0
+        # Does the running backend ack requests? Found out upon every restart.
+        self._params_ack_supported = False
+        # Exclusive, one params SHM transaction at a time - or a whole restart.
+        # Must be reentrant because during the set_camera_mode we eventually get to a _prm_setget_multivalue for fill_keywords.
+        # Always taken after self.control_lock, if both.
+        self.control_shm_lock = InstrumentedRWLock('params SHM')
+        # Holding control_lock for writing (init, restarts...), nobody else
+        # is writing: don't wait out the window.
+        self.prm_write_coalescer = WriteCoalescer(
+                self._prm_execute_writes, self.PARAMS_SHM_COALESCE_WINDOW,
+                self.control_shm_lock,
+                run_inline=lambda: self.control_lock._is_owned())
 
         super().__init__(*args, **kwargs)
 
@@ -87,9 +81,22 @@ class ParamsSHMCamera(BaseCamera):
             self.control_shm = SHM(self.STREAMNAME + "_params_fb",
                                    np.zeros((1, ), dtype=np.int32))
 
+    def attach_framegrab_backend(self) -> bool:
+        logg.debug("attach_framegrab_backend @ ParamsSHMCamera")
+        # Open - not create: the running backend is listening on that one.
+        self.control_shm = SHM(self.STREAMNAME + "_params_fb")
+
+        fb_keywords = self.control_shm.get_keywords()
+        self._params_ack_supported = self.PARAMS_SHM_ACK_KEY in fb_keywords
+        # Carry on the previous server's sequence numbers:
+        # a stale ack must not pass for the answer to our next request.
+        self._params_seq = max(int(fb_keywords.get(self.PARAMS_SHM_SEQ_KEY, 0)),
+                               int(fb_keywords.get(self.PARAMS_SHM_ACK_KEY, 0)))
+        return True
+
     def set_camera_mode(self, mode_id: util.ModeIDType, **kwargs) -> None:
         # Wrap into something thread-safe during the restart.
-        with self.control_shm_lock:
+        with self.control_lock.write(), self.control_shm_lock:
             return super().set_camera_mode(mode_id, **kwargs)
 
     def _ensure_backend_restarted(self) -> None:
@@ -113,6 +120,13 @@ class ParamsSHMCamera(BaseCamera):
                 raise RuntimeError('dcam/pvcam grabber crashed during restard.')
 
             if self.control_shm.check_sem_trywait():
+                # A backend that acks requests advertises it in the keywords
+                # of its restart feedback.
+                self._params_ack_supported = (
+                        self.PARAMS_SHM_ACK_KEY
+                        in self.control_shm.get_keywords())
+                logg.info(f'params SHM backend restarted - seq/ack protocol: '
+                          f'{self._params_ack_supported}')
                 break
 
             if k == n_secs - 1:
@@ -129,6 +143,26 @@ class ParamsSHMCamera(BaseCamera):
     def _prm_setmultivalue(self, values: typ.List[typ.Any],
                            fits_keys: typ.List[typ.Optional[str]],
                            api_cam_keys: typ.List[int]) -> typ.List[float]:
+        with self.control_lock.read():
+            return self._prm_submit(values, fits_keys, api_cam_keys).result()
+
+    def _prm_submit(self, values: typ.List[typ.Any],
+                    fits_keys: typ.List[typ.Optional[str]],
+                    api_cam_keys: typ.List[int]) -> Future[typ.List[float]]:
+        '''
+            Queue a write, return a future of its readback values.
+
+            Writes from concurrent callers (Pyro threads...) submitted within
+            PARAMS_SHM_COALESCE_WINDOW are merged into a single
+            _prm_setgetmultivalue transaction. Submit several writes before
+            waiting on any to have them merged from a single thread.
+        '''
+        return self.prm_write_coalescer.submit(api_cam_keys, values, fits_keys)
+
+    def _prm_execute_writes(self, api_cam_keys: typ.List[int],
+                            values: typ.List[typ.Any],
+                            fits_keys: typ.List[typ.Optional[str]]
+                            ) -> typ.List[float]:
         return self._prm_setgetmultivalue(values, fits_keys, api_cam_keys,
                                           getonly_flag=False)
 
@@ -138,8 +172,9 @@ class ParamsSHMCamera(BaseCamera):
 
     def _prm_getmultivalue(self, fits_keys: typ.List[typ.Optional[str]],
                            api_cam_keys: typ.List[int]) -> typ.List[float]:
-        return self._prm_setgetmultivalue([0.0] * len(fits_keys), fits_keys,
-                                          api_cam_keys, getonly_flag=True)
+        with self.control_lock.read():
+            return self._prm_setgetmultivalue([0.0] * len(fits_keys), fits_keys,
+                                              api_cam_keys, getonly_flag=True)
 
     def _prm_setgetmultivalue(
             self,
@@ -155,6 +190,11 @@ class ParamsSHMCamera(BaseCamera):
             before posting the data anew.
             To avoid a race, we need to wait twice for a full loop
 
+            Unless the backend supports the seq/ack protocol: then the request
+            carries a sequence number in PARAMS_SHM_SEQ_KEY, and the backend
+            echoes it in PARAMS_SHM_ACK_KEY when it posts the answer.
+            We wait for exactly that, whatever the frame rate.
+
             To perform set-gets and just gets with the same procedure... we leverage the hexmasks
             All parameters (see Eprop in dcamprop.py) are 32 bit starting with 0x0
             We set the first bit to 1 if it's a set.
@@ -179,18 +219,27 @@ class ParamsSHMCamera(BaseCamera):
             dcam_string_keys = [f"{dcam_key:08x}" for dcam_key in dcam_keys]
 
         with self.control_shm_lock:
-            self.control_shm.reset_keywords({
+            request: typ.Dict[str, typ.Any] = {
                     dk: v
                     for dk, v in zip(dcam_string_keys, values)
-            })
+            }
+            if self._params_ack_supported:
+                self._params_seq += 1
+                request[self.PARAMS_SHM_SEQ_KEY] = self._params_seq
+
+            self.control_shm.reset_keywords(request)
             self.control_shm.set_data(self.control_shm.get_data() * 0 +
                                       n_keywords)  # Toggle grabber process
-            self.control_shm.multi_recv_data(3, True,
-                                             timeout=1.0)  # Ensure re-sync
+
+            if self._params_ack_supported:
+                fb_keywords = self._wait_params_ack(self._params_seq)
+            else:
+                self.control_shm.multi_recv_data(3, True,
+                                                 timeout=1.0)  # Ensure re-sync
+                fb_keywords = self.control_shm.get_keywords()
 
             fb_values: typ.List[float] = [
-                    self.control_shm.get_keywords()[dk]
-                    for dk in dcam_string_keys
+                    fb_keywords[dk] for dk in dcam_string_keys
             ]  # Get back the cam value
 
         for idx, (fk, dcamk) in enumerate(zip(fits_keys, dcam_keys)):
@@ -206,6 +255,27 @@ class ParamsSHMCamera(BaseCamera):
 
         return fb_values
 
+    def _wait_params_ack(self, seq: int) -> typ.Dict[str, typ.Any]:
+        '''
+            Wait for the backend to echo seq, and return the answer keywords.
+            Upon timeout, return whatever is there - as the legacy path does.
+        '''
+        assert self.control_shm
+
+        t_start = time.time()
+        while True:
+            fb_keywords = self.control_shm.get_keywords()
+            if fb_keywords.get(self.PARAMS_SHM_ACK_KEY) == seq:
+                return fb_keywords
+
+            remaining = self.PARAMS_SHM_ACK_TIMEOUT - (time.time() - t_start)
+            if remaining <= 0.0:
+                logg.error(f'ParamsSHMCamera: no ack for request {seq} in '
+                           f'{self.PARAMS_SHM_ACK_TIMEOUT} s.')
+                return fb_keywords
+            # Our own post from set_data wakes us up once - harmless.
+            _sem_timedwait(self.control_shm, min(remaining, 0.1))
+
     def _params_shm_return_raw_to_fits_val(self, api_key: int, value: float):
         # This call is intended to be overriden by subclasses
         # So as to amend how the return values from the feeback SHM
@@ -218,52 +288,6 @@ class ParamsSHMCamera(BaseCamera):
         # are provided (think enums... se dcamcam)
         return value  # Nothing to do here
 
-    def auxiliary_thread_run_function(self) -> None:
-        '''
-            I need to subclass this because we're having a freaking deadlock during the joining...
-            (in the base version)
-            If the control_lock is requested by the main thread,
-            this ends up blocking on the control lock during poll_camera_for_keywords
-            Then the main thread requests a join... which is impossible because the aux thread is waiting
-            on the lock.
-
-            So as a fix, we subclass the entire execution flow of the aux thread,
-            and make sure every single iteration is dependent
-            on owning the lock... non-blockingly! So we can loop-out and join.
-        '''
-
-        assert self.event is not None  # mypy happy assert
-
-        event_count = 0
-        while True:
-            ret = self.event.wait(1)
-            if ret:  # Signal to break the loop
-                break
-
-            event_count += 1
-            if event_count % 10 > 0:
-                continue
-
-            if not self.control_shm_lock.acquire(blocking=False):
-                continue
-
-            try:
-                if not self.is_taker_running():
-                    logg.critical('take_tmux_pane contains no live PID.')
-
-                # Dependents cset + RTprio checking
-                for proc in self.dependent_processes:
-                    proc.make_children_rt()
-
-                # Camera specifics !
-                try:
-                    self.poll_camera_for_keywords()
-                except Exception as e:
-                    logg.error(f"Polling thread: error [{e}]")
-
-                try:
-                    self.redis_push_values()
-                except Exception as e:
-                    logg.error(f"Polling thread: error [{e}]")
-            finally:
-                self.control_shm_lock.release()
+    def print_lock_stats(self) -> None:
+        super().print_lock_stats()
+        print(self.control_shm_lock.report())
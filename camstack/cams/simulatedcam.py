@@ -58,6 +58,11 @@ class SimulatedCam(BaseCamera):
                             taker_cset_prio=taker_cset_prio,
                             dependent_processes=dependent_processes)
 
+    def _mode_requires_reconfig(self, old_mode_id: util.ModeIDType,
+                                new_mode_id: util.ModeIDType) -> bool:
+        # Nothing here depends on the mode ID beyond its CameraMode.
+        return False
+
     def init_framegrab_backend(self) -> None:
         logg.debug('init_framegrab_backend @ SimulatedCam')
         if self.is_taker_running():
@@ -148,7 +148,7 @@ class SpinnakerUSBCamera(BaseCamera):
         self.get_tint()
         self.get_gain()
 
-        self.camera_shm.update_keyword('DETECTOR', 'FLIR Spinnaker')
+        self._set_formatted_keyword('DETECTOR', 'FLIR Spinnaker')
 
         self.poll_camera_for_keywords()
 
@@ -160,7 +160,7 @@ class SpinnakerUSBCamera(BaseCamera):
             fps = self.spinn_cam.AcquisitionResultingFrameRate()
         except:
             fps = self.spinn_cam.AcquisitionFrameRate()
-        self.camera_shm.update_keyword('FRATE', fps)
+        self._set_formatted_keyword('FRATE', fps)
         logg.info(f'get_fps: {fps}')
         return fps
 
@@ -173,7 +173,7 @@ class SpinnakerUSBCamera(BaseCamera):
 
     def get_tint(self):
         tint = self.spinn_cam.ExposureTime() * 1e-6
-        self.camera_shm.update_keyword('EXPTIME', tint)
+        self._set_formatted_keyword('EXPTIME', tint)
         logg.info(f'get_tint: {tint}')
         return tint
 
@@ -183,7 +183,7 @@ class SpinnakerUSBCamera(BaseCamera):
 
     def get_gain(self):
         gain = self.spinn_cam.Gain()
-        self.camera_shm.update_keyword('DETGAIN', gain)
+        self._set_formatted_keyword('DETGAIN', gain)
         logg.info(f'get_gain: {gain}')
         return gain
 
@@ -193,7 +193,7 @@ class SpinnakerUSBCamera(BaseCamera):
 
     def get_temperature(self):
         temp = self.spinn_cam.DeviceTemperature() + 273.15
-        self.camera_shm.update_keyword('DET-TMP', temp)
+        self._set_formatted_keyword('DET-TMP', temp)
         logg.info(f'get_temperature: {temp}')
         return temp
 
@@ -248,10 +248,10 @@ class FLIR_U3_Camera(SpinnakerUSBCamera):
     def _fill_keywords(self):
 
         SpinnakerUSBCamera._fill_keywords(self)
-        self.camera_shm.update_keyword(
+        self._set_formatted_keyword(
                 'CROPPED', self.current_mode_id
                 not in (self.FULL_GS, self.FULL_FL))
-        self.camera_shm.update_keyword('DETECTOR', 'FLIR GS3 or FL3')
+        self._set_formatted_keyword('DETECTOR', 'FLIR GS3 or FL3')
 
     def prepare_camera_for_size(self, mode_id=None):
         logg.debug('prepare_camera_for_size @ FLIR_U3_Camera')
@@ -325,9 +325,9 @@ class BlackFlyS(SpinnakerUSBCamera):
     def _fill_keywords(self):
 
         SpinnakerUSBCamera._fill_keywords(self)
-        self.camera_shm.update_keyword('CROPPED',
-                                       self.current_mode_id != self.FULL)
-        self.camera_shm.update_keyword('DETECTOR', 'BlackFly S')
+        self._set_formatted_keyword('CROPPED',
+                                    self.current_mode_id != self.FULL)
+        self._set_formatted_keyword('DETECTOR', 'BlackFly S')
 
         self._set_formatted_keyword('DETPXSZ1', 0.00345)
         self._set_formatted_keyword('DETPXSZ2', 0.00345)
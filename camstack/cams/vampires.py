@@ -6,6 +6,7 @@ import logging as logg
 import numpy as np
 
 from camstack.core import utilities as util
+from camstack.core import redis_cache
 from camstack.core.wcs import wcs_dict_init
 
 from .dcamcam import OrcaQuest
@@ -110,24 +111,13 @@ class BaseVCAM(OrcaQuest):
         retang1 = retpos1 = -1
         retang2 = retpos2 = -1
         try:
-            with self.RDB.pipeline() as pipe:
-                pipe.hget('U_FILTER', 'value')
-                pipe.hget('U_BS', 'value')
-                pipe.hget('P_STGPS1', 'value')
-                pipe.hget('P_STGPS2', 'value')
-                pipe.hget('X_POLAR', 'value')
-                pipe.hget('U_DIFFL1', 'value')
-                pipe.hget('U_DIFFL2', 'value')
-                pipe.hget("U_QWP1", "value")
-                pipe.hget("U_QWP1TH", "value")
-                pipe.hget("U_QWP2", "value")
-                pipe.hget("U_QWP2TH", "value")
-                pipe.hget("RET-ANG1", "value")
-                pipe.hget("RET-ANG2", "value")
-                pipe.hget("RET-POS1", "value")
-                pipe.hget("RET-POS2", "value")
-                filter01, bs, lp_stage, hwp_stage, scex_lp, dfl1, dfl2, qwp1, qwp1th, qwp2, qwp2th, retang1, retang2, retpos1, retpos2 = pipe.execute(
-                )
+            filter01, bs, lp_stage, hwp_stage, scex_lp, dfl1, dfl2, qwp1, qwp1th, qwp2, qwp2th, retang1, retang2, retpos1, retpos2 = redis_cache.get_values(
+                    self.RDB, [
+                            'U_FILTER', 'U_BS', 'P_STGPS1', 'P_STGPS2',
+                            'X_POLAR', 'U_DIFFL1', 'U_DIFFL2', "U_QWP1",
+                            "U_QWP1TH", "U_QWP2", "U_QWP2TH", "RET-ANG1",
+                            "RET-ANG2", "RET-POS1", "RET-POS2"
+                    ])
         except:
             logg.exception(
                     'REDIS unavailable @ poll_camera_for_keywords @ BaseVCAM')
@@ -261,9 +251,7 @@ class VCAM1(BaseVCAM):
         # Defaults
         filter02 = "Unknown"
         try:
-            with self.RDB.pipeline() as pipe:
-                pipe.hget("U_DIFFL1", "value")
-                filter02 = pipe.execute()
+            filter02 = redis_cache.get_value(self.RDB, "U_DIFFL1")
         except:
             logg.exception(
                     'REDIS unavailable @ poll_camera_for_keywords @ VCAM1')
@@ -318,7 +306,7 @@ class VCAM2(BaseVCAM):
         # Defaults
         filter02 = "Unknown"
         try:
-            filter02 = self.RDB.hget('U_DIFFL2', 'value')
+            filter02 = redis_cache.get_value(self.RDB, 'U_DIFFL2')
 
         except:
             logg.exception(
@@ -0,0 +1,149 @@
+'''
+    Multi-rate scheduler for the camera auxiliary thread.
+
+    Each task has its own period, priority and time budget, so a fast safety
+    check (e.g. CRED1 water temperature) doesn't have to wait for the slow
+    polls, and a misbehaving task can't eat the whole thread.
+
+    - Due tasks run in priority order (lower value first).
+    - Runs missed while the thread was busy are skipped, never bursted.
+    - A task exceeding its budget is skipped for its next period(s),
+      proportionally to the overrun.
+    - Every run's duration goes into a per-task LatencyHistogram.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import time
+import threading
+import logging as logg
+
+from camstack.core.utilities import LatencyHistogram
+
+
+class AuxTask:
+
+    def __init__(self, name: str, func: typ.Callable[[], typ.Any],
+                 period: float, priority: int = 10,
+                 budget: typ.Optional[float] = None) -> None:
+        self.name = name
+        self.func = func
+        self.period = period  # [s]
+        self.priority = priority  # Lower runs first
+        self.budget = budget  # [s] - None: unbounded
+
+        self.next_due = 0.0
+        self.histogram = LatencyHistogram()
+        self.n_runs = 0
+        self.n_errors = 0
+        self.n_overruns = 0  # Runs longer than budget
+        self.n_skipped = 0  # Due runs not executed (late or penalized)
+
+    def __str__(self) -> str:
+        return (f'{self.name:>20s} [{self.period:6.2f} s / prio {self.priority}'
+                f' / budget {self.budget}] - errors {self.n_errors} - '
+                f'overruns {self.n_overruns} - skipped {self.n_skipped} - '
+                f'{self.histogram.summary()}')
+
+
+class AuxScheduler:
+    '''
+        Usage:
+            sched = AuxScheduler()
+            sched.add('poll', cam.poll_camera_for_keywords, 10.0)
+            sched.run(stop_event) # Blocks until stop_event is set.
+
+        tick_lock: if provided, each batch of due tasks runs only if
+        tick_lock can be acquired non-blockingly; otherwise we retry after
+        LOCK_RETRY_INTERVAL, with a chance to notice stop_event in between.
+    '''
+
+    LOCK_RETRY_INTERVAL = 0.1  # [s]
+
+    def __init__(self) -> None:
+        self.tasks: typ.Dict[str, AuxTask] = {}
+
+    def add(self, name: str, func: typ.Callable[[], typ.Any], period: float,
+            priority: int = 10, budget: typ.Optional[float] = None) -> AuxTask:
+        '''
+            Register a task, or replace the one with the same name.
+        '''
+        task = AuxTask(name, func, period, priority, budget)
+        self.tasks[name] = task
+        return task
+
+    def remove(self, name: str) -> None:
+        self.tasks.pop(name, None)
+
+    def _run_task(self, task: AuxTask) -> None:
+        t_start = time.monotonic()
+        try:
+            task.func()
+        except Exception as e:
+            task.n_errors += 1
+            logg.error(f'Aux task {task.name}: error [{e}]')
+        t_end = time.monotonic()
+        elapsed = t_end - t_start
+
+        task.n_runs += 1
+        task.histogram.record(elapsed)
+
+        # Next slot on the original grid, skipping whatever we missed.
+        missed = int((t_end - task.next_due) // task.period)
+        task.n_skipped += missed
+        task.next_due += (missed + 1) * task.period
+
+        if task.budget is not None and elapsed > task.budget:
+            # Back off: skip as many periods as we overran budgets.
+            penalty = min(int(elapsed // task.budget), 10)
+            task.n_overruns += 1
+            task.n_skipped += penalty
+            task.next_due += penalty * task.period
+            logg.warning(f'Aux task {task.name}: {elapsed:.3f} s > budget '
+                         f'{task.budget:.3f} s - skipping {penalty} run(s).')
+
+    def run_due(self, now: typ.Optional[float] = None) -> int:
+        '''
+            Run all due tasks once, by priority. Returns how many ran.
+        '''
+        if now is None:
+            now = time.monotonic()
+        due = sorted([t for t in self.tasks.values() if t.next_due <= now],
+                     key=lambda t: t.priority)
+        for task in due:
+            self._run_task(task)
+        return len(due)
+
+    def run(self, stop_event: threading.Event,
+            tick_lock: typ.Any = None) -> None:
+        # First runs one period from now, like the legacy fixed-rate loop.
+        t_start = time.monotonic()
+        for task in self.tasks.values():
+            task.next_due = t_start + task.period
+
+        while True:
+            if len(self.tasks) == 0:
+                timeout = None
+            else:
+                next_due = min(t.next_due for t in self.tasks.values())
+                timeout = max(0.0, next_due - time.monotonic())
+            if stop_event.wait(timeout):
+                break
+
+            if tick_lock is not None:
+                if not tick_lock.acquire(blocking=False):
+                    if stop_event.wait(self.LOCK_RETRY_INTERVAL):
+                        break
+                    continue
+                try:
+                    self.run_due()
+                finally:
+                    tick_lock.release()
+            else:
+                self.run_due()
+
+    def report(self) -> str:
+        return '\n'.join(
+                str(t) for t in sorted(self.tasks.values(), key=lambda t: (
+                        t.priority, t.name)))
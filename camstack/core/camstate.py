@@ -0,0 +1,65 @@
+'''
+    Last known value of the camera parameters, and when we got them.
+
+    Fed by BaseCamera._set_formatted_keyword - that is, by every getter,
+    setter and poll that reports a keyword. Reading it never touches the
+    camera and takes no lock: entries are immutable and replaced whole,
+    and copying the table is atomic under the GIL.
+
+        cam.state.update('EXPTIME', 0.01)
+        cam.state.get('EXPTIME', max_age=5.0)  # StateEntry or None
+        cam.state.snapshot(max_age=5.0)  # {key: StateEntry}
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import time
+
+
+class StateEntry(typ.NamedTuple):
+    value: typ.Any  # As acquired - before keyword formatting
+    timestamp: float  # [s] time.time() of acquisition
+
+    def age(self, now: typ.Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.timestamp
+
+
+class CameraState:
+
+    def __init__(self) -> None:
+        self._entries: typ.Dict[str, StateEntry] = {}
+
+    def update(self, key: str, value: typ.Any,
+               timestamp: typ.Optional[float] = None) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        self._entries[key] = StateEntry(value, timestamp)
+
+    def get(self, key: str,
+            max_age: typ.Optional[float] = None) -> typ.Optional[StateEntry]:
+        '''
+            None if we don't know key, or not as recently as max_age [s].
+        '''
+        entry = self._entries.get(key)
+        if entry is None or (max_age is not None and entry.age() > max_age):
+            return None
+        return entry
+
+    def snapshot(self, keys: typ.Optional[typ.Iterable[str]] = None,
+                 max_age: typ.Optional[float] = None
+                 ) -> typ.Dict[str, StateEntry]:
+        '''
+            Entries for keys (default: all), leaving out the unknown ones
+            and those older than max_age [s].
+        '''
+        entries = self._entries.copy()
+        if keys is not None:
+            entries = {k: entries[k] for k in keys if k in entries}
+        if max_age is not None:
+            now = time.time()
+            entries = {
+                    k: e
+                    for k, e in entries.items() if e.age(now) <= max_age
+            }
+        return entries
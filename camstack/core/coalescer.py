@@ -0,0 +1,134 @@
+'''
+    Coalescing of parameter writes into batched transactions.
+
+    Writes submitted within WINDOW of the first pending one are merged into
+    a single call of execute(keys, values, fits_keys), run in a short-lived
+    thread under the transaction lock. Every submitter gets a
+    concurrent.futures.Future resolving to the readback of its own keys.
+
+    - A key written again by a later submitter closes the current
+      transaction and opens the next one: writes are executed in submission
+      order, and each submitter gets the readback of its own write.
+    - Writes arriving while a transaction is in flight make the next batch,
+      which is drained only once the transaction lock is ours.
+    - execute raising fails the futures of that transaction.
+    - A thread already owning the transaction lock executes directly:
+      it can't wait on a batch that needs that lock. So does one for which
+      run_inline() is true (e.g. holding a lock that excludes any other
+      writer - there's nothing to merge with).
+
+        coalescer = WriteCoalescer(execute, 0.002, lock)
+        fut = coalescer.submit([EXPOSURETIME], [0.01], ['EXPTIME'])
+        tint = fut.result()[0]
+
+    See ParamsSHMCamera._prm_submit.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import threading
+import logging as logg
+from concurrent.futures import Future
+
+KeyType = typ.Hashable
+ExecuteType = typ.Callable[
+        [typ.List[typ.Any], typ.List[typ.Any], typ.List[typ.Optional[str]]],
+        typ.List[typ.Any]]
+
+
+class _PendingWrite:
+
+    def __init__(self, keys: typ.List[typ.Any], values: typ.List[typ.Any],
+                 fits_keys: typ.List[typ.Optional[str]]) -> None:
+        self.keys = keys
+        self.values = values
+        self.fits_keys = fits_keys
+        self.future: Future[typ.List[typ.Any]] = Future()
+
+
+class WriteCoalescer:
+
+    def __init__(self, execute: ExecuteType, window: float, lock: typ.Any,
+                 run_inline: typ.Optional[typ.Callable[[],
+                                                       bool]] = None) -> None:
+        self.execute = execute
+        self.window = window  # [s]
+        self.lock = lock  # Must expose _is_owned(), as threading.RLock
+        self.run_inline = run_inline
+
+        self._mutex = threading.Lock()
+        self._pending: typ.List[_PendingWrite] = []
+        self._flush_scheduled = False
+
+        self.n_writes = 0
+        self.n_transactions = 0
+
+    def submit(self, keys: typ.List[typ.Any], values: typ.List[typ.Any],
+               fits_keys: typ.List[typ.Optional[str]]
+               ) -> Future[typ.List[typ.Any]]:
+        write = _PendingWrite(keys, values, fits_keys)
+
+        if (self.window <= 0.0 or self.lock._is_owned() or
+            (self.run_inline is not None and self.run_inline())):
+            self._run([write])
+            return write.future
+
+        with self._mutex:
+            self._pending.append(write)
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                timer = threading.Timer(self.window, self._flush)
+                timer.daemon = True
+                timer.start()
+
+        return write.future
+
+    def _flush(self) -> None:
+        with self.lock:
+            with self._mutex:
+                batch, self._pending = self._pending, []
+                self._flush_scheduled = False
+            self._run(batch)
+
+    def _run(self, batch: typ.List[_PendingWrite]) -> None:
+        # Split where a key comes back, so as to keep the submission order.
+        transactions: typ.List[typ.List[_PendingWrite]] = [[]]
+        keys_in: typ.Set[KeyType] = set()
+        for write in batch:
+            if not keys_in.isdisjoint(write.keys):
+                transactions.append([])
+                keys_in = set()
+            transactions[-1].append(write)
+            keys_in.update(write.keys)
+
+        self.n_writes += len(batch)
+        logg.debug(f'WriteCoalescer: {len(batch)} writes -> '
+                   f'{len(transactions)} transactions')
+        for transaction in transactions:
+            self._run_transaction(transaction)
+
+    def _run_transaction(self, batch: typ.List[_PendingWrite]) -> None:
+        # Merge - dicts keep the first-insertion order.
+        # A key repeated within a single write: the last value wins.
+        merged: typ.Dict[KeyType, typ.Tuple[typ.Any, typ.Optional[str]]] = {}
+        for write in batch:
+            for key, value, fits_key in zip(write.keys, write.values,
+                                            write.fits_keys):
+                prev_fits_key = merged[key][1] if key in merged else None
+                merged[key] = (value, fits_key or prev_fits_key)
+
+        keys = list(merged)
+        self.n_transactions += 1
+
+        try:
+            results = self.execute(keys, [merged[k][0] for k in keys],
+                                   [merged[k][1] for k in keys])
+            readback = dict(zip(keys, results))
+        except BaseException as exc:
+            for write in batch:
+                write.future.set_exception(exc)
+            return
+
+        for write in batch:
+            write.future.set_result([readback[k] for k in write.keys])
@@ -0,0 +1,41 @@
+'''
+    Deferred imports of the heavy dependencies (astropy, matplotlib, skimage,
+    PIL, Pyro...), so that camera servers and viewers don't pay for them
+    at startup - nor at all, on code paths that never use them.
+
+        fits = LazyModule('astropy.io.fits')
+        ...
+        fits.writeto(...)  # astropy.io.fits is imported here.
+
+    A missing dependency raises its ImportError upon first use.
+    See camstack.bench.importtime_bench for the startup times.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._lazy_module: typ.Optional[types.ModuleType] = None
+
+    def _load(self) -> types.ModuleType:
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    def __getattr__(self, attr: str) -> typ.Any:
+        # Only called for what's not in our own __dict__
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> typ.List[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = ('not imported yet', 'imported')[self._lazy_module is not None]
+        return f'<LazyModule {self.__name__} - {state}>'
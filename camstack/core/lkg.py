@@ -0,0 +1,178 @@
+'''
+    Last-known-good (LKG) camera configuration, persisted to local disk.
+
+    Setters decorated with @lkg_setter record (value set, readback) into
+    the camera's LKGStore, and the store is rewritten after each of them -
+    so a camera server that dies or is restarted leaves behind what the
+    camera was last configured to.
+    A setter that moves other settings on the camera (e.g. fps clamping tint)
+    first drops their entries, as listed in BaseCamera.LKG_COUPLING.
+
+    On a cold start, BaseCamera._apply_settings validates the snapshot with
+    a few getter probes (see BaseCamera.LKG_PROBES): if they read back what
+    was recorded, the camera is as we left it and only the settings that
+    differ from the snapshot are sent.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import json
+import math
+import time
+import functools
+import threading
+import logging as logg
+
+LKG_DIR = os.environ['HOME'] + '/.camstack'
+# Of the file layout. Per-camera-class versions are BaseCamera.LKG_VERSION
+FORMAT_VERSION = 1
+
+F = typ.TypeVar('F', bound=typ.Callable[..., typ.Any])
+
+
+def lkg_setter(func: F) -> F:
+    '''
+        Method decorator: drop the entries of the setters coupled to this
+        one, then record (value, readback) into the instance's lkg store,
+        if the setter returned.
+    '''
+
+    @functools.wraps(func)
+    def wrapper(self, value, *args, **kwargs):
+        store = self.__dict__.get('lkg')
+        if store is not None:  # Not before the instance has made one.
+            # Before the call: nested setters re-record what they set.
+            store.drop_coupled(func.__name__, value,
+                               self.LKG_COUPLING.get(func.__name__, ()))
+        readback = func(self, value, *args, **kwargs)
+        if store is not None:
+            store.record(func.__name__, value, readback)
+        return readback
+
+    return typ.cast(F, wrapper)
+
+
+def same_value(a: typ.Any, b: typ.Any) -> bool:
+    '''
+        Equality, but floats that went through a serial readback
+        and a JSON round trip need some leeway.
+    '''
+    if (isinstance(a, (int, float)) and isinstance(b, (int, float)) and
+                not isinstance(a, bool) and not isinstance(b, bool)):
+        return math.isclose(a, b, rel_tol=1e-6, abs_tol=1e-12)
+    return a == b
+
+
+class LKGStore:
+
+    def __init__(self, name: str, cam_class: str, version: int,
+                 directory: str = LKG_DIR) -> None:
+        self.name = name
+        self.cam_class = cam_class
+        self.version = version
+        self.path = f'{directory}/lkg_{name}.json'
+
+        self.lock = threading.Lock()
+        # setter name -> [value set, readback]
+        self.params: typ.Dict[str, typ.List[typ.Any]] = {}
+        self.mode: typ.Any = None  # Mode the params were applied in
+
+        # Does the camera match params?
+        # None: not checked since we started - False: no - True: yes.
+        self.trusted: typ.Optional[bool] = None
+
+        self.n_applied = 0
+        self.n_skipped = 0
+
+        self.load()
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, 'r') as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logg.error(f'LKGStore {self.name}: cannot read {self.path} [{e}]')
+            return False
+
+        if (content.get('format') != FORMAT_VERSION or
+                    content.get('class') != self.cam_class or
+                    content.get('version') != self.version):
+            logg.warning(f'LKGStore {self.name}: {self.path} is for '
+                         f'{content.get("class")} v{content.get("version")}, '
+                         f'not {self.cam_class} v{self.version} - ignored.')
+            return False
+
+        self.params = content['params']
+        self.mode = content['mode']
+        return True
+
+    def save(self) -> None:
+        content = {
+                'format': FORMAT_VERSION,
+                'class': self.cam_class,
+                'version': self.version,
+                'mode': self.mode,
+                'params': self.params,
+                'timestamp': time.time(),
+        }
+        # Write and rename: a crash never leaves a half-written snapshot.
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as file:
+                json.dump(content, file, indent=1)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logg.error(f'LKGStore {self.name}: cannot write {self.path} [{e}]')
+
+    def record(self, setter: str, value: typ.Any, readback: typ.Any) -> None:
+        with self.lock:
+            self.params[setter] = [value, readback]
+            self.save()
+
+    def drop_coupled(self, setter: str, value: typ.Any,
+                     coupled: typ.Iterable[str]) -> None:
+        '''
+            setter is about to set value: forget the setters it may move.
+            Unless it's the value we recorded - setting it again moves nothing.
+        '''
+        with self.lock:
+            if setter in self.params and same_value(self.params[setter][0],
+                                                    value):
+                return
+            dropped = [
+                    s for s in coupled if self.params.pop(s, None) is not None
+            ]
+            if len(dropped) > 0:
+                self.save()
+
+    def set_mode(self, mode: typ.Any) -> None:
+        with self.lock:
+            if mode != self.mode:
+                self.mode = mode
+                self.save()
+
+    def invalidate(self) -> None:
+        '''
+            The camera was reconfigured behind the setters' backs:
+            the next _apply_settings applies everything.
+        '''
+        self.trusted = False
+
+    def is_applied(self, setter: str, value: typ.Any) -> bool:
+        if not self.trusted or setter not in self.params:
+            return False
+        return same_value(self.params[setter][0], value)
+
+    def readback(self, setter: str) -> typ.Any:
+        return self.params[setter][1]
+
+    def report(self) -> str:
+        state = {None: 'unchecked', False: 'untrusted', True: 'trusted'}
+        return (f'LKG {self.name} ({state[self.trusted]}, mode {self.mode}): '
+                f'{self.n_applied} settings applied, {self.n_skipped} skipped '
+                f'- {self.path}')
@@ -0,0 +1,338 @@
+'''
+    /proc based process tree walking, signal-based termination, and in-process
+    RT priority / cpuset application.
+
+    This replaces the pgrep -P + milk-makecsetandrt forks per PID.
+    An RTApplier remembers which threads it has already configured,
+    so periodic re-application only touches threads that appeared since.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import time
+import select
+import signal
+import subprocess
+import logging as logg
+
+# Where to look for named cpusets. cgroup-v1 (cset, which mounts /cpusets on
+# our hosts) first, then cgroup-v2.
+CPUSET_ROOTS = [
+        '/cpusets', '/sys/fs/cgroup/cpuset', '/dev/cpuset', '/sys/fs/cgroup'
+]
+
+# terminate() escalation: (signal, how long to wait for the exit after it [s])
+# SIGINT first: that's the C-c we used to type in the tmux, and what the
+# takers and dependents clean up upon.
+TerminateStepsType = typ.Sequence[typ.Tuple[int, float]]
+TERMINATE_STEPS: TerminateStepsType = (
+        (signal.SIGINT, 2.0),
+        (signal.SIGTERM, 1.0),
+        (signal.SIGKILL, 1.0),
+)
+EXIT_POLL_PERIOD = 0.01  # [s] - only without pidfd
+
+
+def read_children(pid: int) -> typ.List[int]:
+    '''
+        Children PIDs from /proc/<pid>/task/*/children
+        Empty if the process is gone.
+    '''
+    children: typ.List[int] = []
+    try:
+        for tid in os.listdir(f'/proc/{pid}/task'):
+            try:
+                with open(f'/proc/{pid}/task/{tid}/children', 'r') as file:
+                    children += [int(c) for c in file.read().split()]
+            except (FileNotFoundError, ProcessLookupError):
+                pass  # Thread exited under our feet
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return sorted(children)
+
+
+def walk_tree(pid: int) -> typ.List[int]:
+    '''
+        pid and all its descendants, parents before children.
+    '''
+    tree: typ.List[int] = []
+    stack = [pid]
+    while len(stack) > 0:
+        p = stack.pop()
+        tree.append(p)
+        stack += read_children(p)[::-1]
+    return tree
+
+
+def list_threads(pid: int) -> typ.List[int]:
+    try:
+        return sorted([int(t) for t in os.listdir(f'/proc/{pid}/task')])
+    except (FileNotFoundError, ProcessLookupError):
+        return []
+
+
+def start_time(pid: int, tid: typ.Optional[int] = None) -> typ.Optional[int]:
+    '''
+        Start time (in clock ticks since boot) of a process or thread.
+        Used together with the PID to tell apart recycled PIDs.
+    '''
+    path = f'/proc/{pid}/stat' if tid is None else f'/proc/{pid}/task/{tid}/stat'
+    try:
+        with open(path, 'r') as file:
+            stat = file.read()
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+    # comm (field 2) may contain spaces and parentheses. Split after the last ')'
+    # starttime is field 22 overall, i.e. the 20th after comm.
+    return int(stat[stat.rindex(')') + 2:].split()[19])
+
+
+def is_zombie(pid: int) -> bool:
+    '''
+        Exited, but not reaped yet by its parent. False if gone altogether.
+    '''
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as file:
+            stat = file.read()
+    except (FileNotFoundError, ProcessLookupError):
+        return False
+    return stat[stat.rindex(')') + 2] == 'Z'
+
+
+def is_gone(pid: int) -> bool:
+    return not os.path.exists(f'/proc/{pid}') or is_zombie(pid)
+
+
+def _open_pidfd(pid: int) -> typ.Optional[int]:
+    '''
+        None if pidfds aren't supported. ProcessLookupError if pid is gone.
+    '''
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except ProcessLookupError:
+        raise
+    except OSError:  # ENOSYS - kernel < 5.3
+        return None
+
+
+def wait_exit(pid: int, timeout: float,
+              pidfd: typ.Optional[int] = None) -> bool:
+    '''
+        Block until pid has exited, or for timeout [s]. True if it has.
+        With a pidfd we wake up upon the exit, else we poll /proc.
+    '''
+    if pidfd is not None:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        return len(poller.poll(timeout * 1e3)) > 0
+
+    deadline = time.monotonic() + timeout
+    while not is_gone(pid):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(EXIT_POLL_PERIOD)
+    return True
+
+
+def signal_job(pid: int, sig: int) -> None:
+    '''
+        Signal the process group if pid leads one - a shell job, as a
+        keystroke in its terminal would - else just pid.
+    '''
+    if os.getpgid(pid) == pid:
+        os.killpg(pid, sig)
+    else:
+        os.kill(pid, sig)
+
+
+def terminate(pid: int,
+              steps: TerminateStepsType = TERMINATE_STEPS) -> typ.Optional[int]:
+    '''
+        Signal pid (its job) through steps, returning as soon as it's gone.
+        Returns the signal that did it - 0 if it was gone already -
+        or None if it survived all the steps.
+        May raise PermissionError.
+    '''
+    try:
+        # Before signaling: the pidfd can't be fooled by a recycled PID.
+        pidfd = _open_pidfd(pid)
+    except ProcessLookupError:
+        return 0
+    try:
+        if is_gone(pid):
+            return 0
+        for sig, timeout in steps:
+            try:
+                signal_job(pid, sig)
+            except ProcessLookupError:
+                return sig
+            if wait_exit(pid, timeout, pidfd):
+                return sig
+        return None
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def parse_cpu_list(cpu_list: str) -> typ.Set[int]:
+    '''
+        '0-3,8,10-11' -> {0, 1, 2, 3, 8, 10, 11}
+    '''
+    cpus: typ.Set[int] = set()
+    for chunk in cpu_list.strip().split(','):
+        if chunk == '':
+            continue
+        if '-' in chunk:
+            lo, hi = chunk.split('-')
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(chunk))
+    return cpus
+
+
+def find_cpuset_dir(cset: str) -> typ.Optional[str]:
+    for root in CPUSET_ROOTS:
+        path = os.path.join(root, cset)
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def read_cpuset_cpus(cpuset_dir: str) -> typ.Optional[typ.Set[int]]:
+    for fname in ('cpuset.cpus.effective', 'cpuset.effective_cpus',
+                  'cpuset.cpus'):
+        try:
+            with open(os.path.join(cpuset_dir, fname), 'r') as file:
+                cpus = parse_cpu_list(file.read())
+            if len(cpus) > 0:
+                return cpus
+        except FileNotFoundError:
+            pass
+    return None
+
+
+def _write_int(path: str, value: int) -> None:
+    with open(path, 'w') as file:
+        file.write(str(value))
+
+
+class RTApplier:
+    '''
+        Move threads into a cpuset and give them a SCHED_FIFO priority,
+        without forking.
+
+        Configured threads are cached by (tid, start time),
+        so apply_tree() on an unchanged process tree is /proc reads only.
+
+        If we lack the privileges to do it ourselves, or can't find the
+        cpuset, we fall back to milk-makecsetandrt (which sudoes), still only
+        for new PIDs.
+    '''
+
+    def __init__(self, cset: str, rtprio: int) -> None:
+        self.cset = cset
+        self.rtprio = rtprio
+
+        self.cpuset_dir = find_cpuset_dir(cset)
+        self.cpus = (None if self.cpuset_dir is None else read_cpuset_cpus(
+                self.cpuset_dir))
+
+        # Without the cpuset, we'd set SCHED_FIFO but not pin anything.
+        # milk-makecsetandrt knows better: let it do it all.
+        self.use_fallback = self.cpuset_dir is None
+        if self.use_fallback:
+            logg.warning(f'RTApplier: cpuset {cset} not found under '
+                         f'{CPUSET_ROOTS} - falling back to '
+                         f'milk-makecsetandrt.')
+
+        self._configured: typ.Dict[int, typ.Optional[int]] = {}
+
+    def apply_tree(self, root_pid: typ.Optional[int]) -> int:
+        '''
+            Configure root_pid and all its descendants.
+            Returns the number of newly configured threads.
+        '''
+        if root_pid is None:
+            return 0
+
+        seen: typ.Dict[int, typ.Optional[int]] = {}
+        n_new = 0
+        for pid in walk_tree(root_pid):
+            n_new += self._apply_pid(pid, seen)
+
+        # Whatever we didn't see is dead (or left the tree). Forget it.
+        self._configured = seen
+        return n_new
+
+    def apply(self, pid: typ.Optional[int]) -> int:
+        '''
+            Configure the threads of pid only - no descendants.
+            Returns the number of newly configured threads.
+        '''
+        if pid is None:
+            return 0
+        return self._apply_pid(pid, self._configured)
+
+    def _apply_pid(self, pid: int, seen: typ.Dict[int,
+                                                  typ.Optional[int]]) -> int:
+        n_new = 0
+        fallback_done = False
+        for tid in list_threads(pid):
+            stime = start_time(pid, tid)
+            if stime is None:
+                continue
+            cached = self._configured.get(tid)
+            seen[tid] = stime
+            if cached == stime:
+                continue
+            n_new += 1
+
+            if self.use_fallback:
+                if not fallback_done:
+                    self._apply_fallback(pid)  # Does all the threads
+                    fallback_done = True
+                continue
+
+            try:
+                self._apply_tid(tid)
+            except PermissionError:
+                logg.warning(f'RTApplier: insufficient privileges for '
+                             f'{tid} - falling back to milk-makecsetandrt.')
+                self.use_fallback = True
+                self._apply_fallback(pid)
+                fallback_done = True
+            except (ProcessLookupError, FileNotFoundError):
+                seen.pop(tid)  # Died under our feet
+            except OSError as exc:
+                # Still cached: we don't want to retry and log every poll.
+                logg.warning(f'RTApplier: cannot configure {tid}: {exc}')
+
+        self._configured.update(seen)
+        return n_new
+
+    def _apply_tid(self, tid: int) -> None:
+        if self.cpuset_dir is not None:
+            tasks_v1 = os.path.join(self.cpuset_dir, 'tasks')
+            if os.path.exists(tasks_v1):
+                _write_int(tasks_v1, tid)
+            else:
+                try:  # v2 threaded cgroup
+                    _write_int(os.path.join(self.cpuset_dir, 'cgroup.threads'),
+                               tid)
+                except OSError:
+                    _write_int(os.path.join(self.cpuset_dir, 'cgroup.procs'),
+                               tid)
+        if self.cpus is not None:
+            os.sched_setaffinity(tid, self.cpus)
+        os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(self.rtprio))
+
+    def _apply_fallback(self, pid: int) -> None:
+        subprocess.run([
+                'milk-makecsetandrt',
+                str(pid), self.cset,
+                str(self.rtprio)
+        ], stdout=subprocess.DEVNULL)
@@ -0,0 +1,183 @@
+'''
+    Per-host cache of the Redis status keys that camera pollers and viewers
+    keep asking for (filters, pickoffs, wollaston...).
+
+    One daemon per host polls those keys in a single pipeline, and publishes
+    them, each with the time it was last fetched, as a JSON snapshot in
+    tmpfs. The snapshot is replaced atomically (write + rename), so readers
+    just read a file, with no lock and no network.
+
+    Readers use get_values(), which falls back to hitting the DB
+    if the daemon isn't running or the snapshot is too old.
+
+    Run the daemon:
+        python -m camstack.core.redis_cache [<period>] [<extra keys>...]
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import sys
+import json
+import time
+import logging as logg
+
+SNAPSHOT_PATH = os.environ.get('CAMSTACK_REDIS_SNAPSHOT',
+                               '/dev/shm/camstack_redis_status.json')
+
+DEFAULT_PERIOD = 0.5  # [s]
+DEFAULT_MAX_AGE = 3.0  # [s] - Beyond that, readers go to the DB themselves.
+
+# Union of what the camera pollers and the viewers read.
+STATUS_KEYS = [
+        # Apapane / Palila / GLINT / viewers
+        'X_IRCFLT',
+        'X_IRCWOL',
+        'X_IFLCST',
+        'X_IRCFLC',
+        'X_IRCBLK',
+        'X_PALPUP',
+        'X_PALPUS',
+        'X_PHOPKO',
+        'X_RCHPKO',
+        'X_APAPKO',
+        'D_IMRPAD',
+        'D_IMRPAP',
+        'OBJECT',
+        # OCAM
+        'X_PYWFLT',
+        'X_PYWPKO',
+        # VAMPIRES
+        'U_FILTER',
+        'U_BS',
+        'P_STGPS1',
+        'P_STGPS2',
+        'X_POLAR',
+        'U_DIFFL1',
+        'U_DIFFL2',
+        'U_QWP1',
+        'U_QWP1TH',
+        'U_QWP2',
+        'U_QWP2TH',
+        'RET-ANG1',
+        'RET-ANG2',
+        'RET-POS1',
+        'RET-POS2',
+        'U_TRIGEN',
+]
+
+SnapshotType = typ.Dict[str, typ.Tuple[typ.Any, float]]  # key: (value, time)
+
+
+class RedisStatusCacheDaemon:
+
+    def __init__(self, rdb: typ.Any, keys: typ.Iterable[str],
+                 period: float = DEFAULT_PERIOD,
+                 snapshot_path: str = SNAPSHOT_PATH) -> None:
+        self.rdb = rdb
+        self.keys = list(dict.fromkeys(keys))  # Dedup, keep order
+        self.period = period
+        self.snapshot_path = snapshot_path
+
+        self.snapshot: SnapshotType = {}
+
+    def poll_once(self) -> bool:
+        try:
+            with self.rdb.pipeline() as pipe:
+                for key in self.keys:
+                    pipe.hget(key, 'value')
+                values = pipe.execute()
+        except Exception as exc:
+            # Keep serving the previous values - their timestamps will age.
+            logg.error(f'RedisStatusCacheDaemon: DB unavailable [{exc}]')
+            return False
+
+        now = time.time()
+        for key, value in zip(self.keys, values):
+            self.snapshot[key] = (value, now)
+        write_snapshot(self.snapshot, self.snapshot_path)
+        return True
+
+    def run(self) -> None:
+        logg.info(f'RedisStatusCacheDaemon: {len(self.keys)} keys every '
+                  f'{self.period} s to {self.snapshot_path}')
+        while True:
+            t_start = time.time()
+            self.poll_once()
+            time.sleep(max(0.0, self.period - (time.time() - t_start)))
+
+
+def write_snapshot(snapshot: SnapshotType,
+                   snapshot_path: str = SNAPSHOT_PATH) -> None:
+    tmp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(snapshot, file, default=str)
+    os.replace(tmp_path, snapshot_path)  # Atomic for readers.
+
+
+# Parse the snapshot only when it has been replaced
+_snapshot_cache: typ.Tuple[typ.Optional[int], SnapshotType] = (None, {})
+
+
+def read_snapshot(snapshot_path: str = SNAPSHOT_PATH) -> SnapshotType:
+    '''
+        The latest snapshot, {} if there's no daemon.
+    '''
+    global _snapshot_cache
+    try:
+        mtime_ns = os.stat(snapshot_path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    cached_mtime_ns, cached = _snapshot_cache
+    if mtime_ns == cached_mtime_ns:
+        return cached
+
+    try:
+        with open(snapshot_path, 'r') as file:
+            snapshot = {k: tuple(v) for k, v in json.load(file).items()}
+    except (OSError, ValueError):
+        return cached
+    _snapshot_cache = (mtime_ns, snapshot)
+    return snapshot
+
+
+def get_values(rdb: typ.Any, keys: typ.List[str],
+               max_age: float = DEFAULT_MAX_AGE,
+               snapshot_path: str = SNAPSHOT_PATH) -> typ.List[typ.Any]:
+    '''
+        Same as a pipeline of rdb.hget(key, 'value') for keys,
+        but served from the local snapshot if all keys are fresh enough.
+
+        May raise whatever the rdb pipeline raises on the fallback path.
+    '''
+    snapshot = read_snapshot(snapshot_path)
+    now = time.time()
+    if all(key in snapshot and now - snapshot[key][1] <= max_age
+           for key in keys):
+        return [snapshot[key][0] for key in keys]
+
+    with rdb.pipeline() as pipe:
+        for key in keys:
+            pipe.hget(key, 'value')
+        return pipe.execute()
+
+
+def get_value(rdb: typ.Any, key: str,
+              max_age: float = DEFAULT_MAX_AGE) -> typ.Any:
+    return get_values(rdb, [key], max_age=max_age)[0]
+
+
+if __name__ == '__main__':
+    from scxkw.config import redis_check_enabled
+
+    logg.basicConfig(level=logg.INFO)
+
+    rdb, has_redis = redis_check_enabled()
+    if not has_redis:
+        logg.critical('No Redis DB - nothing to cache.')
+        sys.exit(1)
+
+    period = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PERIOD
+    RedisStatusCacheDaemon(rdb, STATUS_KEYS + sys.argv[2:], period).run()
@@ -0,0 +1,227 @@
+'''
+    Reader/writer lock for camera control, with per-call-site statistics.
+
+    Shared (read) holds are for anything that doesn't restart the taker:
+    getters, live setters, auxiliary polls. Exclusive (write) holds are for
+    mode changes and taker/dependents restarts.
+
+        lock = InstrumentedRWLock('control')
+        with lock.read():
+            ...
+        with lock.write():
+            ...
+        with lock:  # Exclusive - drop-in for a threading.RLock
+            ...
+        lock.reader.acquire(blocking=False)  # Shared, threading.Lock-like
+
+    - Reentrant: a thread may nest reads in reads, reads and writes in writes.
+      Upgrading a read to a write raises RuntimeError - it would deadlock.
+    - Writers have priority: new readers wait if a writer is waiting,
+      unless they already hold the lock.
+    - Outermost holds record their wait time and hold time in
+      LatencyHistograms, per call site (the calling function, unless given).
+    - No console I/O - see report().
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import sys
+import time
+import threading
+import contextlib
+
+from camstack.core.utilities import LatencyHistogram
+
+# Kinds of holds on a thread's stack
+_READ, _READ_NESTED, _READ_IN_WRITE, _WRITE, _WRITE_NESTED = range(5)
+
+
+def _caller_site(depth: int) -> str:
+    code = sys._getframe(depth + 1).f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+
+class LockSiteStats:
+
+    def __init__(self) -> None:
+        self.wait = LatencyHistogram()
+        self.hold = LatencyHistogram()
+        self.n_denied = 0  # Non-blocking or timed-out attempts that failed
+
+
+class _LockView:
+    '''
+        threading.Lock-like handle on one mode of an InstrumentedRWLock,
+        for code that expects acquire() / release() / with.
+    '''
+
+    def __init__(self, rwlock: InstrumentedRWLock, exclusive: bool) -> None:
+        self.rwlock = rwlock
+        self.exclusive = exclusive
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self.rwlock._acquire(self.exclusive, _caller_site(1), blocking,
+                                    timeout)
+
+    def release(self) -> None:
+        self.rwlock.release()
+
+    def __enter__(self) -> bool:
+        return self.rwlock._acquire(self.exclusive, _caller_site(1))
+
+    def __exit__(self, *args: typ.Any) -> None:
+        self.rwlock.release()
+
+
+class InstrumentedRWLock:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+        self._cond = threading.Condition(threading.Lock())
+        self._writer: typ.Optional[int] = None  # Thread ident
+        self._readers: typ.Dict[int, int] = {}  # Thread ident -> depth
+        self._n_writers_waiting = 0
+        # Per thread: stack of (kind, stats, t_acquired)
+        self._local = threading.local()
+
+        # (site, exclusive) -> stats
+        self.stats: typ.Dict[typ.Tuple[str, bool], LockSiteStats] = {}
+
+        self.reader = _LockView(self, exclusive=False)
+        self.writer = _LockView(self, exclusive=True)
+
+    def _holds(self) -> typ.List[typ.Tuple[int, typ.Any, float]]:
+        holds = getattr(self._local, 'holds', None)
+        if holds is None:
+            holds = self._local.holds = []
+        return holds
+
+    def _site_stats(self, site: str, exclusive: bool) -> LockSiteStats:
+        # Under self._cond
+        key = (site, exclusive)
+        if key not in self.stats:
+            self.stats[key] = LockSiteStats()
+        return self.stats[key]
+
+    def _can_read(self) -> bool:
+        return self._writer is None and self._n_writers_waiting == 0
+
+    def _can_write(self) -> bool:
+        return self._writer is None and len(self._readers) == 0
+
+    def _acquire(self, exclusive: bool, site: str, blocking: bool = True,
+                 timeout: float = -1) -> bool:
+        me = threading.get_ident()
+        holds = self._holds()
+        t_start = time.monotonic()
+
+        with self._cond:
+            # Reentrant cases: never wait.
+            if self._writer == me:
+                holds.append(((_READ_IN_WRITE, _WRITE_NESTED)[exclusive], None,
+                              t_start))
+                return True
+            if me in self._readers:
+                if exclusive:
+                    raise RuntimeError(f'InstrumentedRWLock {self.name}: '
+                                       f'cannot upgrade read to write [{site}]')
+                self._readers[me] += 1
+                holds.append((_READ_NESTED, None, t_start))
+                return True
+
+            stats = self._site_stats(site, exclusive)
+            predicate = (self._can_read, self._can_write)[exclusive]
+
+            if not predicate():
+                if not blocking:
+                    stats.n_denied += 1
+                    return False
+                if exclusive:
+                    self._n_writers_waiting += 1
+                try:
+                    ok = self._cond.wait_for(predicate,
+                                             None if timeout < 0 else timeout)
+                finally:
+                    if exclusive:
+                        self._n_writers_waiting -= 1
+                        # Readers held back by our waiting may go now.
+                        self._cond.notify_all()
+                if not ok:
+                    stats.n_denied += 1
+                    return False
+
+            if exclusive:
+                self._writer = me
+            else:
+                self._readers[me] = 1
+
+            t_acquired = time.monotonic()
+            stats.wait.record(t_acquired - t_start)
+            holds.append(((_READ, _WRITE)[exclusive], stats, t_acquired))
+            return True
+
+    def release(self) -> None:
+        me = threading.get_ident()
+        holds = self._holds()
+        if len(holds) == 0:
+            raise RuntimeError(
+                    f'InstrumentedRWLock {self.name}: release unheld lock')
+        kind, stats, t_acquired = holds.pop()
+
+        with self._cond:
+            if kind == _READ_NESTED:
+                self._readers[me] -= 1
+            elif kind == _READ:
+                del self._readers[me]
+                self._cond.notify_all()
+            elif kind == _WRITE:
+                self._writer = None
+                self._cond.notify_all()
+
+            if stats is not None:
+                stats.hold.record(time.monotonic() - t_acquired)
+
+    @contextlib.contextmanager
+    def read(self, site: typ.Optional[str] = None) -> typ.Iterator[None]:
+        self._acquire(False, site or _caller_site(2))
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.contextmanager
+    def write(self, site: typ.Optional[str] = None) -> typ.Iterator[None]:
+        self._acquire(True, site or _caller_site(2))
+        try:
+            yield
+        finally:
+            self.release()
+
+    # threading.RLock-like surface: exclusive.
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._acquire(True, _caller_site(1), blocking, timeout)
+
+    def __enter__(self) -> bool:
+        return self._acquire(True, _caller_site(1))
+
+    def __exit__(self, *args: typ.Any) -> None:
+        self.release()
+
+    def _is_owned(self) -> bool:
+        # Exclusively, by the current thread - as threading.RLock.
+        return self._writer == threading.get_ident()
+
+    def report(self) -> str:
+        with self._cond:
+            items = sorted(self.stats.items(), key=lambda kv: kv[0])
+        lines = [f'{self.name}:']
+        for (site, exclusive), stats in items:
+            mode = ('read', 'write')[exclusive]
+            lines += [
+                    f'{site:>40s} {mode:>5s} wait: {stats.wait.summary()} - '
+                    f'denied {stats.n_denied}',
+                    f'{"":>40s} {"":>5s} hold: {stats.hold.summary()}',
+            ]
+        return '\n'.join(lines)
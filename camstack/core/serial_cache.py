@@ -0,0 +1,149 @@
+'''
+    Per-camera cache of serial query answers.
+
+    Getters like "fps raw" are re-asked several times per second during
+    _fill_keywords / set_camera_mode / set_fps verification. Each camera class
+    declares which queries may be served from cache, for how long, and which
+    setter commands invalidate them:
+
+        SERIAL_CACHE_POLICY = {
+            'fps raw': (2.0, ('set fps', 'set cropping')),
+        }
+
+    Concurrent identical queries coalesce on one wire transaction.
+    All wire transactions are serialized - there's one serial line.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import time
+import threading
+
+from camstack.core.utilities import LatencyHistogram
+
+# query -> (ttl [s], command prefixes that invalidate it)
+SerialCachePolicyEntry: typ.TypeAlias = typ.Tuple[float, typ.Tuple[str, ...]]
+SerialCachePolicyType: typ.TypeAlias = typ.Dict[str, SerialCachePolicyEntry]
+
+
+class _InFlight:
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.answer: typ.Any = None
+        self.exc: typ.Optional[BaseException] = None
+
+
+class _QueryStats:
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __str__(self) -> str:
+        n = self.hits + self.misses + self.coalesced
+        rate = 0.0 if n == 0 else (self.hits + self.coalesced) / n
+        return (f'hits {self.hits} - coalesced {self.coalesced} - '
+                f'misses {self.misses} - hit rate {rate * 100:.1f} %')
+
+
+class SerialQueryCache:
+
+    def __init__(self, policy: SerialCachePolicyType) -> None:
+        self.policy = policy
+
+        self._lock = threading.Lock()  # Protects the tables below
+        self._wire_lock = threading.Lock()  # One transaction at a time
+        self._cache: typ.Dict[str, typ.Tuple[typ.Any, float]] = {}
+        self._in_flight: typ.Dict[str, _InFlight] = {}
+        # Bumped by every invalidation. Answers fetched across a bump are
+        # returned to their caller, but not cached.
+        self._generation = 0
+
+        self.stats = {q: _QueryStats() for q in policy}
+        self.wire_histogram = LatencyHistogram()
+
+    def send(self, cmd: str, wire: typ.Callable[[], typ.Any]) -> typ.Any:
+        '''
+            Answer cmd, calling wire() only if needed.
+        '''
+        key = cmd.strip()
+        if key in self.policy:
+            return self._query(key, wire)
+
+        self._invalidate_for(key)
+        try:
+            return self._wire(wire)
+        finally:
+            # Again - a query may have gone through while we were writing.
+            self._invalidate_for(key)
+
+    def _query(self, key: str, wire: typ.Callable[[], typ.Any]) -> typ.Any:
+        stats = self.stats[key]
+        with self._lock:
+            if key in self._cache:
+                answer, t_expire = self._cache[key]
+                if time.monotonic() < t_expire:
+                    stats.hits += 1
+                    return answer
+
+            if key in self._in_flight:
+                leader = False
+                flight = self._in_flight[key]
+                stats.coalesced += 1
+            else:
+                leader = True
+                flight = self._in_flight[key] = _InFlight()
+                generation = self._generation
+                stats.misses += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.exc is not None:
+                raise flight.exc
+            return flight.answer
+
+        try:
+            flight.answer = self._wire(wire)
+        except BaseException as exc:
+            flight.exc = exc
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if flight.exc is None and generation == self._generation:
+                    self._cache[key] = (flight.answer,
+                                        time.monotonic() + self.policy[key][0])
+            flight.done.set()
+
+        return flight.answer
+
+    def _wire(self, wire: typ.Callable[[], typ.Any]) -> typ.Any:
+        with self._wire_lock:
+            t_start = time.monotonic()
+            try:
+                return wire()
+            finally:
+                self.wire_histogram.record(time.monotonic() - t_start)
+
+    def _invalidate_for(self, key: str) -> None:
+        with self._lock:
+            for query, (_, prefixes) in self.policy.items():
+                if any(key == p or key.startswith(p + ' ') for p in prefixes):
+                    self._cache.pop(query, None)
+                    self._generation += 1
+
+    def invalidate(self) -> None:
+        '''
+            Forget everything, e.g. after the serial link was reopened.
+        '''
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+
+    def report(self) -> str:
+        lines = [f'{"serial wire":>20s}: {self.wire_histogram.summary()}']
+        lines += [f'{q:>20s}: {s}' for q, s in self.stats.items()]
+        return '\n'.join(lines)
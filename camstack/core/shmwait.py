@@ -0,0 +1,153 @@
+'''
+    Event-driven waits on the appearance / re-creation of milk SHM files.
+
+    inotify through ctypes - we don't want an extra dependency for 3 syscalls.
+    If inotify is unavailable, we degrade to polling.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging as logg
+
+# <sys/inotify.h>
+IN_MODIFY = 0x0000_0002
+IN_MOVED_TO = 0x0000_0080
+IN_CREATE = 0x0000_0100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+POLL_FALLBACK_INTERVAL = 0.1  # [s]
+
+_libc: typ.Optional[ctypes.CDLL] = None
+
+
+def _get_libc() -> typ.Optional[ctypes.CDLL]:
+    global _libc
+    if _libc is None:
+        try:
+            _libc = ctypes.CDLL(
+                    ctypes.util.find_library('c') or 'libc.so.6',
+                    use_errno=True)
+            _libc.inotify_init1  # Raises AttributeError if missing
+        except (OSError, AttributeError):
+            logg.warning(
+                    'shmwait: inotify unavailable, falling back to polling.')
+            _libc = None
+    return _libc
+
+
+def shm_file_path(stream_name: str) -> str:
+    return os.environ['MILK_SHM_DIR'] + '/' + stream_name + '.im.shm'
+
+
+class ShmDirWatch:
+    '''
+        Watch $MILK_SHM_DIR for (re)creation of <stream_name>.im.shm
+
+        ImageStreamIO either creates a new inode (IN_CREATE / IN_MOVED_TO),
+        or re-opens an existing file with O_TRUNC and resizes it (IN_MODIFY).
+        Frames and keywords go through the mmap and trigger nothing.
+
+        Use as a context manager:
+            with ShmDirWatch(name) as watch:
+                watch.wait_exists()
+                ...
+                if watch.recreated(): ...
+    '''
+
+    def __init__(self, stream_name: str) -> None:
+        self.stream_name = stream_name
+        self.file_name = stream_name + '.im.shm'
+        self.path = shm_file_path(stream_name)
+
+        self.fd: typ.Optional[int] = None
+
+    def __enter__(self) -> ShmDirWatch:
+        libc = _get_libc()
+        if libc is None:
+            return self
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logg.warning(f'ShmDirWatch: inotify_init1 failed '
+                         f'[{errno.errorcode.get(ctypes.get_errno())}]')
+            return self
+        wd = libc.inotify_add_watch(fd,
+                                    os.path.dirname(self.path).encode(),
+                                    IN_CREATE | IN_MOVED_TO | IN_MODIFY)
+        if wd < 0:
+            logg.warning(f'ShmDirWatch: inotify_add_watch failed '
+                         f'[{errno.errorcode.get(ctypes.get_errno())}]')
+            os.close(fd)
+            return self
+
+        self.fd = fd
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _read_events(self, timeout: typ.Optional[float]) -> bool:
+        '''
+            Wait at most timeout for events. Returns True if any event
+            concerns our file.
+        '''
+        assert self.fd is not None
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+
+        ours = False
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(buf):
+            _, _, _, name_len = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = buf[offset:offset + name_len].rstrip(b'\0').decode()
+            offset += name_len
+            ours = ours or (name == self.file_name)
+        return ours
+
+    def wait_exists(self, timeout: typ.Optional[float] = None) -> bool:
+        '''
+            Block until the SHM file exists. False upon timeout.
+        '''
+        t_end = None if timeout is None else time.time() + timeout
+        while not os.path.isfile(self.path):
+            remaining = None if t_end is None else t_end - time.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            if self.fd is None:
+                time.sleep(POLL_FALLBACK_INTERVAL if remaining is None else min(
+                        POLL_FALLBACK_INTERVAL, remaining))
+            else:
+                self._read_events(remaining)
+        return True
+
+    def recreated(self, timeout: typ.Optional[float] = 0.0) -> bool:
+        '''
+            Did our SHM file get created / replaced since the last call?
+            Waits at most timeout for that to happen.
+
+            Without inotify, we can't know - always False.
+        '''
+        if self.fd is None:
+            if timeout:
+                time.sleep(timeout)
+            return False
+        return self._read_events(timeout)
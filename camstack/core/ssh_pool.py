@@ -0,0 +1,216 @@
+'''
+    Persistent ssh transport, one per remote host.
+
+    Rather than paying a full ssh handshake for every remote tmux / pgrep /
+    probe call, we keep one non-interactive remote shell open per host
+    and feed it command lines on stdin.
+    Each command is followed by a sentinel line carrying its exit status,
+    which delimits its stdout in the stream.
+
+    Calls that may block for long (e.g. tmux._terminate_remote) go through
+    their own channel, so as not to hold up everything else on that host.
+'''
+from __future__ import annotations
+
+from typing import Dict, List, Optional as Op, Tuple, Union
+
+import os
+import time
+import uuid
+import select
+import threading
+import subprocess
+import logging as logg
+
+
+class RemoteShellError(Exception):
+    pass
+
+
+class RemoteShellSendError(RemoteShellError):
+    '''
+        The command never made it to the remote shell: safe to retry.
+    '''
+    pass
+
+
+class RemoteShell:
+    '''
+        A long-lived shell on a remote host, spoken to with a line protocol.
+
+        For every call we write:
+            ( <command> ) </dev/null
+            printf '\\n<sentinel> %d\\n' $?
+        and read stdout up to the sentinel line.
+
+        The command line is executed by a remote /bin/sh, as it would by
+        "ssh host <command>" with a POSIX login shell - so quoting conventions
+        don't change. Whatever the remote rc files print before the shell
+        gets to read us is discarded by a first, empty exchange.
+        stderr is left to flow to our own stderr, as it did with plain ssh.
+    '''
+
+    DEFAULT_TIMEOUT = 10.0  # [s]
+
+    def __init__(self, host: str, transport_argv: Op[List[str]] = None) -> None:
+        '''
+            transport_argv: command that spawns the shell.
+                Default ssh -T <host> 'exec /bin/sh' - not a login shell, no
+                profile / motd. Anything that spawns a POSIX shell reading
+                stdin works (e.g. ['sh'] for testing).
+        '''
+        self.host = host
+        if transport_argv is None:
+            transport_argv = [
+                    'ssh', '-T', '-o', 'ServerAliveInterval=10', host,
+                    'exec /bin/sh'
+            ]
+        self.transport_argv = transport_argv
+
+        self.lock = threading.Lock()
+        self.proc: Op[subprocess.Popen[bytes]] = None
+        self._buffer = b''
+        self._sentinel = b''
+
+        self.n_connects = 0
+
+    def _connect(self, timeout: float) -> None:
+        self._disconnect()
+        try:
+            self.proc = subprocess.Popen(self.transport_argv,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE)
+        except OSError as exc:
+            raise RemoteShellSendError(f'Cannot spawn {self.transport_argv}: '
+                                       f'{exc}')
+        self._buffer = b''
+        self._sentinel = ('__camstack_eoc_' + uuid.uuid4().hex).encode()
+        self.n_connects += 1
+
+        # Handshake: drop anything that precedes our first sentinel.
+        try:
+            self._exchange(':', timeout)
+        except RemoteShellError as exc:
+            raise RemoteShellSendError(f'{self.host}: handshake failed: {exc}')
+
+    def _disconnect(self) -> None:
+        if self.proc is not None:
+            try:
+                self.proc.kill()
+                self.proc.wait(1.0)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.proc = None
+
+    def _exchange(self, command: str, timeout: float) -> Tuple[int, bytes]:
+        assert self.proc is not None
+        assert self.proc.stdin is not None and self.proc.stdout is not None
+
+        payload = (f'( {command}\n) </dev/null\n'
+                   f'printf \'\\n%s %d\\n\' {self._sentinel.decode()} $?\n')
+        try:
+            self.proc.stdin.write(payload.encode('utf8'))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            raise RemoteShellSendError(f'{self.host}: write failed: {exc}')
+
+        marker = b'\n' + self._sentinel + b' '
+        fd = self.proc.stdout.fileno()
+        deadline = time.time() + timeout
+        while True:
+            idx = self._buffer.find(marker)
+            if idx >= 0:
+                eol = self._buffer.find(b'\n', idx + len(marker))
+                if eol >= 0:
+                    break
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise RemoteShellError(f'{self.host}: timeout on {command}')
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if chunk == b'':
+                raise RemoteShellError(f'{self.host}: connection closed')
+            self._buffer += chunk
+
+        stdout = self._buffer[:idx]
+        returncode = int(self._buffer[idx + len(marker):eol])
+        self._buffer = self._buffer[eol + 1:]
+        return returncode, stdout
+
+    def run(self, command: Union[str, List[str]], check: bool = False,
+            timeout: Op[float] = None) -> subprocess.CompletedProcess[bytes]:
+        '''
+            Mimics subprocess.run(['ssh', host] + command, stdout=PIPE)
+
+            A list command is joined with spaces, same as ssh does.
+            Reconnects and retries once if the transport is dead - only if
+            the command could not be sent. Once it is, a timeout or a lost
+            connection raises: the command may have run, and running it twice
+            (send-keys, kill...) is worse than failing.
+        '''
+        if not isinstance(command, str):
+            command = ' '.join(command)
+        if timeout is None:
+            timeout = self.DEFAULT_TIMEOUT
+
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.proc is None or self.proc.poll() is not None:
+                        self._connect(timeout)
+                    returncode, stdout = self._exchange(command, timeout)
+                    break
+                except RemoteShellError as exc:
+                    # Stream state is unknown at this point. Start afresh.
+                    self._disconnect()
+                    if attempt == 1 or not isinstance(exc,
+                                                      RemoteShellSendError):
+                        raise
+                    logg.warning(f'RemoteShell {exc} - reconnecting.')
+
+        res = subprocess.CompletedProcess(['ssh', self.host, command],
+                                          returncode, stdout, None)
+        if check:
+            res.check_returncode()
+        return res
+
+    def close(self) -> None:
+        with self.lock:
+            self._disconnect()
+
+
+DEFAULT_CHANNEL = 'default'
+# Channel for tmux._terminate_remote, which can take several seconds.
+KILL_CHANNEL = 'kill'
+
+# (host, channel) -> shell
+SSH_POOL: Dict[Tuple[str, str], RemoteShell] = {}
+_SSH_POOL_LOCK = threading.Lock()
+
+
+def get_remote_shell(host: str, channel: str = DEFAULT_CHANNEL) -> RemoteShell:
+    with _SSH_POOL_LOCK:
+        if not (host, channel) in SSH_POOL:
+            SSH_POOL[(host, channel)] = RemoteShell(host)
+        return SSH_POOL[(host, channel)]
+
+
+def ssh_run(host: str, command: Union[str, List[str]], check: bool = False,
+            timeout: Op[float] = None, channel: str = DEFAULT_CHANNEL
+            ) -> subprocess.CompletedProcess[bytes]:
+    '''
+        Drop-in for subprocess.run(['ssh', host, ...], stdout=PIPE)
+        through the pooled transport.
+        Calls on the same (host, channel) are serialized.
+    '''
+    return get_remote_shell(host, channel).run(command, check=check,
+                                               timeout=timeout)
+
+
+def close_all() -> None:
+    with _SSH_POOL_LOCK:
+        for shell in SSH_POOL.values():
+            shell.close()
+        SSH_POOL.clear()
@@ -0,0 +1,388 @@
+'''
+    Supervision of the taker and dependent processes, with automatic restart.
+
+    Each armed local process is held by a pidfd in an epoll: we learn about
+    its exit within milliseconds, without polling nor forking. Without pidfd
+    (Linux < 5.3), we poll the PID and its start time - against recycled
+    PIDs - every LOCAL_POLL_PERIOD. Remote processes are polled through
+    their get_pid every REMOTE_POLL_PERIOD.
+
+    The exit of an armed process schedules its restart according to its
+    RestartPolicy: exponential backoff, and giving up after too many restarts
+    within a sliding window. Deliberate stops must disarm first.
+
+        sup = ProcessSupervisor('cam')
+        sup.watch('taker', get_pid, restart, policy, lock=cam_lock)
+        sup.start()
+        sup.arm('taker')  # After each (re)start
+        sup.disarm('taker')  # Before each deliberate stop
+        print(sup.report())
+
+    restart() runs in its own thread, under lock, unless the process was
+    disarmed or re-armed meanwhile. The process is re-armed afterwards,
+    and the downtime (exit detected -> re-armed) recorded.
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import time
+import select
+import threading
+import collections
+import logging as logg
+
+from camstack.core.proctree import start_time, is_zombie, is_gone
+from camstack.core.utilities import LatencyHistogram
+
+LOCAL_POLL_PERIOD = 0.05  # [s] - only without pidfd
+REMOTE_POLL_PERIOD = 1.0  # [s]
+
+# States of a supervised process
+DISARMED, UP, DOWN, RESTARTING, GAVE_UP = ('disarmed', 'up', 'down',
+                                           'restarting', 'gave up')
+
+
+class RestartPolicy(typ.NamedTuple):
+    enabled: bool = True  # False: only log the exit, as of old
+    backoff_initial: float = 0.1  # [s] before the first restart
+    backoff_factor: float = 2.0
+    backoff_max: float = 10.0  # [s]
+    max_restarts: int = 5  # Within window - then give up until re-armed
+    window: float = 300.0  # [s]
+
+    def delay(self, n_recent: int) -> float:
+        return min(self.backoff_initial * self.backoff_factor**n_recent,
+                   self.backoff_max)
+
+
+class SupervisedProcess:
+
+    def __init__(self, name: str, get_pid: typ.Callable[[], typ.Optional[int]],
+                 restart: typ.Callable[[], typ.Any], policy: RestartPolicy,
+                 lock: typ.Any, local: bool) -> None:
+        self.name = name
+        self.get_pid = get_pid
+        self.restart = restart
+        self.policy = policy
+        self.lock = lock  # Context manager, held during restart(). Or None.
+        self.local = local
+
+        self.state = DISARMED
+        self.generation = 0  # Bumped by arm / disarm: stale restarts bail.
+        self.pid: typ.Optional[int] = None
+        self.pid_start_time: typ.Optional[int] = None
+        self.pidfd: typ.Optional[int] = None
+        self.next_poll = 0.0
+        self.restart_due = 0.0
+        self.t_down: typ.Optional[float] = None
+        self.recent_restarts: typ.Deque[float] = collections.deque()
+
+        self.n_exits = 0
+        self.n_restarts = 0
+        self.n_failed_restarts = 0
+        self.total_downtime = 0.0  # [s]
+        self.downtime = LatencyHistogram()
+
+    def __str__(self) -> str:
+        return (f'{self.name:>20s} [{self.state:>10s} / pid {self.pid}] - '
+                f'exits {self.n_exits} - restarts {self.n_restarts} '
+                f'(failed {self.n_failed_restarts}) - downtime '
+                f'{self.total_downtime:.3f} s: {self.downtime.summary()}')
+
+
+class ProcessSupervisor:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.processes: typ.Dict[str, SupervisedProcess] = {}
+
+        self._mutex = threading.RLock()
+        self._fd_to_name: typ.Dict[int, str] = {}
+        self._use_pidfd = hasattr(os, 'pidfd_open') and hasattr(select, 'epoll')
+        self._epoll: typ.Optional[typ.Any] = None
+        self._wake_r, self._wake_w = -1, -1
+        self._stopping = False
+        self.thread: typ.Optional[threading.Thread] = None
+
+    def watch(self, name: str, get_pid: typ.Callable[[], typ.Optional[int]],
+              restart: typ.Callable[[], typ.Any],
+              policy: RestartPolicy = RestartPolicy(), lock: typ.Any = None,
+              local: bool = True) -> SupervisedProcess:
+        '''
+            Register a process - disarmed. Replaces one with the same name.
+        '''
+        with self._mutex:
+            if name in self.processes:
+                self.disarm(name)
+            proc = SupervisedProcess(name, get_pid, restart, policy, lock,
+                                     local)
+            self.processes[name] = proc
+            return proc
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        self._stopping = False
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        if self._use_pidfd:
+            self._epoll = select.epoll()
+            self._epoll.register(self._wake_r, select.EPOLLIN)
+        self.thread = threading.Thread(target=self._run,
+                                       name=f'{self.name}_supervisor',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread is None:
+            return
+        self._stopping = True
+        self._wake()
+        self.thread.join()
+        self.thread = None
+        with self._mutex:
+            for name in self.processes:
+                self.disarm(name)
+        if self._epoll is not None:
+            self._epoll.close()
+            self._epoll = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _wake(self) -> None:
+        if self._wake_w >= 0:
+            os.write(self._wake_w, b'x')
+
+    def _close_pidfd(self, proc: SupervisedProcess) -> None:
+        # Under self._mutex
+        if proc.pidfd is None:
+            return
+        self._fd_to_name.pop(proc.pidfd, None)
+        if self._epoll is not None:
+            self._epoll.unregister(proc.pidfd)
+        os.close(proc.pidfd)
+        proc.pidfd = None
+
+    def arm(self, name: str) -> None:
+        '''
+            The process is (re)started: find its PID and watch it.
+            Also ends a downtime.
+        '''
+        proc = self.processes.get(name)
+        if proc is None:
+            return
+        pid = proc.get_pid()  # May fork - not under the mutex.
+
+        with self._mutex:
+            self._close_pidfd(proc)
+            proc.generation += 1
+            proc.pid = pid
+            proc.pid_start_time = None
+            if proc.t_down is not None:
+                downtime = time.monotonic() - proc.t_down
+                proc.downtime.record(downtime)
+                proc.total_downtime += downtime
+                proc.t_down = None
+
+            if pid is not None and proc.local:
+                proc.pid_start_time = start_time(pid)
+                if proc.pid_start_time is None:
+                    pid = None  # Already gone
+                elif self._use_pidfd and self._epoll is not None:
+                    try:
+                        proc.pidfd = os.pidfd_open(pid)
+                        self._fd_to_name[proc.pidfd] = name
+                        self._epoll.register(proc.pidfd, select.EPOLLIN)
+                    except ProcessLookupError:
+                        pid = None  # Already gone
+
+            proc.state = UP
+            proc.next_poll = time.monotonic() + (LOCAL_POLL_PERIOD if proc.local
+                                                 else REMOTE_POLL_PERIOD)
+            if pid is None:
+                logg.warning(f'ProcessSupervisor {self.name}: {name} '
+                             f'armed but not running.')
+                self._on_exit(proc, time.monotonic())
+        self._wake()
+
+    def disarm(self, name: str) -> None:
+        '''
+            The process is about to be stopped deliberately.
+        '''
+        with self._mutex:
+            proc = self.processes.get(name)
+            if proc is None:
+                return
+            self._close_pidfd(proc)
+            proc.generation += 1
+            proc.state = DISARMED
+            proc.t_down = None  # Not an outage anymore: it's wanted.
+
+    def is_up(self, name: str) -> bool:
+        proc = self.processes.get(name)
+        return proc is not None and proc.state == UP
+
+    def _on_exit(self, proc: SupervisedProcess, now: float) -> None:
+        # Under self._mutex
+        self._close_pidfd(proc)
+        proc.state = DOWN
+        proc.n_exits += 1
+        if proc.t_down is None:
+            proc.t_down = now
+
+        if not proc.policy.enabled:
+            logg.critical(f'ProcessSupervisor {self.name}: {proc.name} '
+                          f'(pid {proc.pid}) is dead - no restart policy.')
+            return
+
+        while (len(proc.recent_restarts) > 0 and
+               proc.recent_restarts[0] < now - proc.policy.window):
+            proc.recent_restarts.popleft()
+        n_recent = len(proc.recent_restarts)
+        if n_recent >= proc.policy.max_restarts:
+            proc.state = GAVE_UP
+            logg.critical(f'ProcessSupervisor {self.name}: {proc.name} '
+                          f'died {n_recent} times in '
+                          f'{proc.policy.window:.0f} s - giving up.')
+            return
+
+        delay = proc.policy.delay(n_recent)
+        proc.restart_due = now + delay
+        logg.error(f'ProcessSupervisor {self.name}: {proc.name} '
+                   f'(pid {proc.pid}) exited - restarting in {delay:.2f} s.')
+
+    def _do_restart(self, proc: SupervisedProcess, generation: int) -> None:
+        with self._mutex:
+            proc.n_restarts += 1
+            proc.recent_restarts.append(time.monotonic())
+        try:
+            if proc.lock is None:
+                proc.restart()
+            else:
+                with proc.lock:
+                    # Disarmed (deliberate stop) or re-armed while we waited
+                    if proc.generation != generation:
+                        return
+                    proc.restart()
+        except Exception as e:
+            logg.error(f'ProcessSupervisor {self.name}: restarting '
+                       f'{proc.name} failed [{e}]')
+            with self._mutex:
+                proc.n_failed_restarts += 1
+                if proc.generation == generation:
+                    self._on_exit(proc, time.monotonic())
+            self._wake()
+            return
+
+        if proc.generation == generation:
+            self.arm(proc.name)
+
+    def _is_alive(self, proc: SupervisedProcess) -> bool:
+        if not proc.local:
+            return proc.get_pid() is not None
+        assert proc.pid is not None
+        return (start_time(proc.pid) == proc.pid_start_time and
+                not is_zombie(proc.pid))
+
+    def _next_timeout(self, now: float) -> typ.Optional[float]:
+        # Under self._mutex
+        deadlines = [
+                p.restart_due for p in self.processes.values()
+                if p.state == DOWN and p.policy.enabled
+        ] + [
+                p.next_poll for p in self.processes.values()
+                if p.state == UP and p.pidfd is None
+        ]
+        if len(deadlines) == 0:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def _wait(self, timeout: typ.Optional[float]) -> typ.List[int]:
+        '''
+            Exited pidfds - waiting at most timeout (None: forever).
+        '''
+        if self._epoll is not None:
+            events = self._epoll.poll(-1 if timeout is None else timeout)
+            fds = [fd for fd, _ in events]
+        else:
+            fds, _, _ = select.select([self._wake_r], [], [], timeout)
+        if self._wake_r in fds:
+            try:
+                while os.read(self._wake_r, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+        return [fd for fd in fds if fd != self._wake_r]
+
+    def _run(self) -> None:
+        while not self._stopping:
+            with self._mutex:
+                timeout = self._next_timeout(time.monotonic())
+            exited_fds = self._wait(timeout)
+
+            now = time.monotonic()
+            to_poll: typ.List[SupervisedProcess] = []
+            to_restart: typ.List[typ.Tuple[SupervisedProcess, int]] = []
+            with self._mutex:
+                for fd in exited_fds:
+                    name = self._fd_to_name.get(fd)
+                    if name is None:
+                        continue
+                    proc = self.processes[name]
+                    # The fd may have been closed and its number reused by
+                    # arm() since _wait returned: that's not the exit.
+                    if (proc.state == UP and proc.pidfd == fd and
+                                proc.pid is not None and is_gone(proc.pid)):
+                        self._on_exit(proc, now)
+                for proc in self.processes.values():
+                    if (proc.state == UP and proc.pidfd is None and
+                                proc.next_poll <= now):
+                        to_poll.append(proc)
+                    if (proc.state == DOWN and proc.policy.enabled and
+                                proc.restart_due <= now):
+                        proc.state = RESTARTING
+                        to_restart.append((proc, proc.generation))
+
+            # Polls may fork or ssh - not under the mutex.
+            for proc in to_poll:
+                generation = proc.generation
+                alive = self._is_alive(proc)
+                with self._mutex:
+                    if proc.generation != generation or proc.state != UP:
+                        continue
+                    if alive:
+                        proc.next_poll = now + (LOCAL_POLL_PERIOD if proc.local
+                                                else REMOTE_POLL_PERIOD)
+                    else:
+                        self._on_exit(proc, time.monotonic())
+
+            for proc, generation in to_restart:
+                threading.Thread(target=self._do_restart, args=(proc,
+                                                                generation),
+                                 name=f'{self.name}_restart_{proc.name}',
+                                 daemon=True).start()
+
+    def stats(self) -> typ.Dict[str, typ.Dict[str, typ.Any]]:
+        '''
+            name -> {state, n_exits, n_restarts, n_failed_restarts,
+                     total_downtime [s]}
+        '''
+        with self._mutex:
+            return {
+                    name: {
+                            'state': p.state,
+                            'n_exits': p.n_exits,
+                            'n_restarts': p.n_restarts,
+                            'n_failed_restarts': p.n_failed_restarts,
+                            'total_downtime': p.total_downtime,
+                    }
+                    for name, p in self.processes.items()
+            }
+
+    def report(self) -> str:
+        with self._mutex:
+            return '\n'.join(
+                    str(p) for p in sorted(self.processes.values(), key=lambda
+                                           p: p.name))
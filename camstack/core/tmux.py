@@ -4,18 +4,37 @@ import os
 
 import libtmux as tmux
 
-from typing import TYPE_CHECKING, Union, Optional as Op
+from typing import TYPE_CHECKING, Union, Optional as Op, List, Tuple, Dict
 if TYPE_CHECKING:
-    Pane_T = Union[tmux.Pane, 'RemotePanePatch', 'DeprecatedPanePatch']
+    Pane_T = Union[tmux.Pane, 'ControlPanePatch', 'RemotePanePatch',
+                   'DeprecatedPanePatch']
 
 import time
+import select
 import subprocess
+import threading
+import logging as logg
 
-TMUX_SERVER = tmux.Server()  # No arguments: defaut server
-if not TMUX_SERVER.is_alive():
-    # There's probably better...
-    import os
-    os.system('tmux new -d -s startup')
+from camstack.core.ssh_pool import ssh_run, RemoteShellError, KILL_CHANNEL
+from camstack.core import tracing
+from camstack.core import proctree
+
+_TMUX_SERVER: Op[tmux.Server] = None
+
+
+def tmux_server() -> tmux.Server:
+    '''
+        The default tmux server, connected to - and started - upon first use
+        rather than at import.
+    '''
+    global _TMUX_SERVER
+    if _TMUX_SERVER is None:
+        server = tmux.Server()  # No arguments: defaut server
+        if not server.is_alive():
+            # There's probably better...
+            os.system('tmux new -d -s startup')
+        _TMUX_SERVER = server
+    return _TMUX_SERVER
 
 
 def find_or_create_(session_name: str) -> Pane_T:
@@ -23,16 +42,45 @@ def find_or_create_(session_name: str) -> Pane_T:
         Return a handle to the active_pane in the "session_name" tmux session
         Create it if necessary.
         This relies on our extensive use of single-pane sessions.
+
+        The handle goes through the persistent control mode channel
+        if we can get one, and falls back to libtmux otherwise.
     '''
-    session = TMUX_SERVER.windows.get(session_name=session_name, default=None)
+    with tracing.span('tmux.find_or_create', session=session_name):
+        try:
+            return find_or_create_control(session_name)
+        except TmuxControlError as exc:
+            logg.warning(f'find_or_create: control mode unavailable ({exc}), '
+                         f'falling back to libtmux.')
+
+        return find_or_create_libtmux(session_name)
+
+
+def find_or_create_libtmux(session_name: str) -> Pane_T:
+    session = tmux_server().windows.get(session_name=session_name, default=None)
     if session is None:
-        session = TMUX_SERVER.new_session(session_name)
+        session = tmux_server().new_session(session_name)
 
     pane = session.attached_pane
 
     return pane
 
 
+def find_or_create_control(session_name: str) -> ControlPanePatch:
+    '''
+        Mimic of find_or_create, through the tmux control mode channel
+        Will return a ControlPanePatch object
+    '''
+    channel = get_control_channel()
+    ok, _ = channel.command('has-session', '-t', '=' + session_name)
+    if not ok:
+        ok, lines = channel.command('new-session', '-d', '-s', session_name)
+        if not ok:
+            raise TmuxControlError(f'Cannot create session {session_name}: '
+                                   f'{lines}')
+    return ControlPanePatch(session_name, channel)
+
+
 def find_or_create_deprecated(session_name: str):
     '''
         Mimic of find_or_create, but on a deprecated (tmux < 2.0) machine.
@@ -54,15 +102,15 @@ def find_or_create_remote(session_name: str, host: str):
         Mimic of find_or_create, but on a remote machine.
         Will return a RemotePanePatch object
     '''
-    subprocess.run(['ssh', host, "tmux new-session -d -s " + session_name],
-                   stdout=subprocess.PIPE)
+    ssh_run(host, "tmux new-session -d -s " + session_name)
     return RemotePanePatch(session_name, host)
 
 
 def send_keys(pane: Pane_T, keys: str, enter: bool = True) -> None:
     # This does NOT error if the tmux was destroyed !
     # Mind the different behavior with RemotePanePatch
-    pane.send_keys(keys, enter=enter, suppress_history=False)
+    with tracing.span('tmux.send_keys', keys=keys):
+        pane.send_keys(keys, enter=enter, suppress_history=False)
 
 
 def kill_running_Cc(pane: Pane_T) -> None:
@@ -75,23 +123,100 @@ def kill_running_Cz(pane: Pane_T) -> None:
     pane.send_keys('kill %')
 
 
-def kill_running(pane: Pane_T) -> None:
-    kill_running_Cc(pane)
-    time.sleep(2.0)  # We need longer time for dcamusbtake to clear
-    kill_running_Cz(pane)
+# A command line may chain jobs ("a; b"): how many we kill before giving up
+KILL_RUNNING_MAX_JOBS = 3
+REMOTE_EXIT_POLL_PERIOD = 0.02  # [s]
+
+
+def kill_running(pane: Pane_T,
+                 steps: proctree.TerminateStepsType = proctree.TERMINATE_STEPS
+                 ) -> Op[int]:
+    '''
+        Terminate what runs in the pane: signals to its PID, escalating per
+        steps (see proctree.terminate), back as soon as it's gone - or right
+        away if nothing runs.
+        Returns the signal that did it, 0 if nothing was running,
+        None if we had to fall back on C-c / C-z + kill % keystrokes.
+    '''
+    with tracing.span('tmux.kill_running'):
+        killed_by = 0
+        for _ in range(KILL_RUNNING_MAX_JOBS):
+            try:
+                pid = find_pane_running_pid(pane)
+                if pid is None:
+                    return killed_by
+                if type(pane) is RemotePanePatch:
+                    result = _terminate_remote(pane.host, pid, steps)
+                else:
+                    result = proctree.terminate(pid, steps)
+            except (OSError, ValueError, RemoteShellError) as exc:
+                # ValueError: several PIDs in the pane.
+                logg.error(f'kill_running: cannot signal [{exc}]')
+                break
+            if result is None:
+                logg.error(f'kill_running: PID {pid} survived '
+                           f'{[sig for sig, _ in steps]}')
+                break
+            killed_by = result
+
+        logg.warning('kill_running: falling back on keystrokes.')
+        kill_running_Cc(pane)
+        time.sleep(2.0)  # We need longer time for dcamusbtake to clear
+        kill_running_Cz(pane)
+        return None
+
+
+def _terminate_remote(host: str, pid: int,
+                      steps: proctree.TerminateStepsType) -> Op[int]:
+    '''
+        proctree.terminate, as a script that runs remotely:
+        one round trip, however long the process takes to exit.
+    '''
+    lines = [f'kill -0 {pid} 2>/dev/null || exit 0']
+    for k, (sig, timeout) in enumerate(steps):
+        n_polls = max(1, round(timeout / REMOTE_EXIT_POLL_PERIOD))
+        lines += [
+                f'kill -{int(sig)} -- -{pid} 2>/dev/null || '
+                f'kill -{int(sig)} {pid} 2>/dev/null', 'i=0',
+                f'while [ $i -lt {n_polls} ]; do',
+                f'kill -0 {pid} 2>/dev/null || exit {k + 1}',
+                f'sleep {REMOTE_EXIT_POLL_PERIOD}; i=$((i + 1))', 'done'
+        ]
+    lines.append(f'exit {len(steps) + 1}')
+
+    timeout = sum(timeout for _, timeout in steps) + 5.0
+    res = ssh_run(host, '\n'.join(lines), timeout=timeout, channel=KILL_CHANNEL)
+    if res.returncode == 0:
+        return 0
+    if res.returncode <= len(steps):
+        return int(steps[res.returncode - 1][0])
+    return None
 
 
 def find_pane_running_pid(pane: Pane_T) -> Op[int]:
     # Identify the PIDs running in a pane.
     # Generally, we expect to find nothing, or only one front-end job.
 
+    if type(pane) is ControlPanePatch:
+        # No forking at all: pane_pid through the control channel
+        # and children through /proc
+        shell_pid = pane.pane_pid()
+        if shell_pid is None:
+            return None
+        children = find_children_local(shell_pid)
+        if len(children) == 0:
+            return None
+        if len(children) > 1:
+            # Same as int() on pgrep's multiline output below.
+            raise ValueError(f'Several PIDs running in pane: {children}')
+        return children[0]
+
     # This is the PID of the pane's shell
     p = pane.cmd('list-panes',
                  '-F#{pane_pid}').stdout[0].strip()  # type: ignore
     # For which we identify children
     if type(pane) is RemotePanePatch:
-        res = subprocess.run(['ssh', pane.host, "pgrep", "-P", p],
-                             stdout=subprocess.PIPE)
+        res = ssh_run(pane.host, ["pgrep", "-P", p])
     else:
         res = subprocess.run(['pgrep', '-P', p], stdout=subprocess.PIPE)
 
@@ -102,6 +227,246 @@ def find_pane_running_pid(pane: Pane_T) -> Op[int]:
         return None
 
 
+def pane_age(pane: Pane_T) -> Op[float]:
+    '''
+        Seconds since the pane's session was created - our sessions are
+        single-pane. None if tmux can't tell us.
+    '''
+    try:
+        res = pane.cmd('list-panes', '-F#{session_created}')  # type: ignore
+        stdout = res.stdout
+        if isinstance(stdout, bytes):  # Deprecated / Remote patches
+            stdout = stdout.decode('utf8').split()
+        created = int(stdout[0].strip())
+    except (IndexError, ValueError, OSError, RemoteShellError) as exc:
+        logg.warning(f'pane_age: cannot tell [{exc}]')
+        return None
+    # Remote: assumes NTP-synced clocks, which we rely on elsewhere anyway.
+    return max(0.0, time.time() - created)
+
+
+def find_children_local(pid: int) -> List[int]:
+    '''
+        Children PIDs of a local process, from /proc/<pid>/task/*/children
+        Falls back on pgrep if the kernel doesn't expose that.
+    '''
+    children: List[int] = []
+    try:
+        for tid in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{tid}/children', 'r') as file:
+                children += [int(c) for c in file.read().split()]
+    except FileNotFoundError:
+        if not os.path.isdir(f'/proc/{pid}'):
+            return []  # Process is gone.
+        # No CONFIG_PROC_CHILDREN
+        res = subprocess.run(['pgrep', '-P', str(pid)], stdout=subprocess.PIPE)
+        children = [int(c) for c in res.stdout.decode('utf8').split()]
+    except ProcessLookupError:
+        return []
+
+    return sorted(children)
+
+
+class TmuxControlError(Exception):
+    pass
+
+
+def _tmux_quote(arg: str) -> str:
+    '''
+        Single-quote an argument for the tmux command parser.
+        Nothing is expanded within single quotes, so we only need to mind
+        the single quotes themselves.
+    '''
+    return "'" + arg.replace("'", "'\\''") + "'"
+
+
+class TmuxControlChannel:
+    '''
+        One long-lived "tmux -C" client connected to a tmux server.
+
+        Commands are written one per line on stdin. tmux processes them in
+        order and frames each reply on stdout between a %begin line and
+        a %end (or %error) line. Anything else is an asynchronous notification,
+        which we skip.
+
+        The client sits in a dedicated idle session, so that we don't get
+        %output notifications for the panes we care about.
+        It gets restarted on the next command if it dies.
+    '''
+
+    CONTROL_SESSION = '_camstack_ctl'
+    REPLY_TIMEOUT = 5.0  # [s]
+
+    def __init__(self, socket_name: Op[str] = None) -> None:
+        self.socket_name = socket_name
+
+        self.lock = threading.Lock()
+        self.proc: Op[subprocess.Popen[bytes]] = None
+        self._buffer = b''
+
+    def _tmux_argv(self) -> List[str]:
+        if self.socket_name is None:
+            return ['tmux']
+        return ['tmux', '-L', self.socket_name]
+
+    def _connect(self) -> None:
+        self._disconnect()
+        try:
+            self.proc = subprocess.Popen(
+                    self._tmux_argv() +
+                    ['-C', 'new-session', '-A', '-s', self.CONTROL_SESSION],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL)
+        except OSError as exc:
+            raise TmuxControlError(f'Cannot spawn tmux -C: {exc}')
+        self._buffer = b''
+        # The attach itself gets a (void) reply block.
+        self._read_reply()
+        # tmux >= 3.2 - further mute pane output. Harmless error otherwise.
+        self._send_line('refresh-client -f no-output')
+        self._read_reply()
+
+    def _disconnect(self) -> None:
+        if self.proc is not None:
+            try:
+                self.proc.kill()
+                self.proc.wait(1.0)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.proc = None
+
+    def _send_line(self, line: str) -> None:
+        assert self.proc is not None and self.proc.stdin is not None
+        try:
+            self.proc.stdin.write(line.encode('utf8') + b'\n')
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            raise TmuxControlError(f'tmux -C write failed: {exc}')
+
+    def _readline(self, deadline: float) -> str:
+        assert self.proc is not None and self.proc.stdout is not None
+        fd = self.proc.stdout.fileno()
+        while b'\n' not in self._buffer:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                raise TmuxControlError('tmux -C reply timeout')
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if chunk == b'':
+                raise TmuxControlError('tmux -C client exited')
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode('utf8', errors='replace')
+
+    def _read_reply(self) -> Tuple[bool, List[str]]:
+        deadline = time.time() + self.REPLY_TIMEOUT
+        while True:  # Skip notifications
+            line = self._readline(deadline)
+            if line.startswith('%begin'):
+                break
+            if line.startswith('%exit'):
+                raise TmuxControlError('tmux -C client exited')
+        lines: List[str] = []
+        while True:
+            line = self._readline(deadline)
+            if line.startswith('%end'):
+                return True, lines
+            if line.startswith('%error'):
+                return False, lines
+            lines.append(line)
+
+    def command(self, *args: str) -> Tuple[bool, List[str]]:
+        '''
+            Run one tmux command, e.g. command('send-keys', '-t', 'sess', 'C-c')
+            Returns (success, output lines)
+        '''
+        line = ' '.join([args[0]] + [_tmux_quote(a) for a in args[1:]])
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.proc is None or self.proc.poll() is not None:
+                        self._connect()
+                    self._send_line(line)
+                    return self._read_reply()
+                except TmuxControlError:
+                    # Stream state is unknown at this point. Start afresh.
+                    self._disconnect()
+                    if attempt == 1:
+                        raise
+        raise AssertionError('Unreachable')
+
+    def close(self) -> None:
+        with self.lock:
+            self._disconnect()
+
+
+_CONTROL_CHANNELS: Dict[Op[str], TmuxControlChannel] = {}
+_CONTROL_CHANNELS_LOCK = threading.Lock()
+
+
+def get_control_channel(socket_name: Op[str] = None) -> TmuxControlChannel:
+    '''
+        One shared control channel per tmux server
+    '''
+    with _CONTROL_CHANNELS_LOCK:
+        if not socket_name in _CONTROL_CHANNELS:
+            _CONTROL_CHANNELS[socket_name] = TmuxControlChannel(socket_name)
+        return _CONTROL_CHANNELS[socket_name]
+
+
+class ControlCommandResult:
+    '''
+        Mimics the return of libtmux's cmd, so that callers can use .stdout
+    '''
+
+    def __init__(self, success: bool, lines: List[str]) -> None:
+        self.returncode = (1, 0)[success]
+        self.stdout = lines if success else []
+        self.stderr = [] if success else lines
+
+
+class ControlPanePatch:
+    '''
+        Provide a handle to a local tmux pane,
+        driven through a shared TmuxControlChannel rather than one tmux
+        process per call.
+    '''
+
+    def __init__(self, session_name: str, channel: TmuxControlChannel) -> None:
+        self.session_name = session_name
+        self.channel = channel
+
+    @property
+    def target(self) -> str:
+        # Exact session name match, active window, active pane.
+        return '=' + self.session_name + ':'
+
+    def send_keys(self, keys: str, enter: bool = True,
+                  suppress_history: bool = False) -> None:
+        if suppress_history:
+            keys = " " + keys
+        args = ['send-keys', '-t', self.target, keys]
+        if enter:
+            args += ['Enter']
+        ok, lines = self.channel.command(*args)
+        if not ok:
+            # Same as libtmux - we do NOT raise.
+            logg.warning(f'ControlPanePatch.send_keys @ {self.session_name}: '
+                         f'{lines}')
+
+    def cmd(self, command: str, *args: str) -> ControlCommandResult:
+        return ControlCommandResult(
+                *self.channel.command(command, '-t', self.target, *args))
+
+    def pane_pid(self) -> Op[int]:
+        res = self.cmd('list-panes', '-F', '#{pane_pid}')
+        if res.returncode != 0 or len(res.stdout) == 0:
+            return None
+        return int(res.stdout[0].strip())
+
+
 class DeprecatedPanePatch:
 
     def __init__(self, session_name: str):
@@ -130,6 +495,7 @@ class RemotePanePatch:
     '''
         Provide a virtual handle to a tmux pane on a remote server
         It's only based on system tmux commands over ssh
+        through the pooled per-host transport from ssh_pool.
     '''
 
     def __init__(self, session_name: str, host: str) -> None:
@@ -152,8 +518,7 @@ class RemotePanePatch:
             cmdstring += ["Enter"]
 
         # Use check call to return a CalledProcessError
-        subprocess.check_call(['ssh', self.host] + cmdstring,
-                              stdout=subprocess.PIPE)
+        ssh_run(self.host, cmdstring, check=True)
 
     def cmd(self, command: str,
             args: str = '') -> subprocess.CompletedProcess[bytes]:
@@ -161,5 +526,4 @@ class RemotePanePatch:
             Carefully mind the single and double quotes
         '''
         cmdstring = ['tmux', command, '-t', self.session_name, args]
-        return subprocess.run(['ssh', self.host] + cmdstring,
-                              stdout=subprocess.PIPE)
+        return ssh_run(self.host, cmdstring)
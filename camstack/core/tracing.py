@@ -0,0 +1,169 @@
+'''
+    Lightweight span tracing of the camera lifecycle.
+
+    A trace is opened on a thread by Tracer.trace() (or a @traced method),
+    and any span() entered on that thread while it's open - including in
+    core modules that know nothing about cameras, e.g. tmux or serial calls -
+    is recorded into it with its nesting. Outside of a trace, span() costs a
+    thread-local lookup.
+
+    Each Tracer keeps a ring of its recent traces, which can be dumped as a
+    Chrome trace JSON (chrome://tracing, https://ui.perfetto.dev).
+'''
+from __future__ import annotations
+
+import typing as typ
+
+import os
+import json
+import time
+import functools
+import threading
+import contextlib
+import collections
+import logging as logg
+
+_local = threading.local()  # .trace: the Trace being recorded by this thread
+
+
+class Trace:
+
+    def __init__(self, name: str, args: typ.Dict[str, typ.Any]) -> None:
+        self.name = name
+        self.args = args
+        self.t_start = time.time()
+        self.duration: typ.Optional[float] = None
+        # Chrome trace "complete" events. Appended from several threads.
+        self.events: typ.List[typ.Dict[str, typ.Any]] = []
+
+    def record(self, name: str, t_start: float, duration: float,
+               args: typ.Dict[str, typ.Any]) -> None:
+        self.events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': t_start * 1e6,
+                'dur': duration * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': args,
+        })
+
+
+class Tracer:
+
+    def __init__(self, name: str, max_traces: int = 16) -> None:
+        self.name = name
+        self.traces: typ.Deque[Trace] = collections.deque(maxlen=max_traces)
+
+    @contextlib.contextmanager
+    def trace(self, name: str, /, **args: typ.Any) -> typ.Iterator[None]:
+        '''
+            Record a new trace - or just a span, if this thread is already
+            recording one (e.g. set_camera_mode called within __init__).
+        '''
+        if getattr(_local, 'trace', None) is not None:
+            with span(name, **args):
+                yield
+            return
+
+        trace = Trace(name, args)
+        _local.trace = trace
+        try:
+            with span(name, **args):
+                yield
+        finally:
+            _local.trace = None
+            trace.duration = time.time() - trace.t_start
+            self.traces.append(trace)
+            logg.info(f'Tracer {self.name}: {name} took '
+                      f'{trace.duration:.3f} s.')
+
+    def report(self, index: int = -1, min_duration: float = 0.01) -> str:
+        '''
+            Text breakdown of a trace, spans shorter than min_duration omitted.
+        '''
+        if len(self.traces) == 0:
+            return f'Tracer {self.name}: no traces.'
+        trace = self.traces[index]
+        lines = [f'{trace.name} - {trace.duration or 0.0:.3f} s']
+        stack: typ.List[float] = []  # End times of the open spans
+        for ev in sorted(trace.events, key=lambda e: (e['ts'], -e['dur'])):
+            while len(stack) > 0 and ev['ts'] >= stack[-1]:
+                stack.pop()
+            stack.append(ev['ts'] + ev['dur'])
+            if ev['dur'] >= min_duration * 1e6 and len(stack) > 1:
+                lines.append(f'{"  " * (len(stack) - 1)}{ev["name"]} - '
+                             f'{ev["dur"] * 1e-6:.3f} s')
+        return '\n'.join(lines)
+
+    def dump_chrome(self, path: typ.Optional[str] = None) -> str:
+        '''
+            Write all the traces in the ring to a Chrome trace JSON.
+            Returns the file path.
+        '''
+        if path is None:
+            path = (f'/tmp/camstack_trace_{self.name}_'
+                    f'{time.strftime("%Y%m%d_%H%M%S")}.json')
+        events: typ.List[typ.Dict[str, typ.Any]] = []
+        for trace in self.traces:
+            events += trace.events
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events}, file, default=str)
+        return path
+
+
+def current_trace() -> typ.Optional[Trace]:
+    return getattr(_local, 'trace', None)
+
+
+@contextlib.contextmanager
+def attach(trace: typ.Optional[Trace]) -> typ.Iterator[None]:
+    '''
+        Record this thread's spans into trace - for worker threads
+        doing work on behalf of a traced thread.
+    '''
+    prev = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield
+    finally:
+        _local.trace = prev
+
+
+@contextlib.contextmanager
+def span(name: str, /, **args: typ.Any) -> typ.Iterator[None]:
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+
+    t_start = time.time()
+    try:
+        yield
+    finally:
+        trace.record(name, t_start, time.time() - t_start, args)
+
+
+F = typ.TypeVar('F', bound=typ.Callable[..., typ.Any])
+
+
+def traced(name: typ.Optional[str] = None) -> typ.Callable[[F], F]:
+    '''
+        Method decorator: a trace on the instance's tracer attribute,
+        or a span if we're already tracing.
+    '''
+
+    def decorator(func: F) -> F:
+        span_name = func.__name__ if name is None else name
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tracer = self.__dict__.get('tracer')
+            if tracer is None:  # Before the instance had a chance to make one
+                tracer = self.tracer = Tracer(type(self).__name__)
+            with tracer.trace(span_name):
+                return func(self, *args, **kwargs)
+
+        return typ.cast(F, wrapper)
+
+    return decorator
@@ -2,9 +2,18 @@ import typing as typ
 
 import os
 import time
+import enum
+import math
+import signal
 import subprocess
+import logging as logg
+from concurrent.futures import ThreadPoolExecutor
 
 from camstack.core import tmux
+from camstack.core import tracing
+from camstack.core import proctree
+from camstack.core.proctree import RTApplier
+from camstack.core.ssh_pool import ssh_run
 
 
 class CamstackStateException(Exception):
@@ -64,6 +73,69 @@ class CameraMode:
 
         return s
 
+    def same_roi(self, other: 'CameraMode') -> bool:
+        return ((self.x0, self.x1, self.y0, self.y1, self.binx,
+                 self.biny) == (other.x0, other.x1, other.y0, other.y1,
+                                other.binx, other.biny))
+
+
+class ModeChangePlan(enum.Enum):
+    '''
+        What BaseCamera.set_camera_mode needs to do to go from a mode to another.
+    '''
+    PARAMS = 'params'  # Same geometry, same dependents: only set fps/tint.
+    TAKER = 'taker'  # Same FG size, same dependents: restart the taker only, on the same SHM.
+    FULL = 'full'  # Kill everything, reconfigure the FG, restart everything.
+
+
+class LatencyHistogram:
+    '''
+        Cheap fixed-bucket histogram of durations, in seconds.
+
+        Buckets are powers of 2 from 2**MIN_EXP s (~1 us) up to 2**MAX_EXP s
+        (~1 min), plus one overflow bucket. Quantiles are bucket upper edges,
+        which is all the resolution we need to tell 1 ms from 100 ms.
+    '''
+    MIN_EXP = -20
+    MAX_EXP = 6
+
+    def __init__(self) -> None:
+        self.counts = [0] * (self.MAX_EXP - self.MIN_EXP + 2)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration: float) -> None:
+        if duration <= 2.0**self.MIN_EXP:
+            idx = 0
+        else:
+            # frexp: duration = m * 2**e, 0.5 <= m < 1 -> duration <= 2**e
+            _, exp = math.frexp(duration)
+            idx = min(exp - self.MIN_EXP, len(self.counts) - 1)
+        self.counts[idx] += 1
+        self.n += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def quantile(self, q: float) -> float:
+        if self.n == 0:
+            return 0.0
+        target = q * self.n
+        cumul = 0
+        for idx, count in enumerate(self.counts):
+            cumul += count
+            if cumul >= target and count > 0:
+                return min(2.0**(self.MIN_EXP + idx), self.max)
+        return self.max
+
+    def summary(self) -> str:
+        if self.n == 0:
+            return 'n 0'
+        return (f'n {self.n} - mean {self.total / self.n * 1e3:.3f} ms - '
+                f'p50 {self.quantile(0.5) * 1e3:.3f} ms - '
+                f'p99 {self.quantile(0.99) * 1e3:.3f} ms - '
+                f'max {self.max * 1e3:.3f} ms')
+
 
 class DependentProcess:
     '''
@@ -72,12 +144,20 @@ class DependentProcess:
 
         They're expected to live in a tmux (local or remote)
         This typically will include ocamdecode, and the TCP transfer.
+
+        Readiness after start is probed rather than slept on:
+        the process PID must exist, and optionally an output SHM must have been
+        (re)created since the start (ready_shm) and/or a TCP port must be
+        listening (ready_port).
     '''
 
     def __init__(self, tmux_name: str, cli_cmd: str,
                  cli_args: typ.Iterable[typ.Any], cset: str = 'system',
                  rtprio: typ.Optional[int] = None,
-                 kill_upon_create: bool = True):
+                 kill_upon_create: bool = True,
+                 ready_shm: typ.Optional[str] = None,
+                 ready_port: typ.Optional[int] = None,
+                 ready_timeout: float = 10.0):
 
         self.enabled = True  # Is this registered to run ? #TODO UNUSED
 
@@ -92,59 +172,145 @@ class DependentProcess:
 
         self.cset = cset
         self.rtprio = rtprio
+        self.rt_applier: typ.Optional[RTApplier] = (None if rtprio is None else
+                                                    RTApplier(cset, rtprio))
 
         self.kill_upon_init = kill_upon_create
 
+        # Readiness probes
+        self.ready_shm = ready_shm
+        self.ready_port = ready_port
+        self.ready_timeout = ready_timeout
+        # _shm_stat of ready_shm before the last start
+        self._ready_shm_stat: typ.Optional[typ.Tuple[typ.Any, ...]] = None
+
+        # Wall time from command line sent to probes passing, on last start
+        self.time_to_ready: typ.Optional[float] = None
+        # Last stop: wall time, and the signal that did it (see tmux.kill_running)
+        self.time_to_stop: typ.Optional[float] = None
+        self.stop_signal: typ.Optional[int] = None
+        # Signals and how long we wait after each, see proctree.terminate
+        self.stop_steps: proctree.TerminateStepsType = proctree.TERMINATE_STEPS
+
     def assign_tmux_pane(self):
         self.tmux_pane = tmux.find_or_create(self.tmux_name)
 
     def initialize_tmux(self, kill_upon_create):
         self.assign_tmux_pane()
         if kill_upon_create:
-            time.sleep(3.0)  # MUST NOT KILL the sourcing of bashrc/profile
+            self.wait_tmux_settled()
             self.stop()
 
+    def wait_tmux_settled(self) -> None:
+        '''
+            MUST NOT KILL the sourcing of bashrc/profile:
+            a pane that was just created gets TMUX_SETTLE_TIME to get through
+            it, one that was already there is used right away.
+        '''
+        age = tmux.pane_age(self.tmux_pane)
+        if age is None:
+            age = 0.0
+        time.sleep(max(0.0, TMUX_SETTLE_TIME - age))
+
     def start_command_line(self):
         tmux.send_keys(self.tmux_pane, self.cli_cmd % tuple(self.cli_args))
 
     def start(self):
+        self.start_and_wait_ready()
+
+    def start_and_wait_ready(self) -> typ.Optional[float]:
+        '''
+            Send the command line, block until the readiness probes pass
+            and apply the cset/rtprio.
+            Returns the time-to-ready, or None upon timeout.
+        '''
+        if self.ready_shm is not None:
+            # That of the previous run may still be there.
+            self._ready_shm_stat = self._shm_stat(self.ready_shm)
         self.start_command_line()
-        time.sleep(1)
+        time_to_ready = self.wait_ready()
         self.make_children_rt()
+        return time_to_ready
+
+    def wait_ready(self,
+                   timeout: typ.Optional[float] = None) -> typ.Optional[float]:
+        if timeout is None:
+            timeout = self.ready_timeout
+
+        t_start = time.time()
+        self.time_to_ready = None
+        while True:
+            if self.is_ready():
+                self.time_to_ready = time.time() - t_start
+                return self.time_to_ready
+            if time.time() - t_start > timeout:
+                logg.warning(f'DependentProcess {self.tmux_name}: '
+                             f'not ready after {timeout:.1f} s.')
+                return None
+            time.sleep(READY_POLL_INTERVAL)
+
+    def wait_stopped(self, timeout: float) -> bool:
+        t_start = time.time()
+        while self.is_running():
+            if time.time() - t_start > timeout:
+                return False
+            time.sleep(READY_POLL_INTERVAL)
+        return True
+
+    def is_ready(self) -> bool:
+        if not self.is_running():
+            return False
+        if self.ready_shm is not None and not self._probe_shm(self.ready_shm):
+            return False
+        if self.ready_port is not None and not self._probe_port(
+                self.ready_port):
+            return False
+        return True
+
+    def _probe_shm(self, shm_name: str) -> bool:
+        # Must be there, and not be the file that was there before the start
+        # ImageStreamIO makes a new inode, or truncates and resizes the old one
+        stat = self._shm_stat(shm_name)
+        return stat is not None and stat != self._ready_shm_stat
+
+    def _shm_stat(self, shm_name: str) -> typ.Optional[typ.Tuple[int, ...]]:
+        try:
+            stat = os.stat(
+                    os.environ.get('MILK_SHM_DIR', '/milk/shm') + '/' +
+                    shm_name + '.im.shm')
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns)
+
+    def _probe_port(self, port: int) -> bool:
+        proc_net = ''
+        for fname in PROC_NET_TCP_FILES:
+            try:
+                with open(fname, 'r') as file:
+                    proc_net += file.read()
+            except FileNotFoundError:
+                pass
+        return port in parse_listening_ports(proc_net)
 
     def make_children_rt(self):
-        if self.rtprio is not None:
-            # This works very partially.
-            # Because some dependents start aux processes,
-            # And because some dependents start by a sleep command...
-            # D'oh.
-            pids = []
-            pid = self.get_pid()
-            if pid is not None:
-                pids = [pid]
-            while len(pids) > 0:
-                pid = pids.pop()
-                #print('PID: ', pid)
-                ret = subprocess.run([
-                        'milk-makecsetandrt',
-                        str(pid), self.cset,
-                        str(self.rtprio)
-                ], stdout=subprocess.DEVNULL)
-                children = subprocess.run(['pgrep', '-P',
-                                           str(pid)],
-                                          stdout=subprocess.PIPE).stdout.decode(
-                                                  'utf8').strip().split('\n')
-                if children[0] != '':
-                    pids += [int(c) for c in children]
-                #print('PIDs: ', pids)
-
-    def stop(self):
+        # Only new PIDs/threads since the previous call get configured.
+        # This is still partial: some dependents start by a sleep command,
+        # and get their RT children on the next call.
+        if self.rt_applier is not None:
+            self.rt_applier.apply_tree(self.get_pid())
+
+    def stop(self) -> float:
+        '''
+            Signal the process, escalating SIGINT -> SIGTERM -> SIGKILL
+            per stop_steps, and return as soon as it's gone.
+            Returns the time it took.
+        '''
         if self.tmux_pane is None:
             self.assign_tmux_pane()
-        tmux.kill_running_Cc(self.tmux_pane)
-        time.sleep(2)
-        tmux.kill_running_Cz(self.tmux_pane)
-        time.sleep(1)
+        t_start = time.time()
+        self.stop_signal = tmux.kill_running(self.tmux_pane, self.stop_steps)
+        self.time_to_stop = time.time() - t_start
+        return self.time_to_stop
 
     def is_running(self):
         return self.get_pid() is not None
@@ -157,72 +323,230 @@ class RemoteDependentProcess(DependentProcess):
 
     def __init__(self, tmux_name, cli_cmd, cli_args, remote_host,
                  cset: str = 'system', rtprio: typ.Optional[int] = None,
-                 kill_upon_create: bool = True):
+                 kill_upon_create: bool = True,
+                 ready_shm: typ.Optional[str] = None,
+                 ready_port: typ.Optional[int] = None,
+                 ready_timeout: float = 10.0):
 
         self.remote_host = remote_host
+        self._remote_rt_pids: typ.Set[int] = set()
 
         DependentProcess.__init__(self, tmux_name, cli_cmd, cli_args, cset=cset,
                                   rtprio=rtprio,
-                                  kill_upon_create=kill_upon_create)
+                                  kill_upon_create=kill_upon_create,
+                                  ready_shm=ready_shm, ready_port=ready_port,
+                                  ready_timeout=ready_timeout)
 
     def assign_tmux_pane(self):
         self.tmux_pane = tmux.find_or_create_remote(self.tmux_name,
                                                     self.remote_host)
 
-    def start(self):
+    def start_command_line(self):
         try:
-            tmux.send_keys(self.tmux_pane, self.cli_cmd % self.cli_args)
+            tmux.send_keys(self.tmux_pane, self.cli_cmd % tuple(self.cli_args))
         except subprocess.CalledProcessError as err:
             print(f"Remote {self.tmux_name} on {self.remote_host} tmux may be dead - attempting re-initialize"
                   )
             self.initialize_tmux(False)
-            tmux.send_keys(self.tmux_pane, self.cli_cmd % self.cli_args)
+            tmux.send_keys(self.tmux_pane, self.cli_cmd % tuple(self.cli_args))
 
-        time.sleep(1)
-        self.make_children_rt()
+    def make_children_rt(self):
+        # Our own /proc and cgroups are of no use for a remote PID.
+        # Walk the remote tree in one pooled round trip,
+        # and milk-makecsetandrt only the PIDs we haven't seen yet.
+        if self.rtprio is None:
+            return
+        pid = self.get_pid()
+        if pid is None:
+            self._remote_rt_pids = set()
+            return
+        res = ssh_run(
+                self.remote_host,
+                'walk() { echo $1; for c in $(cat /proc/$1/task/*/children '
+                f'2>/dev/null); do walk $c; done; }}; walk {pid}')
+        pids = set(int(p) for p in res.stdout.decode('utf8').split())
+        for p in sorted(pids - self._remote_rt_pids):
+            ssh_run(self.remote_host,
+                    ['milk-makecsetandrt',
+                     str(p), self.cset,
+                     str(self.rtprio)])
+        self._remote_rt_pids = pids
+
+    def _shm_stat(self, shm_name: str) -> typ.Optional[typ.Tuple[str, ...]]:
+        # %y %z: human readable, but with the nanoseconds
+        res = ssh_run(
+                self.remote_host, f"stat -c '%i %y %z' "
+                f'${{MILK_SHM_DIR:-/milk/shm}}/{shm_name}.im.shm 2>/dev/null')
+        if res.returncode != 0:
+            return None
+        return tuple(res.stdout.decode('utf8').split())
+
+    def _probe_port(self, port: int) -> bool:
+        res = ssh_run(self.remote_host,
+                      ['cat'] + PROC_NET_TCP_FILES + ['2>/dev/null'])
+        return port in parse_listening_ports(res.stdout.decode('utf8'))
+
+
+READY_POLL_INTERVAL = 0.05  # [s]
+# For a new tmux pane to be done sourcing bashrc/profile
+TMUX_SETTLE_TIME = 3.0  # [s]
+
+PROC_NET_TCP_FILES = ['/proc/net/tcp', '/proc/net/tcp6']
+
+
+def parse_listening_ports(proc_net_tcp: str) -> typ.Set[int]:
+    '''
+        Find the LISTEN-state local ports in the contents of /proc/net/tcp(6)
+        Lines look like:
+        sl  local_address rem_address   st ...
+        0: 00000000:1F90 00000000:0000 0A ...
+    '''
+    ports: typ.Set[int] = set()
+    for line in proc_net_tcp.split('\n'):
+        linespl = line.split()
+        if len(linespl) < 4 or linespl[3] != '0A':  # 0A: TCP_LISTEN
+            continue
+        try:
+            ports.add(int(linespl[1].split(':')[1], 16))
+        except (IndexError, ValueError):
+            pass
+    return ports
 
 
 class DependentMultiManager:
-    # The only point is to batch all the sleeping... that piles up quite a bit with lots of dependents.
+    '''
+        Batch start and stop of dependent processes.
+
+        start_order and kill_order are understood as the levels of a dependency DAG:
+        all dependents sharing an order value are started (resp. stopped) concurrently,
+        and the next level is only processed once the previous one is ready (resp. dead).
+    '''
 
     def __init__(self, dependents: typ.List[DependentProcess]) -> None:
         self.dependent_list = dependents
 
-    def initialize_tmux(self):
+        # tmux_name -> time-to-ready [s] (None if timed out) on last start()
+        self.last_start_report: typ.Dict[str, typ.Optional[float]] = {}
+        # tmux_name -> time to stop [s] on last stop()
+        self.last_stop_report: typ.Dict[str, float] = {}
+
+    def initialize_tmux(self, stop: bool = True):
+        '''
+            stop: also stop those that are kill_upon_create.
+            Not when attaching to them, see BaseCamera._attach_running_taker
+        '''
         if len(self.dependent_list) == 0:
             return
 
         for dependent in self.dependent_list:
             dependent.assign_tmux_pane()
-        time.sleep(3.0)
+        if not stop:
+            return
+        # Panes that already existed have no reason to wait.
+        ages = [
+                tmux.pane_age(dependent.tmux_pane)
+                for dependent in self.dependent_list if dependent.kill_upon_init
+        ]
+        if len(ages) > 0:
+            youngest = min(0.0 if age is None else age for age in ages)
+            time.sleep(max(0.0, TMUX_SETTLE_TIME - youngest))
 
         self.stop(watch_kill_create_flag=True)
 
-    def start(self):
+    @staticmethod
+    def _levels(dependents: typ.List[DependentProcess],
+                order_attr: str) -> typ.List[typ.List[DependentProcess]]:
+        levels: typ.Dict[int, typ.List[DependentProcess]] = {}
+        for dependent in dependents:
+            levels.setdefault(getattr(dependent, order_attr),
+                              []).append(dependent)
+        return [levels[order] for order in sorted(levels)]
+
+    @staticmethod
+    def _run_concurrently(func: typ.Callable[[DependentProcess], T],
+                          dependents: typ.List[DependentProcess]
+                          ) -> typ.List[T]:
+        if len(dependents) == 1:
+            return [func(dependents[0])]
+
+        trace = tracing.current_trace()  # Workers record into our trace.
+
+        def traced_func(dependent: DependentProcess) -> T:
+            with tracing.attach(trace):
+                return func(dependent)
+
+        with ThreadPoolExecutor(max_workers=len(dependents)) as executor:
+            return list(executor.map(traced_func, dependents))
+
+    @staticmethod
+    def _traced_start(dependent: DependentProcess) -> typ.Optional[float]:
+        with tracing.span('dependent.start', name=dependent.tmux_name):
+            return dependent.start_and_wait_ready()
+
+    @staticmethod
+    def _traced_stop(dependent: DependentProcess) -> float:
+        with tracing.span('dependent.stop', name=dependent.tmux_name):
+            return dependent.stop()
+
+    def start(self) -> typ.Dict[str, typ.Optional[float]]:
         if len(self.dependent_list) == 0:
-            return
+            return {}
 
         self.dependent_list.sort(key=lambda x: x.start_order)
 
-        for dependent in self.dependent_list:
-            dependent.start_command_line()
-        time.sleep(1.0)
-        for dependent in self.dependent_list:
-            dependent.make_children_rt()
-
-    def stop(self, watch_kill_create_flag: bool = False):
+        report: typ.Dict[str, typ.Optional[float]] = {}
+        t_start = time.time()
+        for level in self._levels(self.dependent_list, 'start_order'):
+            times = self._run_concurrently(self._traced_start, level)
+            for dependent, time_to_ready in zip(level, times):
+                report[dependent.tmux_name] = time_to_ready
+                if time_to_ready is None:
+                    logg.warning(f'Dependent {dependent.tmux_name} '
+                                 f'(order {dependent.start_order}): '
+                                 f'readiness timeout.')
+                else:
+                    logg.info(f'Dependent {dependent.tmux_name} '
+                              f'(order {dependent.start_order}): '
+                              f'ready in {time_to_ready:.3f} s.')
+
+        logg.info(f'DependentMultiManager.start: all dependents processed '
+                  f'in {time.time() - t_start:.3f} s.')
+
+        self.last_start_report = report
+        return report
+
+    def stop(self,
+             watch_kill_create_flag: bool = False) -> typ.Dict[str, float]:
         if len(self.dependent_list) == 0:
-            return
+            return {}
 
         self.dependent_list.sort(key=lambda x: x.kill_order)
-        for dependent in self.dependent_list:
-            if (not watch_kill_create_flag) or dependent.kill_upon_init:
-                tmux.kill_running_Cc(dependent.tmux_pane)
-        time.sleep(2.0)
-        for dependent in self.dependent_list:
-            if (not watch_kill_create_flag) or dependent.kill_upon_init:
-                tmux.kill_running_Cz(dependent.tmux_pane)
-        time.sleep(.5)
+        to_stop = [
+                dependent for dependent in self.dependent_list
+                if (not watch_kill_create_flag) or dependent.kill_upon_init
+        ]
+
+        report: typ.Dict[str, float] = {}
+        t_start = time.time()
+        for level in self._levels(to_stop, 'kill_order'):
+            times = self._run_concurrently(self._traced_stop, level)
+            for dependent, time_to_stop in zip(level, times):
+                report[dependent.tmux_name] = time_to_stop
+                if dependent.stop_signal is None:
+                    how = 'keystrokes'
+                elif dependent.stop_signal == 0:
+                    how = 'was not running'
+                else:
+                    how = signal.Signals(dependent.stop_signal).name
+                logg.info(f'Dependent {dependent.tmux_name} '
+                          f'(order {dependent.kill_order}): '
+                          f'stopped in {time_to_stop:.3f} s ({how}).')
+
+        logg.info(f'DependentMultiManager.stop: all dependents processed '
+                  f'in {time.time() - t_start:.3f} s.')
+
+        self.last_stop_report = report
+        return report
 
 
 def shellify_methods(instance_of_camera, top_level_globals):
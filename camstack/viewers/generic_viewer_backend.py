@@ -14,18 +14,16 @@ import pygame.constants as pgmc
 
 os.sched_setaffinity(0, _CORES)  # AMD fix
 
-from astropy.io import fits
 from pyMilk.interfacing.shm import SHM
 
 from camstack.viewers import backend_utils as buts
-
-from astropy.io import fits
-from pyMilk.interfacing.shm import SHM
+from camstack.core.lazy import LazyModule
 
 import numpy as np
-from matplotlib import cm
 from functools import partial
 
+cm = LazyModule('matplotlib.cm')  # Upon the first toggle_cmap
+
 # class BasicCamViewer:
 # More basic, with less text lines at the bottom.
 
@@ -36,8 +34,9 @@ class GenericViewerBackend:
     HELP_MSG = """
     """
 
-    COLORMAPS_A = [cm.gray, cm.inferno, cm.magma, cm.viridis]
-    COLORMAPS_B = [cm.gray, cm.seismic, cm.Spectral]
+    # matplotlib.cm colormap names
+    COLORMAPS_A = ['gray', 'inferno', 'magma', 'viridis']
+    COLORMAPS_B = ['gray', 'seismic', 'Spectral']
 
     COLORMAPS = COLORMAPS_A
 
@@ -150,7 +149,7 @@ class GenericViewerBackend:
             self.cmap_id = (self.cmap_id + 1) % len(self.COLORMAPS)
         else:
             self.cmap_id = which
-        self.cmap = self.COLORMAPS[self.cmap_id]
+        self.cmap = getattr(cm, self.COLORMAPS[self.cmap_id])
 
     def toggle_sub_dark(self, state: Op[bool] = None):
         if state is None:
@@ -13,13 +13,15 @@ import pygame
 import pygame.constants as pgmc
 
 os.sched_setaffinity(0, _CORES)  # AMD fix
-from skimage.measure import centroid
 from . import backend_utils as buts
 from . import frontend_utils as futs
 
 from .plugin_arch import BasePlugin, OnOffPlugin
+from camstack.core.lazy import LazyModule
 import re
 
+skimage_measure = LazyModule('skimage.measure')
+
 
 # Dummy template
 class PupilMode(OnOffPlugin):  # Fuck I desire double inheritance now.
@@ -211,7 +213,7 @@ class BullseyePlugin(OnOffPlugin):
 
     def get_centroid(self):
         # using the debiased data, get hotspot
-        ctr = centroid(self.backend_obj.data_debias_uncrop)
+        ctr = skimage_measure.centroid(self.backend_obj.data_debias_uncrop)
         # convert to screen coordinates
 
         return ctr
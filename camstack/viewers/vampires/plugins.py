@@ -1,6 +1,5 @@
 from typing import Optional as Op, Optional, Tuple
 from camstack.viewers.generic_viewer_frontend import GenericViewerFrontend
-from swmain.network.pyroclient import connect
 from camstack.viewers.generic_viewer_backend import GenericViewerBackend
 from camstack.viewers import backend_utils as buts
 from camstack.viewers import frontend_utils as futs
@@ -16,6 +15,9 @@ from rich.panel import Panel
 from rich.live import Live
 from rich.logging import RichHandler
 import numpy as np
+from camstack.core.lazy import LazyModule
+
+pyroclient = LazyModule('swmain.network.pyroclient')
 
 logger = logging.getLogger()
 
@@ -28,7 +30,7 @@ class DeviceMixin:
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.device = connect(self.DEVICE_NAME)
+        self.device = pyroclient.connect(self.DEVICE_NAME)
 
 
 class MaskWheelPlugin(DeviceMixin, BasePlugin):
@@ -1,7 +1,6 @@
 from typing import Optional as Op, Tuple
 from camstack.viewers.generic_viewer_backend import GenericViewerBackend
 from camstack.viewers.generic_viewer_frontend import GenericViewerFrontend
-from swmain.network.pyroclient import connect
 from camstack.viewers import backend_utils as buts
 import camstack.viewers.frontend_utils as futs
 import pygame.constants as pgmc
@@ -9,10 +8,14 @@ from functools import partial
 import logging
 from rich.live import Live
 from rich.logging import RichHandler
-from skimage.transform import rescale
 import numpy as np
-from camstack.cams.vampires import VCAM1, VCAM2
+from camstack.core import redis_cache
 from swmain.redis import RDB, get_values
+from camstack.core.lazy import LazyModule
+
+pyroclient = LazyModule('swmain.network.pyroclient')
+# Only for the hotspots - not the whole camera control stack at startup.
+vampires_cams = LazyModule('camstack.cams.vampires')
 
 stream_handler = RichHandler(level=logging.INFO, show_level=False,
                              show_path=False, log_time_format="%H:%M:%S")
@@ -108,8 +111,8 @@ CTRL  + s     : Save current position to last configuration"""
         self.cam_num = cam_num
         self.other_cam_num = (cam_num % 2) + 1
         self.other_cam_name = f"VCAM{self.other_cam_num}"
-        self.cam = connect(self.cam_name)
-        self.other_cam = connect(self.other_cam_name)
+        self.cam = pyroclient.connect(self.cam_name)
+        self.other_cam = pyroclient.connect(self.other_cam_name)
 
         self.live = Live()
         self.logger = logging.getLogger(name_shm)
@@ -205,9 +208,9 @@ CTRL  + s     : Save current position to last configuration"""
 
         # calculate crops for each window
         if self.cam_num == 1:
-            hotspots = VCAM1.HOTSPOTS
+            hotspots = vampires_cams.VCAM1.HOTSPOTS
         elif self.cam_num == 2:
-            hotspots = VCAM2.HOTSPOTS
+            hotspots = vampires_cams.VCAM2.HOTSPOTS
         else:
             raise ValueError(f"Unknown camera number {self.cam_num}")
 
@@ -338,7 +341,7 @@ class VAMPIRESBaseViewerFrontend(GenericViewerFrontend):
         kws = self.backend_obj.input_shm.get_keywords(
         )  # single fetch rather than pymilk functions.
         try:
-            self.hwtrig_enabled = RDB.hget("U_TRIGEN", "value")
+            self.hwtrig_enabled = redis_cache.get_value(RDB, "U_TRIGEN")
         except:
             pass
         tint: float = kws.get("EXPTIME", 0)  # seconds
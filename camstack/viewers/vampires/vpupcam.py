@@ -1,9 +1,11 @@
 from camstack.viewers.generic_viewer_frontend import GenericViewerFrontend
-from swmain.network.pyroclient import connect
 from camstack.viewers.generic_viewer_backend import GenericViewerBackend
 import logging
 from rich.logging import RichHandler
 import camstack.viewers.frontend_utils as futs
+from camstack.core.lazy import LazyModule
+
+pyroclient = LazyModule('swmain.network.pyroclient')
 
 logger = logging.getLogger("vpupcam")
 stream_handler = RichHandler(level=logging.INFO, show_level=False,
@@ -109,7 +111,7 @@ CTRL+S      : Save position to the last-moved-to configuration"""
         if name_shm is None:
             name_shm = "vpupcam"
         super().__init__(name_shm=name_shm)
-        self.wheel = connect("VAMPIRES_MASK")
+        self.wheel = pyroclient.connect("VAMPIRES_MASK")
         self.logger = logger
 
     def _data_grab(self) -> None:
@@ -12,6 +12,7 @@ if TYPE_CHECKING:
 import numpy as np
 from enum import Enum
 from pyMilk.interfacing.isio_shmlib import SHM
+from camstack.core import redis_cache
 from pygame.constants import (KMOD_LALT, KMOD_LCTRL, KMOD_LSHIFT, KMOD_LMETA,
                               KMOD_RALT, KMOD_RCTRL, KMOD_RSHIFT)
 
@@ -148,15 +149,11 @@ def RDB_pull(rdb: Redis, rdb_alive: bool, cam_apapane: bool,
     # Now Getting the keys
 
     if rdb_alive:
-        with rdb.pipeline() as pipe:
-            for key in fits_keys_to_pull:
-                pipe.hget(key, 'value')
-
-            try:
-                values = pipe.execute()
-                status = {k: v for k, v in zip(fits_keys_to_pull, values)}
-            except redis.exceptions.TimeoutError:
-                rdb_alive = False
+        try:
+            values = redis_cache.get_values(rdb, list(fits_keys_to_pull))
+            status = {k: v for k, v in zip(fits_keys_to_pull, values)}
+        except redis.exceptions.TimeoutError:
+            rdb_alive = False
 
     if not rdb_alive and not do_defaults:
         raise ConnectionError("Redis unavailable and not skipping defaults")